@@ -0,0 +1,167 @@
+import json
+
+
+# 포인터 가속/감도 단계 (파서 -> [가속] -> 코얼레서)
+# 곡선은 불러올 때 속도(프레임당 카운트)별 배율 표로 미리 계산해 두고,
+# 이벤트마다 표 조회 + 정수 곱셈/시프트만 함 (이벤트마다 부동소수점 연산 없음)
+# 1 카운트 미만의 나머지는 버리지 않고 다음 프레임으로 이월 (느린 움직임도 손실 없음)
+# 호스트마다 다른 프로파일을 쓸 수 있음 (노트북마다 자체 가속이 다르므로)
+
+# 배율 고정소수점: 1.0 = 256
+FIXED_BITS = 8
+FIXED_ONE = 1 << FIXED_BITS
+FIXED_HALF = FIXED_ONE >> 1
+
+# 표 크기 - 이보다 빠른 속도는 마지막 칸 사용
+LUT_SIZE = 128
+
+CURVES = ('flat', 'linear', 'power')
+
+# 기본 설정 (프로파일은 이 중 바꿀 값만 지정)
+#  curve       : flat(가속 없음), linear(문턱 이후 속도에 비례해 증가), power(문턱 대비 속도의 거듭제곱)
+#  sensitivity : 전체 감도, sensitivity_x / sensitivity_y 로 축별 추가 배율
+#  accel       : linear 기울기 (카운트당 배율 증가량)
+#  threshold   : 가속이 시작되는 속도 (프레임당 카운트)
+#  exponent    : power 지수
+#  cap         : 최대 가속 배율 (감도 제외)
+#  smoothing   : 속도 평활 계수 0 ~ 1 (클수록 배율 변화가 부드러움)
+DEFAULTS = {
+    'curve': 'flat',
+    'sensitivity': 1.0,
+    'sensitivity_x': 1.0,
+    'sensitivity_y': 1.0,
+    'accel': 0.05,
+    'threshold': 4,
+    'exponent': 1.5,
+    'cap': 4.0,
+    'smoothing': 0.0,
+}
+
+# 이름으로 고를 수 있는 기본 프로파일
+PRESETS = {
+    'off': {},
+    'mild': {'curve': 'linear', 'accel': 0.03, 'threshold': 4, 'cap': 2.0},
+    'strong': {'curve': 'power', 'threshold': 3, 'exponent': 1.6, 'cap': 4.0, 'smoothing': 0.5},
+}
+
+
+def _gain(settings, speed):
+    curve = settings['curve']
+    threshold = settings['threshold']
+    if curve == 'flat' or speed <= threshold:
+        return 1.0
+    if curve == 'linear':
+        gain = 1.0 + settings['accel'] * (speed - threshold)
+    else:
+        gain = (speed / threshold) ** settings['exponent']
+    return min(gain, settings['cap'])
+
+
+class AccelTable:
+    # 컴파일된 프로파일 - 축별 배율 표 (고정소수점 정수)
+
+    def __init__(self, name, settings):
+        unknown = set(settings) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f'알 수 없는 가속 설정: {", ".join(sorted(unknown))}')
+        s = dict(DEFAULTS, **settings)
+        if s['curve'] not in CURVES:
+            raise ValueError(f'알 수 없는 가속 곡선: {s["curve"]} (가능: {", ".join(CURVES)})')
+        if s['curve'] == 'power' and s['threshold'] <= 0:
+            raise ValueError('power 곡선은 threshold > 0 이어야 함')
+        if not 0 <= s['smoothing'] < 1:
+            raise ValueError('smoothing 은 0 이상 1 미만')
+        self.name = name
+        self.settings = s
+        sx = s['sensitivity'] * s['sensitivity_x']
+        sy = s['sensitivity'] * s['sensitivity_y']
+        gains = [_gain(s, v) for v in range(LUT_SIZE)]
+        self.x = [round(g * sx * FIXED_ONE) for g in gains]
+        self.y = [round(g * sy * FIXED_ONE) for g in gains]
+        self.smoothing = round(s['smoothing'] * FIXED_ONE)
+        # 감도 1, 가속 없음이면 통과 (표 조회도 생략)
+        self.identity = all(v == FIXED_ONE for v in self.x) and all(v == FIXED_ONE for v in self.y)
+
+
+def compile_profile(name, spec):
+    # spec: 프리셋 이름 또는 설정 dict ({'preset': 이름} 으로 프리셋 위에 덮어쓰기 가능)
+    if isinstance(spec, str):
+        if spec not in PRESETS:
+            raise ValueError(f'알 수 없는 가속 프리셋: {spec} (가능: {", ".join(PRESETS)})')
+        return AccelTable(spec, PRESETS[spec])
+    spec = dict(spec)
+    preset = spec.pop('preset', None)
+    if preset is not None:
+        if preset not in PRESETS:
+            raise ValueError(f'알 수 없는 가속 프리셋: {preset}')
+        spec = dict(PRESETS[preset], **spec)
+    return AccelTable(name, spec)
+
+
+def compile_hosts(hosts):
+    # {호스트 키: 프리셋|설정} -> {호스트 키: 표}
+    return {key: compile_profile(key, spec) for key, spec in hosts.items()}
+
+
+def load_config(path):
+    # JSON: {"default": 프리셋|설정, "hosts": {"주소 또는 이름": 프리셋|설정, ...}}
+    # -> (기본 설정, 호스트별 설정) - 프로파일의 accel / accel_hosts 와 같은 형식
+    with open(path) as f:
+        config = json.load(f)
+    return config.get('default', 'off'), config.get('hosts', {})
+
+
+class PointerAccel:
+    # push(dx, dy, wheel, buttons, ts) 를 받아 가속/감도 적용 후 target 으로 넘김 (코얼레서 push 와 같은 형식)
+
+    def __init__(self, target, default=None, hosts=None):
+        self.target = target
+        self.table = None
+        self.set_profiles(default, hosts)
+
+    def set_profiles(self, default=None, hosts=None):
+        # 프로파일 교체 (다시 불러오기) - 호출한 쪽에서 select_host 로 활성 호스트 표를 다시 고름
+        self.default = default or AccelTable('off', {})
+        self.hosts = {key.upper(): table for key, table in (hosts or {}).items()}   # 대소문자 무시
+        self.set_table(self.default)
+
+    def set_table(self, table):
+        self.table = table
+        self._rem_x = self._rem_y = 0
+        self._speed = 0
+
+    def select_host(self, host):
+        # 활성 호스트 변경 시 (HostManager.on_active) - 주소, 이름 순으로 찾고 없으면 기본 프로파일
+        table = self.default
+        if host is not None:
+            table = self.hosts.get(host.address.upper(), self.hosts.get(host.name.upper(), self.default))
+        if table is not self.table:
+            self.set_table(table)
+            print(f"[가속] {host.name if host else '기본'}: {table.name}")
+
+    def push(self, dx, dy, wheel, buttons, ts=0):
+        table = self.table
+        if (dx or dy) and not table.identity:
+            speed = (dx if dx >= 0 else -dx) + (dy if dy >= 0 else -dy)
+            smoothing = table.smoothing
+            if smoothing:
+                speed = self._speed = (self._speed * smoothing + speed * (FIXED_ONE - smoothing)) >> FIXED_BITS
+            if speed >= LUT_SIZE:
+                speed = LUT_SIZE - 1
+            vx = dx * table.x[speed] + self._rem_x
+            vy = dy * table.y[speed] + self._rem_y
+            dx = (vx + FIXED_HALF) >> FIXED_BITS
+            dy = (vy + FIXED_HALF) >> FIXED_BITS
+            self._rem_x = vx - (dx << FIXED_BITS)
+            self._rem_y = vy - (dy << FIXED_BITS)
+        self.target(dx, dy, wheel, buttons, ts)
+
+    # ---------- 제어 명령 ----------
+    def cmd_accel(self, args):
+        # accel            : 현재 프로파일
+        # accel <프리셋>   : 현재 프로파일을 프리셋으로 (다음 호스트 전환 때 원래대로)
+        if args:
+            self.set_table(compile_profile(args[0], args[0]))
+        s = self.table.settings
+        return (f"{self.table.name}: {s['curve']}, 감도 {s['sensitivity']} "
+                f"(x {s['sensitivity_x']}, y {s['sensitivity_y']}), 최대 배율 {s['cap']}")
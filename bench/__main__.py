@@ -0,0 +1,506 @@
+import dbus, dbus.mainloop.glib
+from gi.repository import GLib
+import os, sys, gc, time, asyncio, argparse, tempfile, threading, subprocess, contextlib, tracemalloc
+
+from main import (Application, Advertisement, relay_thread, fan_out, find_adapters, parse_args as hub_args, profile_base)
+from bluez import BLUEZ_SERVICE, GATT_MANAGER_IFACE, LE_ADVERTISING_MANAGER_IFACE
+from registration import Registration
+from watchdog import Watchdog
+from coalescer import MotionCoalescer, QUEUE_POLICIES, DEFAULT_POLICY, DEFAULT_QUEUE_SIZE
+from evdev_reader import EvdevReader, helper_frames
+from tracing import TRACE, now_us
+import realtime
+from power import PowerManager
+from shard import ShardSupervisor
+from capture import Replay
+from runtime_asyncio import new_event_loop, scheduler, watch_reader
+from bench.fake_bluez import STATS_IFACE
+from bench.scenarios import SCENARIOS
+
+
+# 입력 -> 알림 파이프라인 헤드리스 벤치마크
+# python -m bench [--scenario steady|flick|buttons|all] [--frames N] [--interval-ms MS]
+#
+# 개인 D-Bus 버스(dbus-daemon)를 띄우고 가짜 BlueZ(bench/fake_bluez.py)를 별도 프로세스로 실행한 뒤
+# 실제 Application/HIDService 를 등록하고, 합성 input_event 파일을
+# relay_thread -> MotionCoalescer -> send_report 경로로 흘려 PropertiesChanged 개수를 셈
+# --replay FILE: 합성 시나리오 대신 main.py --capture 로 녹화한 실제 입력을 재생 (기본 최대 속도)
+# --runtime asyncio: relay 스레드 대신 이벤트 루프 add_reader -> MotionCoalescer(inline) -> send_report
+# --recovery N: 가짜 BlueZ 를 N번 종료/재시작하며 감시자(watchdog)가 다시 등록하기까지 걸린 시간 측정
+# --adapters N: 가짜 어댑터 N개에 어댑터마다 트리를 하나씩 등록하고 어댑터별 전달 수 출력
+# --low-jitter compare: 같은 시나리오를 저지연 모드(realtime.py) 없이/있이 돌려 지연 꼬리(p99/p99.9/max) 비교
+#   --load N 으로 CPU 를 계속 쓰는 프로세스를 띄워 바쁜 Pi 흉내
+# --power: 같은 시나리오를 절전 off 상태(구독한 호스트 없음 - 읽은 배치를 디코딩 없이 버림)로도 돌려 입력 프레임당 CPU 비교
+# --shard-compare N: 가짜 어댑터 1 ~ N개에서 단일 프로세스(어댑터마다 트리, 한 프로세스에서 전송)와
+#   샤딩(main.py --shard - 공유 메모리 링 + 어댑터마다 작업 프로세스)의 어댑터별 리포트/s, CPU 비교
+
+def start_private_bus():
+    proc = subprocess.Popen(['dbus-daemon', '--session', '--nofork', '--print-address=1'],
+                            stdout=subprocess.PIPE, text=True)
+    address = proc.stdout.readline().strip()
+    if not address:
+        raise RuntimeError('dbus-daemon 시작 실패')
+    return proc, address
+
+
+def start_fake_bluez(address, adapters=1):
+    return subprocess.Popen([sys.executable, '-m', 'bench.fake_bluez',
+                             '--address', address, '--adapters', str(adapters)])
+
+
+def start_load(n):
+    return [subprocess.Popen([sys.executable, '-c', 'while True: pass']) for _ in range(n)]
+
+
+def wait_for(predicate, timeout=5.0):
+    # 준비 단계 전용: GLib 메인 루프를 돌리면서 조건이 참이 될 때까지 대기
+    ctx = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError('벤치마크 준비 시간 초과')
+        if not ctx.iteration(False):
+            time.sleep(0.001)
+
+
+def setup_hub(bus):
+    # 가짜 BlueZ 의 어댑터마다 애플리케이션을 하나씩, 광고는 같은 것을 등록 (main.py --adapters all 과 같은 방식)
+    # 돌려주는 값: 어댑터별 애플리케이션 목록
+    wait_for(lambda: bus.name_has_owner(BLUEZ_SERVICE))
+    advert = Advertisement(bus, 0)
+    done = []
+    errors = []
+    adapters = find_adapters(bus)
+    if len(adapters) == 1:
+        apps = [Application(bus)]
+    else:
+        apps = [Application(bus, prefix=f'{Application.PATH_PREFIX}/{os.path.basename(path)}') for path in adapters]
+
+    def registered():
+        if errors:
+            raise RuntimeError(f'등록 실패: {errors[0]}')
+        return len(done) == 2 * len(adapters) and all(app.services[0].mouse_input.notifying for app in apps)
+
+    with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+        for adapter_path, app in zip(adapters, apps):
+            adapter = bus.get_object(BLUEZ_SERVICE, adapter_path)
+            dbus.Interface(adapter, LE_ADVERTISING_MANAGER_IFACE).RegisterAdvertisement(
+                advert.get_path(), {}, reply_handler=lambda: done.append('ad'), error_handler=errors.append)
+            dbus.Interface(adapter, GATT_MANAGER_IFACE).RegisterApplication(
+                app.get_path(), {}, reply_handler=lambda: done.append('app'), error_handler=errors.append)
+        wait_for(registered)
+    return apps
+
+
+def run_scenario(apps, stats, name, frames, interval_ms, reader_mode, trace_alloc, aloop=None,
+                 policy=DEFAULT_POLICY, queue_size=DEFAULT_QUEUE_SIZE, replay=None, gate=None):
+    send_report = fan_out([app.services[0].mouse_input for app in apps])   # GattTransport 와 같은 경로
+    with tempfile.NamedTemporaryFile(suffix='.evdev') as f:
+        if replay is None:
+            f.write(SCENARIOS[name](frames))
+            f.flush()
+
+        sent = [0]
+
+        def send(buttons, dx, dy, wheel):
+            sent[0] += 1
+            send_report(buttons, dx, dy, wheel)
+
+        stats.Reset()
+        TRACE.reset()
+        coalescer = MotionCoalescer(send, interval_ms=interval_ms,
+                                    schedule=scheduler(aloop) if aloop is not None else None,
+                                    inline=aloop is not None, policy=policy, queue_size=queue_size)
+        proc = reader = None
+        if replay is not None:
+            source = replay.frames()
+        elif aloop is not None:
+            reader = EvdevReader(f.name, nonblock=True, gate=gate)
+        elif reader_mode == 'helper':
+            proc = subprocess.Popen(['./get_mouse_sensor', f.name], stdout=subprocess.PIPE,
+                                    stdin=subprocess.DEVNULL, text=True, bufsize=1)
+            source = helper_frames(proc.stdout)
+        else:
+            reader = EvdevReader(f.name, gate=gate)
+            source = reader.frames()
+
+        gc.collect()
+        if trace_alloc:
+            tracemalloc.start()
+        gen0 = gc.get_stats()[0]['collections']
+        blocks0 = sys.getallocatedblocks()
+        times0 = os.times()
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+
+        if aloop is not None:
+            eof = []
+            watch_reader(aloop, reader, coalescer.push, on_eof=lambda: eof.append(True))
+
+            async def wait_done():
+                while not eof or coalescer.pending():
+                    await asyncio.sleep(0.001)
+
+            with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+                aloop.run_until_complete(wait_done())
+        else:
+            thread = threading.Thread(target=relay_thread, args=(source, coalescer), daemon=True)
+            thread.start()
+            loop = GLib.MainLoop()
+
+            def check_done():
+                if thread.is_alive() or coalescer.pending():
+                    return True
+                loop.quit()
+                return False
+
+            GLib.timeout_add(1, check_done)
+            with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+                loop.run()
+
+        wall = time.perf_counter() - t0
+        cpu = time.process_time() - cpu0
+        if proc is not None:
+            proc.wait()
+            times1 = os.times()
+            cpu += (times1.children_user - times0.children_user) + (times1.children_system - times0.children_system)
+        blocks = sys.getallocatedblocks() - blocks0
+        gen0 = gc.get_stats()[0]['collections'] - gen0
+        peak = 0
+        if trace_alloc:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if reader is not None:
+            reader.close()
+        if replay is not None:
+            frames = replay.frame_count
+
+    # 가짜 BlueZ 가 모든 시그널을 받을 때까지 대기 (동기 호출이 송신 큐도 비워줌)
+    deadline = time.monotonic() + 5.0
+    received = 0
+    while time.monotonic() < deadline:
+        received = int(stats.Counts()[0])
+        if received >= sent[0]:
+            break
+        time.sleep(0.01)
+
+    # 어댑터별 전달 수 (여러 어댑터면 리포트마다 어댑터별로 한 번씩 전달되어야 함)
+    while True:
+        delivered = {str(k): int(v) for k, v in stats.Delivered().items()}
+        if min(delivered.values()) >= sent[0] or time.monotonic() >= deadline:
+            break
+        time.sleep(0.01)
+
+    reports = sent[0]
+    result = {
+        'scenario': name,
+        'frames': frames,
+        'reports': reports,
+        'received': received,
+        'wall_ms': wall * 1000,
+        'reports_per_s': reports / wall if wall else 0.0,
+        'cpu_us_per_report': cpu * 1e6 / reports if reports else 0.0,
+        'cpu_us_per_frame': cpu * 1e6 / frames if frames else 0.0,
+        'gen0_gc': gen0,
+        'blocks_delta': blocks,
+        'peak_kib': peak / 1024,
+        'merged': coalescer.merged,
+        'dropped': coalescer.dropped,
+        'delivered': delivered,
+    }
+    return result
+
+
+def run_recovery(bus, address, fake, rounds):
+    # bluetoothd 재시작 흉내: 가짜 BlueZ 를 죽이고 다시 띄운 뒤 등록 + 구독까지 걸린 시간
+    #  전체   : 종료 감지(NameOwnerChanged) -> 다시 등록되고 호스트가 구독
+    #  재시작 후: 새 BlueZ 가 버스 이름을 얻은 뒤 -> 같은 시점 (허브가 줄일 수 있는 부분)
+    app = Application(bus)
+    advert = Advertisement(bus, 1)
+    registration = Registration(bus, app, advert, adapter_cache='')
+    watchdog = Watchdog()
+    mouse_char = app.services[0].mouse_input
+
+    def start_bluez():
+        if watchdog.components['bluez'].failures:
+            app.reset_notifying()
+        registration.register(lambda: watchdog.recovered('bluez'),
+                              lambda e: watchdog.failed('bluez', str(e)))
+        return False
+
+    watchdog.add('bluez', start_bluez)
+    comp = watchdog.components['bluez']
+    with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+        registration.watch(on_lost=lambda reason: watchdog.hold('bluez', reason),
+                           on_back=lambda: watchdog.kick('bluez'))
+        watchdog.start('bluez')
+        wait_for(lambda: comp.up and mouse_char.notifying)
+
+    afters = []
+    for i in range(rounds):
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            fake[0].terminate()
+            fake[0].wait()
+            wait_for(lambda: not comp.up)
+            fake[0] = start_fake_bluez(address)
+            wait_for(lambda: comp.up and mouse_char.notifying)
+        t = now_us()
+        total = (t - comp.down_us) / 1000
+        after = (t - comp.kick_us) / 1000 if comp.kick_us else total
+        afters.append(after)
+        print(f"복구 {i + 1:>3}: 전체 {total:7.1f} ms  BlueZ 재시작 후 {after:6.1f} ms")
+    if rounds:
+        afters.sort()
+        print(f"BlueZ 재시작 후 복구: p50 {afters[len(afters) // 2]:.1f} ms  최대 {afters[-1]:.1f} ms "
+              f"(목표 1000 ms {'이하' if afters[-1] <= 1000 else '초과'})")
+
+
+def print_result(r):
+    line = (f"{r['scenario']:>8}: 프레임 {r['frames']:>6}  리포트 {r['reports']:>6} (수신 {r['received']:>6})"
+            f"  {r['wall_ms']:8.1f} ms  {r['reports_per_s']:9.0f} 리포트/s"
+            f"  CPU {r['cpu_us_per_report']:7.1f} µs/리포트  gen0 GC {r['gen0_gc']:>4}"
+            f"  블록 증가 {r['blocks_delta']:>6}  병합 {r['merged']:>6}  버림 {r['dropped']:>6}")
+    if r['peak_kib']:
+        line += f"  최대 할당 {r['peak_kib']:.1f} KiB"
+    if len(r['delivered']) > 1:
+        line += '  어댑터별 전달 ' + ', '.join(f"{path.rsplit('/', 1)[-1]} {n}" for path, n in sorted(r['delivered'].items()))
+    print(line)
+
+
+def run_power_off(apps, stats, name, args, aloop):
+    # 구독한 호스트가 없는 절전 off 상태 - 메인 허브와 같은 PowerManager 를 입력 소스의 gate 로 사용
+    # (버린 배치 뒤 쉬는 시간은 0 - 파일은 계속 읽을 수 있으므로 순수 처리 비용만 비교)
+    power = PowerManager(idle_s=0, poll_s=0)
+    power.ready = lambda: False
+    with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+        power.start()
+    result = run_scenario(apps, stats, name, args.frames, args.interval_ms, args.reader, args.trace_alloc,
+                          aloop, args.queue_policy, args.queue_size, gate=power)
+    power.close()
+    return result
+
+
+def proc_cpu(pid):
+    # /proc/<pid>/stat 의 utime + stime (초)
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def run_sharded(address, n, name, args):
+    # main.py --shard 와 같은 구성: 이 프로세스는 입력을 읽어 링에 쓰기만 하고, 작업 프로세스가 가속/코얼레싱/알림
+    # 링은 시나리오 전체가 들어가는 크기 (작업이 뒤처져도 놓치지 않도록 - 처리량만 비교)
+    bus = dbus.bus.BusConnection(address)
+    stats = dbus.Interface(bus.get_object(BLUEZ_SERVICE, '/'), STATS_IFACE)
+    settings = profile_base(hub_args([]))
+    settings.update(interval_ms=args.interval_ms, queue_policy=args.queue_policy, queue_size=args.queue_size)
+    names = [os.path.basename(path) for path in find_adapters(bus)]
+    shards = ShardSupervisor(names, settings, Watchdog(), bus_address=address,
+                             ring_name='ble-hub-bench',
+                             capacity=args.frames + 1024, stdout=subprocess.DEVNULL)
+    ring = shards.ring
+    try:
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            shards.start()
+            wait_for(lambda: all(ring.slot(i)[0] for i in range(n)), timeout=15.0)
+        stats.Reset()
+        with tempfile.NamedTemporaryFile(suffix='.evdev') as f:
+            f.write(SCENARIOS[name](args.frames))
+            f.flush()
+            pids = [proc.pid for proc in shards.procs.values()]
+            workers0 = sum(proc_cpu(pid) for pid in pids)
+            ingest = [0.0]
+
+            def ingest_thread():
+                cpu0 = time.thread_time()
+                with EvdevReader(f.name) as reader:
+                    relay_thread(reader.frames(), ring)
+                ingest[0] = time.thread_time() - cpu0
+
+            t0 = time.perf_counter()
+            thread = threading.Thread(target=ingest_thread, daemon=True)
+            thread.start()
+            # 끝: 입력을 다 썼고, 모든 작업이 링을 따라잡았고, 보낸 리포트 수가 한동안 그대로
+            last = (None, t0)
+            deadline = t0 + 60.0
+            while time.perf_counter() < deadline:
+                time.sleep(0.002)
+                slots = [ring.slot(i) for i in range(n)]
+                sent = tuple(slot[2] for slot in slots)
+                now = time.perf_counter()
+                if sent != last[0]:
+                    last = (sent, now)
+                elif (not thread.is_alive() and all(slot[1] == ring.seq for slot in slots)
+                      and now - last[1] > 0.2):
+                    break
+            wall = last[1] - t0
+            workers = sum(proc_cpu(pid) for pid in pids) - workers0
+            lost = sum(ring.slot(i)[3] for i in range(n))
+    finally:
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            shards.close()
+
+    deadline = time.monotonic() + 5.0
+    while True:
+        delivered = {str(k): int(v) for k, v in stats.Delivered().items()}
+        if all(delivered[f'/org/bluez/{hci}'] >= s for hci, s in zip(names, sent)) or time.monotonic() >= deadline:
+            break
+        time.sleep(0.01)
+    return {'wall_ms': wall * 1000, 'sent': dict(zip(names, sent)), 'delivered': delivered, 'lost': lost,
+            'ingest_cpu': ingest[0], 'workers_cpu': workers}
+
+
+def run_shard_compare(address, fake, name, args):
+    print(f"{name} 시나리오, 프레임 {args.frames}, 간격 {args.interval_ms} ms - 어댑터별 리포트/s (전체 전달/s), CPU")
+    for n in range(1, args.shard_compare + 1):
+        fake[0].terminate()
+        fake[0].wait()
+        fake[0] = start_fake_bluez(address, n)
+        bus = dbus.bus.BusConnection(address)
+        apps = setup_hub(bus)
+        stats = dbus.Interface(bus.get_object(BLUEZ_SERVICE, '/'), STATS_IFACE)
+        single = run_scenario(apps, stats, name, args.frames, args.interval_ms, 'builtin', False,
+                              policy=args.queue_policy, queue_size=args.queue_size)
+        bus.close()
+        sharded = run_sharded(address, n, name, args)
+
+        wall = single['wall_ms'] / 1000
+        per_adapter = single['reports_per_s']
+        total = sum(single['delivered'].values()) / wall if wall else 0.0
+        cpu = single['cpu_us_per_frame'] * single['frames'] / 1e6
+        print(f"  어댑터 {n}: 단일 {per_adapter:9.0f} 리포트/s ({total:9.0f} 전달/s)  CPU {cpu * 1000:7.1f} ms")
+        wall = sharded['wall_ms'] / 1000
+        rates = [s / wall if wall else 0.0 for s in sharded['sent'].values()]
+        total = sum(sharded['delivered'].values()) / wall if wall else 0.0
+        print(f"  {'':>7}  샤드 {min(rates):9.0f} 리포트/s ({total:9.0f} 전달/s)  "
+              f"CPU 입력 {sharded['ingest_cpu'] * 1000:7.1f} ms + 작업 {sharded['workers_cpu'] * 1000:7.1f} ms"
+              f"  놓침 {sharded['lost']}")
+
+
+def print_power(name, active, off):
+    a, b = active['cpu_us_per_frame'], off['cpu_us_per_frame']
+    print(f"{name:>8} 입력 프레임당 CPU (µs): 전송 {a:.2f} -> 절전 off {b:.2f} "
+          f"({(1 - b / a) * 100 if a else 0:.0f}% 감소)")
+
+
+# 지터 비교 단계 - 합성 시나리오의 이벤트 시각은 0 부터라 total 은 의미가 없으므로
+# 스레드 -> 메인 루프 홉(queue)과 알림 전송(send, emit)만 봄
+JITTER_STAGES = ('queue', 'send', 'emit')
+
+
+def tail(h):
+    return h.percentile(99), h.percentile(99.9), h.max
+
+
+def print_jitter(name, off, on):
+    print(f"{name:>8} 지연 꼬리 (µs, 저지연 끔 -> 켬)")
+    for stage in JITTER_STAGES:
+        cols = '  '.join(f"{label} {a:>6} -> {b:<6}"
+                         for label, a, b in zip(('p99', 'p99.9', 'max'), off[stage], on[stage]))
+        print(f"{stage:>8}: {cols}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='입력 -> 알림 파이프라인 벤치마크')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS) + ['all'], default='all')
+    parser.add_argument('--frames', type=int, default=20000, help='시나리오별 입력 프레임 수')
+    parser.add_argument('--interval-ms', type=int, default=0,
+                        help='코얼레서 전송 간격 (0 = 최대 처리량 측정)')
+    parser.add_argument('--reader', choices=('builtin', 'helper'), default='builtin')
+    parser.add_argument('--runtime', choices=('thread', 'asyncio'), default='thread',
+                        help='asyncio: 이벤트 루프 하나에서 읽기/코얼레싱/전송 (builtin 리더만)')
+    parser.add_argument('--replay', metavar='FILE', help='녹화 파일 재생 (main.py --capture, 시나리오 대신)')
+    parser.add_argument('--replay-speed', type=float, default=0.0, help='재생 배속 (0 = 최대 속도)')
+    parser.add_argument('--queue-policy', choices=QUEUE_POLICIES, default=DEFAULT_POLICY)
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument('--trace', action='store_true', help='시나리오별 단계 지연(p50/p99/p99.9/max) 출력')
+    parser.add_argument('--trace-alloc', action='store_true', help='tracemalloc 으로 최대 할당량 측정 (느림)')
+    parser.add_argument('--adapters', type=int, default=1, metavar='N',
+                        help='가짜 어댑터 N개에 어댑터마다 애플리케이션을 등록 (여러 어댑터 모드 - 리포트가 모든 어댑터로 전달되는지)')
+    parser.add_argument('--recovery', type=int, default=0, metavar='N',
+                        help='시나리오 대신 가짜 BlueZ 를 N번 재시작하며 다시 등록까지 걸린 시간 측정')
+    parser.add_argument('--low-jitter', choices=('off', 'on', 'compare'), default='off',
+                        help='저지연 모드 (CPU 고정, SCHED_FIFO/nice, mlockall, gc.freeze) - '
+                             'compare: 끔/켬 두 번 돌려 지연 꼬리 비교 (--trace 자동)')
+    parser.add_argument('--cpu', type=int, metavar='N', help='저지연 모드에서 고정할 CPU (기본: 마지막 CPU)')
+    parser.add_argument('--rt-priority', type=int, default=realtime.DEFAULT_RT_PRIORITY, metavar='1-99')
+    parser.add_argument('--load', type=int, default=0, metavar='N',
+                        help='측정 중 CPU 를 계속 쓰는 프로세스 N개 실행 (바쁜 Pi 흉내)')
+    parser.add_argument('--power', action='store_true',
+                        help='절전 off 상태(구독 없음 - 디코딩 없이 버림)로도 돌려 입력 프레임당 CPU 비교 (builtin 리더만)')
+    parser.add_argument('--shard-compare', type=int, default=0, metavar='N',
+                        help='시나리오 대신 어댑터 1 ~ N개에서 단일 프로세스와 샤딩(main.py --shard)의 처리량 비교')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    names = sorted(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+    if args.replay:
+        names = ['replay']
+    TRACE.enabled = args.trace or args.low_jitter == 'compare'
+    modes = {'off': (False,), 'on': (True,), 'compare': (False, True)}[args.low_jitter]
+    aloop = None
+    if args.runtime == 'asyncio':
+        if args.reader == 'helper' or args.replay:
+            sys.exit('asyncio 런타임은 builtin 리더만 지원합니다 (재생 제외)')
+        aloop = new_event_loop()
+        if aloop is None:
+            sys.exit('asyncio 런타임에는 PyGObject 3.50 이상(gi.events)이 필요합니다')
+    if args.power and (args.reader == 'helper' or args.replay):
+        sys.exit('--power 는 builtin 리더만 지원합니다 (재생 제외)')
+
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    daemon, address = start_private_bus()
+    fake = [start_fake_bluez(address, args.adapters)]
+    try:
+        bus = dbus.bus.BusConnection(address)
+        if args.recovery:
+            wait_for(lambda: bus.name_has_owner(BLUEZ_SERVICE))
+            run_recovery(bus, address, fake, args.recovery)
+            return
+        if args.shard_compare:
+            for name in names:
+                run_shard_compare(address, fake, name, args)
+            return
+        apps = setup_hub(bus)
+        stats = dbus.Interface(bus.get_object(BLUEZ_SERVICE, '/'), STATS_IFACE)
+        load = start_load(args.load)
+        try:
+            for name in names:
+                tails = {}
+                active = None
+                for low_jitter in modes:
+                    previous = None
+                    if low_jitter:
+                        previous, applied = realtime.apply(args.cpu, args.rt_priority)
+                        print(f"[저지연] {', '.join(applied)}, GC 고정 객체 {realtime.freeze_gc()}개")
+                    replay = Replay(args.replay, args.replay_speed) if args.replay else None
+                    active = run_scenario(apps, stats, name, args.frames, args.interval_ms,
+                                          args.reader, args.trace_alloc, aloop,
+                                          args.queue_policy, args.queue_size, replay)
+                    print_result(active)
+                    if replay is not None:
+                        replay.close()
+                    if previous is not None:
+                        realtime.restore(previous)
+                    if TRACE.enabled:
+                        print(TRACE.report())
+                        tails[low_jitter] = {stage: tail(TRACE.hist[stage]) for stage in JITTER_STAGES}
+                if len(tails) == 2:
+                    print_jitter(name, tails[False], tails[True])
+                if args.power:
+                    print_power(name, active, run_power_off(apps, stats, name, args, aloop))
+        finally:
+            for proc in load:
+                proc.kill()
+                proc.wait()
+    finally:
+        fake[0].terminate()
+        daemon.terminate()
+        fake[0].wait()
+        daemon.wait()
+
+
+if __name__ == '__main__':
+    main()
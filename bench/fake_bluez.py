@@ -0,0 +1,163 @@
+import dbus, dbus.exceptions, dbus.mainloop.glib, dbus.service
+from gi.repository import GLib
+import sys, argparse
+
+from bluez import (BLUEZ_SERVICE, ADAPTER_IFACE, LE_ADVERTISING_MANAGER_IFACE,
+                   LE_ADVERTISEMENT_IFACE, GATT_MANAGER_IFACE, GATT_CHRC_IFACE,
+                   DBUS_OM_IFACE, DBUS_PROP_IFACE)
+
+
+# 벤치마크용 가짜 BlueZ
+# 개인 D-Bus 버스에서 org.bluez 이름을 소유하고, 어댑터 하나(--adapters N 이면 N개)처럼 동작
+#  - RegisterApplication: 실제 BlueZ 처럼 GetManagedObjects 호출 후 notify 특성에 StartNotify (호스트 구독 흉내)
+#  - RegisterAdvertisement: GetAll 로 광고 속성 조회
+#  - PropertiesChanged(Value) 시그널 개수를 세고 Stats1 인터페이스로 조회 가능
+#  - 어댑터마다 등록한 애플리케이션의 시그널을 따로 받아 셈 (실제 BlueZ 가 어댑터별로 연결에 알림을 보내는 것 흉내)
+#    Delivered() 로 어댑터별 개수 조회 - 여러 어댑터 모드에서 리포트가 모든 어댑터에 전달되는지 확인
+STATS_IFACE = 'org.bluez.bench.Stats1'
+ADAPTER_PATH_BASE = '/org/bluez/hci'
+
+
+class FakeRoot(dbus.service.Object):
+    def __init__(self, bus, adapters):
+        self.adapters = adapters
+        self.count = 0
+        self.per_path = {}
+        dbus.service.Object.__init__(self, bus, '/')
+        bus.add_signal_receiver(self.on_properties_changed,
+                                signal_name='PropertiesChanged',
+                                dbus_interface=DBUS_PROP_IFACE,
+                                path_keyword='path')
+
+    def on_properties_changed(self, interface, changed, invalidated, path=None):
+        if interface != GATT_CHRC_IFACE or 'Value' not in changed:
+            return
+        self.count += 1
+        self.per_path[path] = self.per_path.get(path, 0) + 1
+
+    @dbus.service.method(DBUS_OM_IFACE, out_signature='a{oa{sa{sv}}}')
+    def GetManagedObjects(self):
+        response = {}
+        for adapter in self.adapters:
+            response[adapter.get_path()] = adapter.get_properties()
+        return response
+
+    @dbus.service.method(STATS_IFACE, out_signature='ua{su}')
+    def Counts(self):
+        return dbus.UInt32(self.count), {str(k): dbus.UInt32(v) for k, v in self.per_path.items()}
+
+    @dbus.service.method(STATS_IFACE, out_signature='a{su}')
+    def Delivered(self):
+        return {adapter.path: dbus.UInt32(adapter.delivered) for adapter in self.adapters}
+
+    @dbus.service.method(STATS_IFACE)
+    def Reset(self):
+        self.count = 0
+        self.per_path = {}
+        for adapter in self.adapters:
+            adapter.delivered = 0
+
+
+class FakeAdapter(dbus.service.Object):
+    def __init__(self, bus, index):
+        self.path = ADAPTER_PATH_BASE + str(index)
+        self.bus = bus
+        self.index = index
+        self.apps = {}
+        self.ads = {}
+        self.delivered = 0     # 이 어댑터에 등록된 애플리케이션에서 받은 알림 수
+        self._matches = {}     # (sender, 앱 경로) -> 시그널 수신 등록
+        dbus.service.Object.__init__(self, bus, self.path)
+
+    def get_path(self):
+        return dbus.ObjectPath(self.path)
+
+    def get_properties(self):
+        return {
+            ADAPTER_IFACE: {
+                'Address': dbus.String('00:00:00:00:00:%02X' % self.index),
+                'Powered': dbus.Boolean(True),
+            },
+            GATT_MANAGER_IFACE: {},
+            LE_ADVERTISING_MANAGER_IFACE: {},
+        }
+
+    @dbus.service.method(DBUS_PROP_IFACE, in_signature='ss', out_signature='v')
+    def Get(self, interface, name):
+        try:
+            return self.get_properties()[interface][name]
+        except KeyError:
+            raise dbus.exceptions.DBusException('org.freedesktop.DBus.Error.InvalidArgs')
+
+    @dbus.service.method(GATT_MANAGER_IFACE, in_signature='oa{sv}',
+                         sender_keyword='sender', async_callbacks=('ok', 'err'))
+    def RegisterApplication(self, app_path, options, sender=None, ok=None, err=None):
+        om = dbus.Interface(self.bus.get_object(sender, app_path), DBUS_OM_IFACE)
+
+        def on_objects(objects):
+            self.apps[(sender, app_path)] = objects
+            if (sender, app_path) not in self._matches:
+                self._matches[(sender, app_path)] = self.bus.add_signal_receiver(
+                    self.on_notification, signal_name='PropertiesChanged', dbus_interface=DBUS_PROP_IFACE,
+                    sender_keyword='sender', path_keyword='path')
+            # 호스트가 연결되어 notify 특성을 모두 구독한 상태를 흉내냄
+            for path, ifaces in objects.items():
+                chrc = ifaces.get(GATT_CHRC_IFACE)
+                if chrc and 'notify' in chrc.get('Flags', []):
+                    dbus.Interface(self.bus.get_object(sender, path), GATT_CHRC_IFACE).StartNotify(
+                        reply_handler=lambda: None, error_handler=lambda e: None)
+            ok()
+
+        om.GetManagedObjects(reply_handler=on_objects, error_handler=err)
+
+    @dbus.service.method(GATT_MANAGER_IFACE, in_signature='o', sender_keyword='sender')
+    def UnregisterApplication(self, app_path, sender=None):
+        self.apps.pop((sender, app_path), None)
+        match = self._matches.pop((sender, app_path), None)
+        if match is not None:
+            match.remove()
+
+    def on_notification(self, interface, changed, invalidated, sender=None, path=None):
+        if interface != GATT_CHRC_IFACE or 'Value' not in changed:
+            return
+        for (app_sender, _app_path), objects in self.apps.items():
+            if sender == app_sender and path in objects:
+                self.delivered += 1
+                return
+
+    @dbus.service.method(LE_ADVERTISING_MANAGER_IFACE, in_signature='oa{sv}',
+                         sender_keyword='sender', async_callbacks=('ok', 'err'))
+    def RegisterAdvertisement(self, ad_path, options, sender=None, ok=None, err=None):
+        props = dbus.Interface(self.bus.get_object(sender, ad_path), DBUS_PROP_IFACE)
+
+        def on_props(values):
+            self.ads[(sender, ad_path)] = values
+            ok()
+
+        props.GetAll(LE_ADVERTISEMENT_IFACE, reply_handler=on_props, error_handler=err)
+
+    @dbus.service.method(LE_ADVERTISING_MANAGER_IFACE, in_signature='o', sender_keyword='sender')
+    def UnregisterAdvertisement(self, ad_path, sender=None):
+        self.ads.pop((sender, ad_path), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='벤치마크용 가짜 BlueZ')
+    parser.add_argument('--address', required=True, help='개인 D-Bus 버스 주소')
+    parser.add_argument('--adapters', type=int, default=1, help='가짜 어댑터 개수')
+    args = parser.parse_args()
+
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    bus = dbus.bus.BusConnection(args.address)
+    adapters = [FakeAdapter(bus, i) for i in range(args.adapters)]
+    root = FakeRoot(bus, adapters)
+    name = dbus.service.BusName(BLUEZ_SERVICE, bus)   # 이름 소유 유지
+    print(f"가짜 BlueZ 준비됨 (어댑터 {len(adapters)}개)", file=sys.stderr)
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
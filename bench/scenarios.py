@@ -0,0 +1,48 @@
+from evdev_reader import (INPUT_EVENT, EV_SYN, EV_KEY, EV_REL, SYN_REPORT,
+                          REL_X, REL_Y, REL_WHEEL, BTN_LEFT, BTN_RIGHT)
+
+
+# 합성 input_event 스트림 (1000Hz 마우스 기준, 프레임마다 1ms 증가)
+# 각 함수는 EvdevReader 가 그대로 읽을 수 있는 바이너리(bytes)를 반환
+
+def _pack(frames):
+    out = bytearray()
+    pack = INPUT_EVENT.pack
+    for i, events in enumerate(frames):
+        sec, usec = divmod(i * 1000, 1000000)
+        for etype, code, value in events:
+            out += pack(sec, usec, etype, code, value)
+        out += pack(sec, usec, EV_SYN, SYN_REPORT, 0)
+    return bytes(out)
+
+
+def steady(n):
+    # 일정한 속도로 대각선 이동
+    return _pack([((EV_REL, REL_X, 3), (EV_REL, REL_Y, 1))] * n)
+
+
+def flick(n):
+    # 10프레임마다 큰 움직임 (±127 초과 -> 분할/이월 경로)
+    frames = []
+    for i in range(n):
+        if i % 10 == 0:
+            frames.append(((EV_REL, REL_X, 600), (EV_REL, REL_Y, -450)))
+        else:
+            frames.append(((EV_REL, REL_X, 2),))
+    return _pack(frames)
+
+
+def button_storm(n):
+    # 좌/우 버튼 연타 + 작은 움직임과 휠
+    frames = []
+    for i in range(n):
+        code = BTN_LEFT if (i // 2) % 2 == 0 else BTN_RIGHT
+        frames.append(((EV_KEY, code, (i + 1) % 2), (EV_REL, REL_X, 1), (EV_REL, REL_WHEEL, i % 2)))
+    return _pack(frames)
+
+
+SCENARIOS = {
+    'steady': steady,
+    'flick': flick,
+    'buttons': button_storm,
+}
@@ -0,0 +1,13 @@
+# D-Bus 상수
+# https://www.bluez.org/
+# https://github.com/bluez/bluez
+BLUEZ_SERVICE = 'org.bluez'
+ADAPTER_IFACE = 'org.bluez.Adapter1'                
+LE_ADVERTISING_MANAGER_IFACE = 'org.bluez.LEAdvertisingManager1' 
+LE_ADVERTISEMENT_IFACE = 'org.bluez.LEAdvertisement1'    
+GATT_MANAGER_IFACE = 'org.bluez.GattManager1'        
+GATT_SERVICE_IFACE = 'org.bluez.GattService1'         
+GATT_CHRC_IFACE = 'org.bluez.GattCharacteristic1'     
+DBUS_OM_IFACE = 'org.freedesktop.DBus.ObjectManager'  
+DBUS_PROP_IFACE = 'org.freedesktop.DBus.Properties'
+DEVICE_IFACE = 'org.bluez.Device1'
@@ -0,0 +1,168 @@
+import os, sys, mmap, time, struct, threading
+
+from evdev_reader import INPUT_EVENT, EVENT_SIZE, MouseDecoder
+from tracing import TRACE, now_us
+
+
+# 입력 녹화/재생 (현장 문제 재현, 마우스 없이 부하 시험)
+#
+# 녹화 파일 형식 (리틀 엔디언)
+#   헤더: MAGIC 8바이트 + input_event 크기 (I)
+#   청크: (장치 번호 H, 종류 H, 바이트 수 I) + read() 로 읽은 input_event 원본 그대로
+# 라이브 경로에서는 이벤트마다 다시 패킹하지 않고 read() 버퍼를 통째로 버퍼링된 파일에 씀
+# (input_event 는 네이티브 정렬이라 같은 아키텍처(64비트/32비트)에서만 재생 가능 - 헤더로 확인)
+MAGIC = b'EVCAP01\0'
+HEADER = struct.Struct('<8sI')
+CHUNK = struct.Struct('<HHI')
+
+# 청크 종류 비트 (input_manager 의 KIND_* 이름 -> 비트)
+POINTER = 0x01
+KEYBOARD = 0x02
+KIND_BITS = {'pointer': POINTER, 'keyboard': KEYBOARD}
+
+# 파일 버퍼 크기 - 꽉 찰 때만 write() 시스템 콜 (1000Hz 마우스 기준 수 초 분량)
+CAPTURE_BUFFER = 1 << 20
+
+
+class CaptureWriter:
+    # 장치별 EvdevReader 에 붙여 read_batch() 가 읽은 바이트를 그대로 기록
+    # write() 는 리더 스레드, close() 는 메인 스레드 - 잠금으로 닫는 중인 파일에 쓰지 않게 함
+    # (잠금은 청크마다 한 번, 경쟁은 종료 때만 있음)
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb', buffering=CAPTURE_BUFFER)
+        self.file.write(HEADER.pack(MAGIC, EVENT_SIZE))
+        self.devices = {}   # 리더 경로 -> 장치 번호
+        self.chunks = 0
+        self._lock = threading.Lock()
+
+    def attach(self, reader, kinds):
+        # kinds: input_manager 의 KIND_* 집합 (재생 시 포인터/키보드 구분용)
+        dev = self.devices.setdefault(reader.path, len(self.devices))
+        flags = 0
+        for kind in kinds:
+            flags |= KIND_BITS.get(kind, 0)
+        reader.capture = self
+        reader.capture_dev = dev
+        reader.capture_kinds = flags
+        print(f"[녹화] 장치 {dev}: {reader.path}")
+
+    def write(self, dev, kinds, data):
+        with self._lock:
+            if self.file.closed:
+                return   # 종료 중 (리더 스레드가 아직 읽는 경우)
+            self.file.write(CHUNK.pack(dev, kinds, len(data)))
+            self.file.write(data)
+            self.chunks += 1
+
+    def close(self):
+        # 진행 중인 write() 가 청크를 다 쓴 뒤에 닫음 (버퍼 비우기 도중 닫혀 청크가 잘리지 않도록)
+        with self._lock:
+            if self.file.closed:
+                return
+            self.file.close()
+        print(f"[녹화] {self.path}: 청크 {self.chunks}개, {os.path.getsize(self.path)} 바이트")
+
+
+class Replay:
+    # 녹화 파일을 mmap 으로 읽어 청크 단위로 재생
+    #  speed: 1.0 = 원래 시간 간격, N = N배속, 0 = 최대 속도 (대기 없음)
+    # 재생 중 프레임의 타임스탬프는 재생 시각 기준으로 바꿔서 내보냄 (지연 추적이 의미 있도록)
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        self.frame_count = 0   # 내보낸 마우스 프레임 수
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, event_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'녹화 파일이 아님: {path}')
+        if event_size != EVENT_SIZE:
+            raise ValueError(f'input_event 크기가 다름 (파일 {event_size}, 이 시스템 {EVENT_SIZE})')
+
+    def close(self):
+        self._mm.close()
+
+    def chunks(self):
+        # (장치 번호, 종류, 타임스탬프 보정값 µs, input_event 이터레이터)
+        mm = self._mm
+        view = memoryview(mm)
+        speed = self.speed
+        offset = HEADER.size
+        end = len(mm)
+        t0 = start = None
+        try:
+            while offset + CHUNK.size <= end:
+                dev, kinds, n = CHUNK.unpack_from(mm, offset)
+                offset += CHUNK.size
+                if n == 0 or offset + n > end:
+                    break
+                sec, usec = INPUT_EVENT.unpack_from(mm, offset)[:2]
+                ts = sec * 1000000 + usec
+                if t0 is None:
+                    t0, start = ts, now_us()
+                if speed > 0:
+                    target = start + (ts - t0) / speed
+                    wait = target - now_us()
+                    if wait > 0:
+                        time.sleep(wait / 1e6)
+                    shift = int(target) - ts
+                else:
+                    shift = now_us() - ts
+                yield dev, kinds, shift, INPUT_EVENT.iter_unpack(view[offset:offset + n])
+                offset += n
+        finally:
+            view.release()
+
+    def frames(self, on_keyboard=None):
+        # relay_thread 에 넣을 마우스 프레임 (dx, dy, wheel, buttons, ts)
+        # 포인터 장치별로 디코딩하고 버튼은 장치별 상태를 OR (InputManager 와 같음)
+        # on_keyboard 가 있으면 키보드 청크의 이벤트를 그대로 전달
+        decoders = {}
+        buttons = {}
+        combined = 0
+        tracing = TRACE.enabled
+        for dev, kinds, shift, events in self.chunks():
+            if kinds & KEYBOARD and on_keyboard is not None:
+                if kinds & POINTER:
+                    events = list(events)
+                on_keyboard(events)
+            if not kinds & POINTER:
+                continue
+            decoder = decoders.get(dev)
+            if decoder is None:
+                decoder = decoders[dev] = MouseDecoder()
+                buttons[dev] = 0
+            for dx, dy, wheel, btn, ts in decoder.decode(events):
+                if btn != buttons[dev]:
+                    buttons[dev] = btn
+                    combined = 0
+                    for b in buttons.values():
+                        combined |= b
+                ts += shift
+                if tracing:
+                    TRACE.record('read', now_us() - ts)
+                self.frame_count += 1
+                yield dx, dy, wheel, combined, ts
+
+
+# ---------- 재생 처리량 측정 ----------
+# python capture.py <녹화 파일> [배속, 0 = 최대]
+def _bench(path, speed='0'):
+    replay = Replay(path, float(speed))
+    t0 = time.perf_counter()
+    for _ in replay.frames():
+        pass
+    n = replay.frame_count
+    elapsed = time.perf_counter() - t0
+    replay.close()
+    print(f"{path}: 프레임 {n}개, {elapsed * 1000:.1f} ms ({n / elapsed if elapsed else 0:.0f} 프레임/s)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("사용법: python capture.py <녹화 파일> [배속, 0 = 최대]")
+        sys.exit(1)
+    _bench(*sys.argv[1:3])
@@ -0,0 +1,346 @@
+import threading
+from gi.repository import GLib
+
+from tracing import TRACE, now_us
+from hid_descriptor import S8_LIMIT   # 부호 있는 8비트 리포트 필드 범위 [-127, 127]
+
+# BLE HID 연결 간격 기본값 (ms) - 호스트가 보통 7.5 ~ 15ms 로 설정
+DEFAULT_INTERVAL_MS = 15
+
+# 입력 -> 알림 사이 대기열 (고정 크기 링 버퍼) 정책
+#  merge       : 같은 버튼 상태의 움직임은 가장 최근 슬롯에 합침 (움직임 손실 없음, 밀린 만큼 이어서 전송)
+#                가득 차면 버튼 전환이 아닌 가장 오래된 슬롯의 움직임을 다음 슬롯에 넘기고 비움 (버튼 전환은 유지)
+#  drop-oldest : 프레임마다 슬롯 하나, 가득 차면 가장 오래된 슬롯을 버림 (지연 후 바로 따라잡음)
+#  keep-buttons: drop-oldest 와 같지만 버튼 전환 슬롯은 버리지 않고 움직임만 있는 슬롯을 먼저 버림
+# merge/keep-buttons 에서 모든 슬롯이 버튼 전환이면 새 입력은 같은 버튼 상태일 때 가장 최근 슬롯에 움직임만 합치고,
+# 새 입력도 전환이면 대기열을 늘림 (버튼 전환은 버리지 않음) - held 로 셈
+# 키보드/미디어 키 리포트는 키 전환이라 버리지 않음 - 같은 리포트가 이어지면 합치고, 가득 차면 대기열을 늘림
+POLICY_MERGE = 'merge'
+POLICY_DROP_OLDEST = 'drop-oldest'
+POLICY_KEEP_BUTTONS = 'keep-buttons'
+QUEUE_POLICIES = (POLICY_MERGE, POLICY_DROP_OLDEST, POLICY_KEEP_BUTTONS)
+DEFAULT_POLICY = POLICY_KEEP_BUTTONS
+DEFAULT_QUEUE_SIZE = 64
+
+# 마우스 슬롯 필드
+DX, DY, WHEEL, BUTTONS, TS = range(5)
+
+# 한 슬롯에서 보낼 수 있는 최대 리포트 수 - 밀린 움직임이 ±limit 를 넘으면 나눈 리포트를 한꺼번에 보내 바로 따라잡음
+# (멈춤 후 밀린 움직임을 간격마다 하나씩 재생하지 않도록, 넘는 부분만 다음 슬롯으로 이월)
+MAX_BURST = 32
+
+
+def _split(n, limit):
+    # limit 범위만큼만 잘라내고 나머지는 다음 리포트로 넘김
+    if n > limit:
+        return limit
+    if n < -limit:
+        return -limit
+    return n
+
+
+class ReportRing:
+    # 고정 크기 링 버퍼 - 슬롯(리스트)을 미리 만들어 두고 재사용 (push 마다 할당 없음)
+    # 꺼낸 슬롯은 다음 append 때 덮어쓰이므로 잠금 안에서 바로 값을 읽어야 함
+
+    def __init__(self, capacity, width):
+        self.slots = [[0] * width for _ in range(capacity)]
+        self.capacity = capacity
+        self.head = 0      # 가장 오래된 슬롯 위치
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def full(self):
+        return self.count == self.capacity
+
+    def at(self, i):
+        return self.slots[(self.head + i) % self.capacity]
+
+    def newest(self):
+        return self.at(self.count - 1)
+
+    def append(self):
+        # 비어 있는 슬롯을 뒤에 추가해 돌려줌 (가득 차 있으면 먼저 비워야 함)
+        slot = self.at(self.count)
+        self.count += 1
+        return slot
+
+    def appendleft(self):
+        # 방금 꺼낸 슬롯 자리를 다시 앞에 추가 (이월분 되돌리기)
+        self.head = (self.head - 1) % self.capacity
+        self.count += 1
+        return self.slots[self.head]
+
+    def popleft(self):
+        slot = self.slots[self.head]
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        return slot
+
+    def remove(self, i):
+        # i 번째 슬롯 제거 - 뒤 슬롯을 한 칸씩 당김 (가득 찼을 때만 호출되므로 드묾)
+        slots, cap = self.slots, self.capacity
+        for j in range(i, self.count - 1):
+            a = (self.head + j) % cap
+            b = (a + 1) % cap
+            slots[a], slots[b] = slots[b], slots[a]
+        self.count -= 1
+
+    def grow(self):
+        # 용량을 두 배로 - 버리면 안 되는 전환이 대기열을 채운 경우에만
+        self.resize(self.capacity * 2)
+
+    def resize(self, capacity):
+        # 순서를 유지한 채 용량 변경 (대기 중인 슬롯보다 작게는 줄이지 않음)
+        capacity = max(capacity, self.count)
+        width = len(self.slots[0])
+        self.slots = [self.at(i) for i in range(self.count)] + \
+                     [[0] * width for _ in range(capacity - self.count)]
+        self.capacity = capacity
+        self.head = 0
+
+    def clear(self):
+        self.head = self.count = 0
+
+
+class MotionCoalescer:
+    # 리더 스레드 -> push() 로 움직임을 대기열(ReportRing)에 추가, push_report() 로 키보드/미디어 키 리포트 추가
+    # GLib 메인 루프 -> 알림 슬롯(interval_ms)마다 리포트 1개 전송 (마우스/키보드가 같은 예산을 나눠 씀)
+    # 전송 시 가장 오래된 슬롯부터 버튼 상태가 같은 슬롯을 모두 합쳐 리포트 하나로 보냄 (버튼 전환마다 리포트 분리)
+    # ±limit(X/Y), ±wheel_limit(휠) 을 넘는 움직임은 버리지 않고 나눈 리포트로 같은 슬롯에 한꺼번에 보냄 (MAX_BURST 초과분만 이월)
+    # 대기열 크기는 고정 - 넘치면 정책(policy)에 따라 합치거나 버리고 merged/dropped 로 셈
+    # ready() 가 거짓이면 (알림 구독 전, 호스트 전환 중) 대기열에 넣지 않고 버림
+
+    # schedule(ms, fn): 타이머 등록 (기본 GLib.timeout_add, asyncio 런타임은 loop.call_later)
+    # inline=True: push 와 전송이 같은 스레드(asyncio 런타임)일 때 슬롯이 비어 있으면 바로 전송
+
+    def __init__(self, send, interval_ms=DEFAULT_INTERVAL_MS, limit=S8_LIMIT, wheel_limit=S8_LIMIT,
+                 schedule=None, inline=False, policy=DEFAULT_POLICY, queue_size=DEFAULT_QUEUE_SIZE,
+                 ready=None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f'알 수 없는 대기열 정책: {policy}')
+        self.send = send                 # send(buttons, dx, dy, wheel)
+        self.schedule = schedule or GLib.timeout_add
+        self.inline = inline
+        self.interval_ms = interval_ms
+        self.limit = limit
+        self.wheel_limit = wheel_limit
+        self.policy = policy
+        self.ready = ready
+        self.merged = 0                  # 기존 슬롯에 합쳐진 입력 수
+        self.dropped = 0                 # 버린 입력/리포트 수
+        self.held = 0                    # 모든 슬롯이 전환이라 버리지 않고 합치거나 대기열을 늘린 수
+        self._lock = threading.Lock()
+        self._mouse = ReportRing(queue_size, 5)   # [dx, dy, wheel, buttons, ts]
+        self._keys = ReportRing(queue_size, 2)    # [send, 리포트] - 키보드/미디어 키 (순서 유지)
+        self._buttons = 0                # 마지막으로 전송한 버튼 상태
+        self._keys_turn = True           # 둘 다 대기 중이면 키보드/마우스 번갈아 전송
+        self._armed = False
+        self._last_sent_us = 0
+        self._queued_us = 0              # 대기 시작 시각 (추적용)
+
+    def push(self, dx, dy, wheel, buttons, ts=0):
+        with self._lock:
+            if self.ready is not None and not self.ready():
+                self.dropped += 1
+                return
+            ring = self._mouse
+            if TRACE.enabled and not self._queued_us:
+                self._queued_us = now_us()
+            if ring.count and self.policy == POLICY_MERGE and ring.newest()[BUTTONS] == buttons:
+                self._merge(ring.newest(), dx, dy, wheel, buttons)
+            else:
+                if ring.full() and not self._make_room(ring):
+                    # 모든 슬롯이 버튼 전환 - 하나도 버리지 않음 (새 입력도 전환이면 대기열을 늘림)
+                    self.held += 1
+                    if ring.newest()[BUTTONS] != buttons:
+                        ring.grow()
+                if ring.full():
+                    # 같은 버튼 상태 - 가장 최근 슬롯에 움직임만 합침
+                    slot = ring.newest()
+                    slot[DX] += dx
+                    slot[DY] += dy
+                    slot[WHEEL] += wheel
+                else:
+                    slot = ring.append()
+                    slot[DX] = dx
+                    slot[DY] = dy
+                    slot[WHEEL] = wheel
+                    slot[BUTTONS] = buttons
+                    slot[TS] = ts
+            if self._armed:
+                return
+            self._armed = True
+        self._arm()
+
+    def _merge(self, slot, dx, dy, wheel, buttons):
+        slot[DX] += dx
+        slot[DY] += dy
+        slot[WHEEL] += wheel
+        slot[BUTTONS] = buttons
+        self.merged += 1
+
+    def _make_room(self, ring):
+        # 가득 찬 대기열에서 슬롯 하나 비우기 (새 입력은 새 슬롯으로 - 버튼 상태를 덮어쓰지 않음)
+        # merge/keep-buttons: 버튼 상태가 앞 슬롯과 같은(전환이 아닌) 가장 오래된 슬롯
+        # 그런 슬롯이 없으면(모두 전환) 비우지 않고 False
+        index = 0
+        if self.policy != POLICY_DROP_OLDEST:
+            prev = self._buttons
+            for i in range(ring.count):
+                cur = ring.at(i)[BUTTONS]
+                if cur == prev:
+                    index = i
+                    break
+                prev = cur
+            else:
+                return False
+        if self.policy == POLICY_MERGE and index + 1 < ring.count:
+            # 움직임은 버리지 않고 다음 슬롯으로 넘김
+            slot, nxt = ring.at(index), ring.at(index + 1)
+            nxt[DX] += slot[DX]
+            nxt[DY] += slot[DY]
+            nxt[WHEEL] += slot[WHEEL]
+            self.merged += 1
+        else:
+            self.dropped += 1
+        if index == 0:
+            ring.popleft()
+        else:
+            ring.remove(index)
+        return True
+
+    def push_report(self, send, report):
+        # send(report) 로 그대로 전송할 리포트 (상태 변화마다 하나씩)
+        # 누름/뗌을 하나라도 버리면 입력한 글자가 사라지므로 버리지 않음:
+        # 바로 앞 리포트와 같으면 합치고, 가득 차면 대기열을 늘림 (사람이 치는 속도라 드묾)
+        with self._lock:
+            if self.ready is not None and not self.ready():
+                self.dropped += 1
+                return
+            ring = self._keys
+            if ring.count and ring.newest()[0] == send and ring.newest()[1] == report:
+                self.merged += 1
+                return
+            if ring.full():
+                ring.grow()
+                self.held += 1
+            slot = ring.append()
+            slot[0] = send
+            slot[1] = report
+            if self._armed:
+                return
+            self._armed = True
+        self._arm()
+
+    def set_queue_size(self, queue_size):
+        # 프로파일 변경 - 대기 중인 입력은 유지
+        with self._lock:
+            self._mouse.resize(queue_size)
+            self._keys.resize(queue_size)
+
+    def _arm(self):
+        # 마지막 전송 후 interval 이 지났으면 바로, 아니면 남은 시간 뒤에 전송
+        delay_ms = self.interval_ms - (GLib.get_monotonic_time() - self._last_sent_us) // 1000
+        if delay_ms <= 0 and self.inline:
+            self._tick()
+        else:
+            self.schedule(max(0, delay_ms), self._tick)
+
+    @property
+    def last_sent_us(self):
+        # 마지막 전송 시각 (GLib 단조 시계) - 절전의 idle 판정용
+        return self._last_sent_us
+
+    def pending(self):
+        with self._lock:
+            return bool(self._mouse.count or self._keys.count)
+
+    def _drop_pending(self):
+        self.dropped += self._mouse.count + self._keys.count
+        self._mouse.clear()
+        self._keys.clear()
+        self._queued_us = 0
+
+    def _tick(self):
+        limit = self.limit
+        tracing = False
+        with self._lock:
+            mouse, keys = self._mouse, self._keys
+            if self.ready is not None and not self.ready():
+                # 대기 중에 알림이 꺼짐 - 오래된 입력을 나중에 몰아서 보내지 않도록 버림
+                self._drop_pending()
+                self._armed = False
+                return False
+            if not mouse.count and not keys.count:
+                self._armed = False
+                return False
+            if keys.count and (self._keys_turn or not mouse.count):
+                slot = keys.popleft()
+                send_report, report = slot[0], slot[1]
+                slot[0] = slot[1] = None
+                self._keys_turn = False
+                more = bool(mouse.count or keys.count)
+            else:
+                report = None
+                self._keys_turn = True
+                # 가장 오래된 슬롯부터 버튼 상태가 같은 슬롯을 모두 합침
+                slot = mouse.popleft()
+                dx, dy, wheel, buttons, oldest_ts = slot
+                while mouse.count and mouse.at(0)[BUTTONS] == buttons:
+                    slot = mouse.popleft()
+                    dx += slot[DX]
+                    dy += slot[DY]
+                    wheel += slot[WHEEL]
+                self._buttons = buttons
+                # ±limit 로 나눈 리포트를 이번 슬롯에 한꺼번에 (밀린 움직임을 간격마다 나눠 재생하지 않음)
+                burst = []
+                while True:
+                    send_dx = _split(dx, limit)
+                    send_dy = _split(dy, limit)
+                    send_wheel = _split(wheel, self.wheel_limit)
+                    burst.append((buttons, send_dx, send_dy, send_wheel))
+                    dx -= send_dx
+                    dy -= send_dy
+                    wheel -= send_wheel
+                    if not (dx or dy or wheel) or len(burst) == MAX_BURST:
+                        break
+                if dx or dy or wheel:
+                    # MAX_BURST 를 넘는 이월분은 같은 버튼 상태로 대기열 맨 앞에 되돌림
+                    slot = mouse.appendleft()
+                    slot[DX] = dx
+                    slot[DY] = dy
+                    slot[WHEEL] = wheel
+                    slot[BUTTONS] = buttons
+                    slot[TS] = oldest_ts
+                mouse_more = bool(mouse.count)
+                more = mouse_more or bool(keys.count)
+                tracing = TRACE.enabled
+                if tracing:
+                    queued_us = self._queued_us
+                    # 남은 움직임은 이번 슬롯부터 다시 대기한 것으로 봄
+                    self._queued_us = now_us() if mouse_more else 0
+            self._armed = more
+        self._last_sent_us = GLib.get_monotonic_time()
+        if report is not None:
+            send_report(report)
+        else:
+            if tracing and queued_us:
+                TRACE.record('queue', now_us() - queued_us)
+            for sent in burst:
+                self.send(*sent)
+            if tracing and oldest_ts:
+                TRACE.record('total', now_us() - oldest_ts)
+        if more:
+            self.schedule(self.interval_ms, self._tick)
+        return False
+
+    # ---------- 제어 명령 ----------
+    def cmd_queue(self, args):
+        if args and args[0] == 'reset':
+            self.merged = self.dropped = self.held = 0
+        return (f"정책 {self.policy}: 대기 마우스 {self._mouse.count}/{self._mouse.capacity}, "
+                f"키 {self._keys.count}/{self._keys.capacity}, 병합 {self.merged}, 버림 {self.dropped}, "
+                f"전환 유지 {self.held}")
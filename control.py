@@ -0,0 +1,91 @@
+import os, sys, socket
+from gi.repository import GLib
+
+
+# 실행 중인 허브 제어용 Unix 소켓 (한 줄 명령 -> 텍스트 응답)
+#   python3 control.py hosts
+#   python3 control.py switch 2
+#   python3 control.py --socket /run/ble-hub.sock.hci1 hosts   (샤딩 작업 프로세스 등 다른 소켓)
+CONTROL_SOCKET = '/run/ble-hub.sock'
+
+
+class ControlServer:
+    # GLib 메인 루프에서 동작 - 명령 처리 함수는 메인 루프 스레드에서 호출됨
+
+    def __init__(self, path=CONTROL_SOCKET):
+        self.path = path
+        self.commands = {}   # 이름 -> fn(args) -> 응답 문자열
+        self.sock = None
+
+    def register(self, name, fn):
+        self.commands[name] = fn
+
+    def start(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        os.chmod(self.path, 0o660)
+        self.sock.listen(4)
+        self.sock.setblocking(False)
+        GLib.io_add_watch(self.sock.fileno(), GLib.IO_IN, self._on_accept)
+
+    def stop(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _on_accept(self, fd, condition):
+        if self.sock is None:
+            return False
+        try:
+            conn, _ = self.sock.accept()
+        except BlockingIOError:
+            return True
+        with conn:
+            conn.settimeout(1.0)
+            try:
+                line = conn.recv(1024).decode(errors='replace').strip()
+                conn.sendall((self.handle(line) + '\n').encode())
+            except OSError:
+                pass
+        return True
+
+    def handle(self, line):
+        parts = line.split()
+        if not parts:
+            return f"명령: {', '.join(sorted(self.commands))}"
+        fn = self.commands.get(parts[0])
+        if fn is None:
+            return f"알 수 없는 명령: {parts[0]} (가능: {', '.join(sorted(self.commands))})"
+        try:
+            return fn(parts[1:])
+        except Exception as e:
+            return f"오류: {e}"
+
+
+def send_command(line, path=CONTROL_SOCKET):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(line.encode())
+        chunks = []
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            chunks.append(data)
+    return b''.join(chunks).decode(errors='replace')
+
+
+if __name__ == '__main__':
+    argv = sys.argv[1:]
+    path = CONTROL_SOCKET
+    if argv[:1] == ['--socket'] and len(argv) > 1:
+        path, argv = argv[1], argv[2:]
+    print(send_command(' '.join(argv), path), end='')
@@ -0,0 +1,249 @@
+import os, sys, struct, time, itertools
+import fcntl
+
+from tracing import TRACE, now_us
+
+
+# linux/input.h 상수
+# https://github.com/torvalds/linux/blob/master/include/uapi/linux/input-event-codes.h
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_REL = 0x02
+SYN_REPORT = 0x00
+SYN_DROPPED = 0x03
+
+REL_X = 0x00
+REL_Y = 0x01
+REL_WHEEL = 0x08
+
+BTN_LEFT = 0x110
+BTN_RIGHT = 0x111
+BTN_MIDDLE = 0x112
+
+# 버튼 코드 -> 리포트 비트 (get_mouse_sensor.c 와 동일)
+BUTTON_BITS = {BTN_LEFT: 0x01, BTN_RIGHT: 0x02, BTN_MIDDLE: 0x04}
+
+# struct input_event { struct timeval time; __u16 type; __u16 code; __s32 value; }
+# 네이티브 정렬 사용: 64비트 24바이트, 32비트 16바이트
+INPUT_EVENT = struct.Struct('@llHHi')
+EVENT_SIZE = INPUT_EVENT.size
+
+# 이벤트 타임스탬프를 CLOCK_MONOTONIC 으로 (지연 추적에서 time.monotonic 과 비교)
+# EVIOCSCLOCKID = _IOW('E', 0xa0, int)
+EVIOCSCLOCKID = 0x400445a0
+CLOCK_MONOTONIC = 1
+
+# 현재 눌린 키/버튼 비트맵 - EVIOCGKEY(len) = _IOC(_IOC_READ, 'E', 0x18, len)
+KEY_MAX = 0x2ff
+KEY_BITMAP_LEN = (KEY_MAX + 8) // 8
+EVIOCGKEY = (2 << 30) | (KEY_BITMAP_LEN << 16) | (ord('E') << 8) | 0x18
+
+# 한 번의 read() 로 가져올 이벤트 수
+DEFAULT_BATCH = 64
+
+# 절전(power.py)으로 버린 배치 - read_batch 가 이것을 돌려주면 읽기는 했지만 처리할 이벤트 없음
+DISCARDED = ()
+# 버린 뒤 처음 처리하는 배치 앞에 붙이는 이벤트 - 커널 버퍼가 넘친 경우와 같이 디코더가 상태를 다시 맞춤
+DROPPED_EVENTS = ((0, 0, EV_SYN, SYN_DROPPED, 0),)
+
+
+class EvdevReader:
+    # evdev 노드(/dev/input/eventN) 또는 녹화된 바이너리 이벤트 파일을 직접 읽음
+    # 버퍼는 재사용하며 read() 한 번에 여러 input_event 를 가져와 한꺼번에 디코딩
+    # gate(power.PowerManager): parked 이면 배치마다 gate.input() 으로 처리할지 물음 (False 면 버림)
+
+    def __init__(self, path, batch=DEFAULT_BATCH, nonblock=False, gate=None):
+        self.path = path
+        self.gate = gate
+        self.dropped = False   # 버린 배치가 있음 - 다음 배치 앞에 SYN_DROPPED
+        flags = os.O_RDONLY | os.O_CLOEXEC
+        if nonblock:
+            flags |= os.O_NONBLOCK   # epoll/selectors 로 여러 장치를 함께 읽을 때
+        self.fd = os.open(path, flags)
+        self._buf = bytearray(EVENT_SIZE * batch)
+        self._view = memoryview(self._buf)
+        self.read_us = 0   # 마지막 read() 반환 시각 (추적용)
+        self.capture = None   # CaptureWriter (capture.py) - 읽은 바이트를 그대로 녹화
+        self.capture_dev = self.capture_kinds = 0
+        try:
+            fcntl.ioctl(self.fd, EVIOCSCLOCKID, struct.pack('i', CLOCK_MONOTONIC))
+        except OSError:
+            pass   # 녹화 파일 등 evdev 노드가 아닌 경우
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_batch(self):
+        # read() 한 번 -> (sec, usec, type, code, value) 이터레이터, EOF 이면 None
+        # 반환된 이터레이터는 내부 버퍼를 참조하므로 다음 read_batch 전에 소비해야 함
+        # nonblock 모드에서 읽을 것이 없으면 BlockingIOError, 절전으로 버렸으면 DISCARDED
+        n = os.readv(self.fd, [self._buf])
+        if n <= 0:
+            return None
+        if TRACE.enabled:
+            self.read_us = now_us()
+        view = self._view[:n - n % EVENT_SIZE]
+        if self.capture is not None:
+            self.capture.write(self.capture_dev, self.capture_kinds, view)
+        gate = self.gate
+        if gate is not None and gate.parked and not gate.input():
+            self.dropped = True
+            return DISCARDED
+        if self.dropped:
+            self.dropped = False
+            return itertools.chain(DROPPED_EVENTS, INPUT_EVENT.iter_unpack(view))
+        return INPUT_EVENT.iter_unpack(view)
+
+    def events(self):
+        gate = self.gate
+        while True:
+            batch = self.read_batch()
+            if batch is None:
+                return
+            if batch is DISCARDED:
+                time.sleep(gate.poll_s)   # 보낼 곳이 없음 - 이벤트가 쌓이게 두고 덜 자주 깨어남
+                continue
+            yield from batch
+
+    def frames(self):
+        if TRACE.enabled:
+            return self._traced_frames()
+        return mouse_frames(self.events(), self.fd)
+
+    def _traced_frames(self):
+        record = TRACE.record
+        for frame in mouse_frames(self.events(), self.fd):
+            read_us = self.read_us
+            record('read', read_us - frame[4])
+            record('parse', now_us() - read_us)
+            yield frame
+
+
+class MouseDecoder:
+    # input_event 스트림 -> SYN_REPORT 단위 (dx, dy, wheel, buttons, 커널 타임스탬프 µs)
+    # 움직임이 없더라도 버튼 상태가 바뀌면 프레임을 내보냄
+    # 상태를 보존하므로 read() 배치 단위로 나눠서 넣어도 됨 (여러 장치를 번갈아 읽는 경우)
+    # SYN_DROPPED (커널 버퍼 넘침, 절전으로 버린 배치): 커널 규칙대로 다음 SYN_REPORT 까지 버린 뒤
+    # fd 에서 EVIOCGKEY 로 실제 버튼 상태를 읽어 달라진 것만 내보냄 (드래그 중 버튼이 떨어지지 않도록)
+    # fd 가 없으면(녹화 파일 재생 등) 상태를 알 수 없으므로 눌린 채 남지 않도록 버튼 해제로 봄
+
+    def __init__(self, fd=-1):
+        self.fd = fd
+        self.buttons = self.dx = self.dy = self.wheel = 0
+        self.reported = 0   # 마지막으로 내보낸 버튼 상태
+        self.changed = self.dropping = False
+
+    def pressed_buttons(self):
+        if self.fd < 0:
+            return 0
+        bitmap = bytearray(KEY_BITMAP_LEN)
+        try:
+            fcntl.ioctl(self.fd, EVIOCGKEY, bitmap)
+        except OSError:
+            return 0   # 장치가 빠졌거나 evdev 노드가 아님
+        buttons = 0
+        for code, bit in BUTTON_BITS.items():
+            if bitmap[code >> 3] & (1 << (code & 7)):
+                buttons |= bit
+        return buttons
+
+    def decode(self, events):
+        buttons, dx, dy, wheel = self.buttons, self.dx, self.dy, self.wheel
+        reported, changed, dropping = self.reported, self.changed, self.dropping
+        for sec, usec, etype, code, value in events:
+            if dropping:
+                # 넘친 뒤 다음 SYN_REPORT 까지는 불완전한 패킷 - 버리고 실제 상태로 다시 맞춤
+                if etype == EV_SYN and code == SYN_REPORT:
+                    dropping = False
+                    buttons = self.pressed_buttons()
+                    if buttons != reported:
+                        reported = buttons
+                        yield 0, 0, 0, buttons, sec * 1000000 + usec
+                continue
+            if etype == EV_REL:
+                if code == REL_X:
+                    dx += value
+                elif code == REL_Y:
+                    dy += value
+                elif code == REL_WHEEL:
+                    wheel += value
+            elif etype == EV_KEY:
+                bit = BUTTON_BITS.get(code)
+                if bit:
+                    buttons = (buttons | bit) if value else (buttons & ~bit)
+                    changed = True
+            elif etype == EV_SYN and code == SYN_REPORT:
+                if dx or dy or wheel or changed:
+                    yield dx, dy, wheel, buttons, sec * 1000000 + usec
+                    reported = buttons
+                    dx = dy = wheel = 0
+                    changed = False
+            elif etype == EV_SYN and code == SYN_DROPPED:
+                # 아직 SYN_REPORT 되지 않은 움직임/버튼 변화는 불완전하므로 버림
+                buttons = reported
+                dx = dy = wheel = 0
+                changed = False
+                dropping = True
+        self.buttons, self.dx, self.dy, self.wheel = buttons, dx, dy, wheel
+        self.reported, self.changed, self.dropping = reported, changed, dropping
+
+
+def mouse_frames(events, fd=-1):
+    return MouseDecoder(fd).decode(events)
+
+
+def helper_frames(stream):
+    # get_mouse_sensor 의 텍스트 출력 "dx dy wheel buttons [타임스탬프µs]\n" -> 같은 형식의 튜플
+    for line in stream:
+        try:
+            fields = list(map(int, line.split()))
+        except ValueError:
+            continue   # 잘못된 줄 무시
+        if len(fields) == 4:
+            fields.append(0)   # 타임스탬프 없는 이전 형식
+        elif len(fields) != 5:
+            continue
+        if TRACE.enabled and fields[4]:
+            TRACE.record('read', now_us() - fields[4])
+        yield tuple(fields)
+
+
+# ---------- 비교 측정 ----------
+# python evdev_reader.py <녹화된 이벤트 파일> [get_mouse_sensor 경로]
+# 같은 파일을 내장 리더와 get_mouse_sensor 파이프로 각각 읽어 처리 시간을 비교
+def _bench(path, helper='./get_mouse_sensor'):
+    t0 = time.perf_counter()
+    with EvdevReader(path) as reader:
+        n_builtin = sum(1 for _ in reader.frames())
+    t_builtin = time.perf_counter() - t0
+    print(f"내장 리더: 프레임 {n_builtin}개, {t_builtin * 1000:.1f} ms")
+
+    if not os.access(helper, os.X_OK):
+        print(f"{helper} 실행 파일이 없어 파이프 경로 측정 생략")
+        return
+    import subprocess   # 비교 측정에서만 사용 (허브 시작 시 임포트하지 않음)
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([helper, path], stdout=subprocess.PIPE,
+                            stdin=subprocess.DEVNULL, text=True)
+    n_helper = sum(1 for _ in helper_frames(proc.stdout))
+    proc.wait()
+    t_helper = time.perf_counter() - t0
+    print(f"get_mouse_sensor 파이프: 프레임 {n_helper}개, {t_helper * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("사용법: python evdev_reader.py <이벤트 파일> [get_mouse_sensor 경로]")
+        sys.exit(1)
+    _bench(*sys.argv[1:3])
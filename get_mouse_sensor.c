@@ -4,6 +4,8 @@
 #include <unistd.h>
 #include <string.h>
 #include <stdlib.h>
+#include <time.h>
+#include <sys/ioctl.h>
 
 int main(int argc, char *argv[])
 {
@@ -11,6 +13,10 @@ int main(int argc, char *argv[])
     int fd = open(devnode, O_RDONLY);
     if (fd < 0) { perror("open"); return 1; }
 
+    /* 타임스탬프를 CLOCK_MONOTONIC 으로 (녹화 파일이면 실패해도 무시) */
+    int clk = CLOCK_MONOTONIC;
+    ioctl(fd, EVIOCSCLOCKID, &clk);
+
     int buttons = 0, dx = 0, dy = 0, wheel = 0;
     struct input_event ev;
 
@@ -24,9 +30,10 @@ int main(int argc, char *argv[])
             else if (ev.code == BTN_RIGHT)  buttons = ev.value ? (buttons | 2) : (buttons & ~2);
             else if (ev.code == BTN_MIDDLE) buttons = ev.value ? (buttons | 4) : (buttons & ~4);
         } else if (ev.type == EV_SYN) {
-            /* dx/dy/wheel 누적값이 있으면 한 줄로 출력 */
+            /* dx/dy/wheel 누적값이 있으면 한 줄로 출력 (마지막 필드: 커널 타임스탬프 µs) */
             if (dx || dy || wheel) {
-                printf("%d %d %d %d\n", dx, dy, wheel, buttons);
+                long long ts = (long long)ev.time.tv_sec * 1000000LL + ev.time.tv_usec;
+                printf("%d %d %d %d %lld\n", dx, dy, wheel, buttons, ts);
                 fflush(stdout);
                 dx = dy = wheel = 0;
             }
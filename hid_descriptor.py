@@ -0,0 +1,208 @@
+import struct
+
+
+# HID 리포트 디스크립터 빌더
+# 마우스/키보드/소비자 제어(미디어 키) 컬렉션을 Report ID 와 함께 하나의 리포트 맵으로 합치고,
+# 같은 정의로부터 각 리포트의 struct 패커를 만들어 둠 (디스크립터와 패킹 형식이 어긋나지 않도록)
+# https://www.usb.org/document-library/device-class-definition-hid-111 (6.2.2 Report Descriptor)
+
+# 짧은 항목(short item) 태그 - 하위 2비트는 데이터 크기
+# Main
+INPUT = 0x80
+COLLECTION = 0xA0
+END_COLLECTION = 0xC0
+# Global
+USAGE_PAGE = 0x04
+LOGICAL_MIN = 0x14
+LOGICAL_MAX = 0x24
+REPORT_SIZE = 0x74
+REPORT_ID = 0x84
+REPORT_COUNT = 0x94
+PUSH = 0xA4
+POP = 0xB4
+# Local
+USAGE = 0x08
+USAGE_MIN = 0x18
+USAGE_MAX = 0x28
+# 긴 항목(long item) 접두사 - 다음 바이트가 데이터 크기
+LONG_ITEM = 0xFE
+
+# 컬렉션 종류
+PHYSICAL = 0x00
+APPLICATION = 0x01
+
+# Input 항목 플래그
+DATA_ARRAY = 0x00      # 데이터, 배열 (키 배열)
+CONSTANT = 0x01        # 상수 (예약/패딩)
+DATA_VAR_ABS = 0x02    # 데이터, 변수, 절대값 (버튼, 수정키)
+CONST_VAR = 0x03       # 상수, 변수 (패딩)
+DATA_VAR_REL = 0x06    # 데이터, 변수, 상대값 (마우스 이동, 휠)
+
+# 사용 페이지
+PAGE_GENERIC_DESKTOP = 0x01
+PAGE_KEYBOARD = 0x07
+PAGE_BUTTON = 0x09
+PAGE_CONSUMER = 0x0C
+
+# 일반 데스크톱 사용 코드
+USAGE_POINTER = 0x01
+USAGE_MOUSE = 0x02
+USAGE_KEYBOARD = 0x06
+USAGE_X = 0x30
+USAGE_Y = 0x31
+USAGE_WHEEL = 0x38
+USAGE_CONSUMER_CONTROL = 0x01
+
+S8_LIMIT = 127
+S16_LIMIT = 32767
+
+
+def item(tag, value=0, signed=False):
+    # 값을 담을 수 있는 가장 작은 크기(1, 2, 4 바이트)로 인코딩
+    for size, code, lo, hi in ((1, 1, -0x80, 0x7F), (2, 2, -0x8000, 0x7FFF), (4, 3, -0x80000000, 0x7FFFFFFF)):
+        if not signed:
+            lo, hi = 0, (hi << 1) | 1
+        if lo <= value <= hi:
+            return bytes([tag | code]) + value.to_bytes(size, 'little', signed=signed)
+    raise ValueError(f'HID 항목 값 범위 초과: {value}')
+
+
+def logical(lo, hi):
+    # 논리 최소/최대값은 부호 있는 값으로 인코딩 (255 -> 0x26 0xFF 0x00)
+    return item(LOGICAL_MIN, lo, signed=True) + item(LOGICAL_MAX, hi, signed=True)
+
+
+def field(size, count, flags):
+    return item(REPORT_SIZE, size) + item(REPORT_COUNT, count) + item(INPUT, flags)
+
+
+class ReportDef:
+    # 하나의 Application 컬렉션 = 하나의 입력 리포트
+    #  descriptor: 리포트 맵 조각 (Report ID 포함)
+    #  packer    : 리포트 값(Report ID 제외) 패킹용 struct.Struct
+    #  limit     : 상대 축(X/Y)의 최대 절댓값 (마우스만)
+
+    def __init__(self, name, report_id, descriptor, fmt, limit=None):
+        self.name = name
+        self.report_id = report_id
+        self.descriptor = descriptor
+        self.packer = struct.Struct(fmt)
+        self.limit = limit
+
+
+def mouse(report_id, buttons=3, high_res=False):
+    # 버튼 N개(1바이트, 나머지는 패딩) + X/Y (8비트 또는 16비트) + 휠 8비트
+    if not 1 <= buttons <= 8:
+        raise ValueError('마우스 버튼은 1 ~ 8개')
+    limit = S16_LIMIT if high_res else S8_LIMIT
+    d = item(USAGE_PAGE, PAGE_GENERIC_DESKTOP) + item(USAGE, USAGE_MOUSE)
+    d += item(COLLECTION, APPLICATION) + item(REPORT_ID, report_id)
+    d += item(USAGE, USAGE_POINTER) + item(COLLECTION, PHYSICAL)
+    # 버튼
+    d += item(USAGE_PAGE, PAGE_BUTTON) + item(USAGE_MIN, 1) + item(USAGE_MAX, buttons)
+    d += logical(0, 1) + item(REPORT_COUNT, buttons) + item(REPORT_SIZE, 1) + item(INPUT, DATA_VAR_ABS)
+    if buttons < 8:
+        d += item(REPORT_COUNT, 1) + item(REPORT_SIZE, 8 - buttons) + item(INPUT, CONST_VAR)
+    d += item(USAGE_PAGE, PAGE_GENERIC_DESKTOP)
+    if high_res:
+        # X/Y 16비트, 휠은 8비트 그대로
+        d += item(USAGE, USAGE_X) + item(USAGE, USAGE_Y) + logical(-limit, limit)
+        d += item(REPORT_SIZE, 16) + item(REPORT_COUNT, 2) + item(INPUT, DATA_VAR_REL)
+        d += item(USAGE, USAGE_WHEEL) + logical(-S8_LIMIT, S8_LIMIT)
+        d += item(REPORT_SIZE, 8) + item(REPORT_COUNT, 1) + item(INPUT, DATA_VAR_REL)
+        fmt = '<Bhhb'
+    else:
+        d += item(USAGE, USAGE_X) + item(USAGE, USAGE_Y) + item(USAGE, USAGE_WHEEL) + logical(-limit, limit)
+        d += item(REPORT_SIZE, 8) + item(REPORT_COUNT, 3) + item(INPUT, DATA_VAR_REL)
+        fmt = '<Bbbb'
+    d += bytes([END_COLLECTION, END_COLLECTION])
+    return ReportDef('mouse', report_id, d, fmt, limit)
+
+
+def keyboard(report_id):
+    # 수정키 8비트 + 예약 1바이트 + 키 6개 (부트 키보드와 같은 8바이트)
+    d = item(USAGE_PAGE, PAGE_GENERIC_DESKTOP) + item(USAGE, USAGE_KEYBOARD)
+    d += item(COLLECTION, APPLICATION) + item(REPORT_ID, report_id)
+    d += item(USAGE_PAGE, PAGE_KEYBOARD) + item(USAGE_MIN, 0xE0) + item(USAGE_MAX, 0xE7)
+    d += logical(0, 1) + item(REPORT_SIZE, 1) + item(REPORT_COUNT, 8) + item(INPUT, DATA_VAR_ABS)
+    d += item(REPORT_COUNT, 1) + item(REPORT_SIZE, 8) + item(INPUT, CONSTANT)
+    d += item(REPORT_COUNT, 6) + item(REPORT_SIZE, 8) + logical(0, 0xFF)
+    d += item(USAGE_PAGE, PAGE_KEYBOARD) + item(USAGE_MIN, 0x00) + item(USAGE_MAX, 0xFF)
+    d += item(INPUT, DATA_ARRAY)
+    d += bytes([END_COLLECTION])
+    return ReportDef('keyboard', report_id, d, '<BB6B')
+
+
+def consumer(report_id):
+    # 소비자 제어 사용 코드 1개 (16비트) - 볼륨, 재생/정지, 밝기 등
+    d = item(USAGE_PAGE, PAGE_CONSUMER) + item(USAGE, USAGE_CONSUMER_CONTROL)
+    d += item(COLLECTION, APPLICATION) + item(REPORT_ID, report_id)
+    d += logical(0, 0x3FF) + item(USAGE_MIN, 0) + item(USAGE_MAX, 0x3FF)
+    d += field(16, 1, DATA_ARRAY)
+    d += bytes([END_COLLECTION])
+    return ReportDef('consumer', report_id, d, '<H')
+
+
+class ReportMap:
+    # 여러 ReportDef 를 하나의 리포트 맵으로 합친 결과
+
+    def __init__(self, *reports):
+        ids = [r.report_id for r in reports]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f'Report ID 중복: {ids}')
+        self.reports = {r.name: r for r in reports}
+        self.data = b''.join(r.descriptor for r in reports)
+
+    def __getitem__(self, name):
+        return self.reports[name]
+
+    def __contains__(self, name):
+        return name in self.reports
+
+
+# ---------- 장치 리포트 디스크립터 (hidraw 패스스루) ----------
+def input_report_sizes(descriptor):
+    # {Report ID: 입력 리포트 바이트 수 (Report ID 제외)} - Report ID 를 쓰지 않는 장치는 {0: 크기}
+    # 입력 리포트 길이만 필요하므로 Report Size/Count/ID 와 Push/Pop 만 따라감
+    bits = {}
+    report_id = report_size = report_count = 0
+    stack = []
+    i, end = 0, len(descriptor)
+    while i < end:
+        prefix = descriptor[i]
+        if prefix == LONG_ITEM:
+            i += 3 + (descriptor[i + 1] if i + 1 < end else 0)
+            continue
+        size = (0, 1, 2, 4)[prefix & 0x03]
+        value = int.from_bytes(descriptor[i + 1:i + 1 + size], 'little')
+        tag = prefix & 0xFC
+        i += 1 + size
+        if tag == INPUT:
+            bits[report_id] = bits.get(report_id, 0) + report_size * report_count
+        elif tag == REPORT_ID:
+            report_id = value
+            bits.setdefault(report_id, 0)
+        elif tag == REPORT_SIZE:
+            report_size = value
+        elif tag == REPORT_COUNT:
+            report_count = value
+        elif tag == PUSH:
+            stack.append((report_id, report_size, report_count))
+        elif tag == POP and stack:
+            report_id, report_size, report_count = stack.pop()
+    return {rid: (n + 7) // 8 for rid, n in bits.items() if n}
+
+
+class RawReportMap(ReportMap):
+    # 장치의 리포트 디스크립터를 그대로 쓰는 리포트 맵
+    # 이름으로 찾는 리포트(mouse 등)는 없고 입력 리포트 크기만 앎
+    #  inputs  : {Report ID: 크기}
+    #  numbered: 읽은 리포트 앞에 Report ID 바이트가 붙는지 (Report ID 를 쓰는 장치)
+
+    def __init__(self, data):
+        self.reports = {}
+        self.data = bytes(data)
+        self.inputs = input_report_sizes(self.data)
+        if not self.inputs:
+            raise ValueError('입력 리포트가 없는 리포트 디스크립터')
+        self.numbered = 0 not in self.inputs
@@ -0,0 +1,147 @@
+import os, sys
+from gi.repository import GLib
+
+from hid_descriptor import RawReportMap
+
+
+# hidraw 패스스루 (--device /dev/hidrawN)
+# 장치의 리포트 디스크립터를 그대로 리포트 맵(ReportMapChar)으로 쓰고, /dev/hidrawN 에서 읽은 리포트를
+# 디코딩/재패킹 없이 같은 Report ID 의 입력 리포트 특성으로 알림
+#  - 추가 버튼, 고해상도 휠, 장치 고유의 축 정밀도, 게임패드 축/버튼이 그대로 전달됨
+#  - 리더 스레드, 코얼레서, evdev 파싱 없음: GLib 메인 루프가 fd 를 감시하다 읽어서 바로 전송
+#  - 리포트 하나당 할당은 D-Bus 로 보낼 dbus.ByteArray 하나 (읽기 버퍼와 Report ID 별 view 는 재사용)
+# 입력 리포트만 전달 (출력/기능 리포트 - 키보드 LED 등 - 는 특성을 만들지 않음)
+# https://www.kernel.org/doc/html/latest/hid/hidraw.html
+SYSFS_HIDRAW = '/sys/class/hidraw'
+
+# GATT 속성 값 최대 길이 - 이보다 긴 리포트 디스크립터는 리포트 맵 특성에 담을 수 없음
+MAX_REPORT_MAP = 512
+
+
+def is_hidraw(path):
+    return os.path.basename(path).startswith('hidraw')
+
+
+def _sysfs_device(path):
+    return os.path.join(SYSFS_HIDRAW, os.path.basename(os.path.realpath(path)), 'device')
+
+
+def device_name(path):
+    try:
+        with open(os.path.join(_sysfs_device(path), 'uevent')) as f:
+            for line in f:
+                if line.startswith('HID_NAME='):
+                    return line[9:].strip()
+    except OSError:
+        pass
+    return os.path.basename(path)
+
+
+def read_report_map(path):
+    # /sys/class/hidraw/hidrawN/device/report_descriptor -> RawReportMap
+    with open(os.path.join(_sysfs_device(path), 'report_descriptor'), 'rb') as f:
+        data = f.read()
+    if len(data) > MAX_REPORT_MAP:
+        raise ValueError(f'리포트 디스크립터가 너무 김 ({len(data)} > {MAX_REPORT_MAP} 바이트)')
+    return RawReportMap(data)
+
+
+def list_devices():
+    try:
+        return ['/dev/' + name for name in sorted(os.listdir(SYSFS_HIDRAW))]
+    except FileNotFoundError:
+        return []
+
+
+class HidrawPassthrough:
+    # GLib 메인 루프에서만 사용
+    #  report_map: read_report_map 결과 (Report ID 별 입력 리포트 크기)
+    #  on_error(reason): 장치 분리 등으로 읽기가 끝남 (감시자가 open() 으로 다시 시작)
+    #  gate(power.PowerManager): 절전 중이면 리포트마다 gate.input() 으로 처리할지 물음
+    #    리포트마다 전체 상태(버튼 등)가 담기므로 버린 뒤 따로 맞출 상태는 없음
+
+    def __init__(self, path, report_map, on_error, gate=None):
+        self.path = path
+        self.gate = gate
+        self.report_map = report_map
+        self.on_error = on_error
+        self.fd = -1
+        self._watch = None
+        self._skip = 1 if report_map.numbered else 0   # 읽은 리포트 앞의 Report ID 바이트
+        self._buf = bytearray(self._skip + max(report_map.inputs.values()))
+        self._view = memoryview(self._buf)
+        self._routes = {}    # Report ID -> (send, 리포트 부분 view)
+        self.forwarded = 0
+        self.ignored = 0     # 받을 특성이 없는 리포트 (등록 전, 알 수 없는 Report ID)
+
+    def connect(self, targets):
+        # targets: {Report ID: send(report)} - GATT 입력 리포트 특성 (등록 전에는 연결하지 않아 버림)
+        skip = self._skip
+        self._routes = {rid: (targets[rid], self._view[skip:skip + size])
+                        for rid, size in self.report_map.inputs.items() if rid in targets}
+
+    def open(self):
+        self.close()
+        self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK | os.O_CLOEXEC)
+        self._watch = GLib.io_add_watch(self.fd, GLib.PRIORITY_DEFAULT,
+                                        GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR, self._on_readable)
+
+    def close(self):
+        if self._watch is not None:
+            GLib.source_remove(self._watch)
+            self._watch = None
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def _on_readable(self, fd, condition):
+        # hidraw 는 read() 한 번에 리포트 하나 - 쌓인 리포트를 모두 읽고 돌아감
+        buf, skip, routes, gate = self._buf, self._skip, self._routes, self.gate
+        while True:
+            try:
+                n = os.readv(fd, [buf])
+            except BlockingIOError:
+                return True
+            except OSError as e:
+                return self._fail(f'장치 읽기 실패: {e}')
+            if n <= 0:
+                return self._fail('장치 읽기 끝')
+            if gate is not None and gate.parked and not gate.input():
+                continue
+            route = routes.get(buf[0] if skip else 0)
+            if route is None:
+                self.ignored += 1
+                continue
+            send, report = route
+            if n != skip + len(report):
+                report = self._view[skip:n]   # 짧은 리포트 (드묾)
+            send(report)
+            self.forwarded += 1
+
+    def _fail(self, reason):
+        self._watch = None   # False 를 반환하면 GLib 가 감시를 제거함
+        os.close(self.fd)
+        self.fd = -1
+        self.on_error(reason)
+        return False
+
+    # ---------- 제어 명령 ----------
+    def cmd_passthrough(self, args):
+        ids = ', '.join(f'{rid}({size}B)' for rid, size in sorted(self.report_map.inputs.items()))
+        return f"{self.path}: 입력 리포트 {ids}, 전달 {self.forwarded}, 버림 {self.ignored}"
+
+
+# ---------- 장치 목록 ----------
+# python3 hidraw.py - hidraw 장치와 리포트 디스크립터의 입력 리포트 (패스스루 가능 여부)
+if __name__ == '__main__':
+    devices = list_devices()
+    for path in devices:
+        try:
+            report_map = read_report_map(path)
+            ids = ', '.join(f'ID {rid}: {size}바이트' for rid, size in sorted(report_map.inputs.items()))
+            print(f"{path}: {device_name(path)} (디스크립터 {len(report_map.data)}바이트, {ids})")
+        except (OSError, ValueError) as e:
+            print(f"{path}: {device_name(path)} - 사용 불가: {e}")
+    if not devices:
+        print("hidraw 장치 없음")
+    sys.exit(0 if devices else 1)
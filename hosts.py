@@ -0,0 +1,290 @@
+import dbus, dbus.exceptions
+
+from bluez import BLUEZ_SERVICE, DEVICE_IFACE, DBUS_OM_IFACE, DBUS_PROP_IFACE
+
+
+# 여러 호스트(노트북 등) 본딩 유지 + 활성 호스트 전환
+#
+# BlueZ 는 특성 알림(PropertiesChanged)을 구독 중인 모든 연결로 보내고 D-Bus API 에 장치별 알림이 없으므로,
+# 연결을 유지한 채 리포트를 활성 호스트에게만 보낼 수 없음 -> 비활성 호스트는 Device1.Blocked 로 연결을 막아둠
+# (본딩 키는 유지되므로 다시 페어링할 필요 없음, 시작 시 이미 연결된 비활성 호스트도 막음)
+# 허브가 막은 호스트는 종료 시 release() 로 모두 풀어줌 (허브가 꺼져도 다른 호스트가 막힌 채 남지 않도록)
+# 전환 시 GATT 애플리케이션 등록 해제/재등록이나 광고 재등록은 하지 않지만, 전환은 곧 재연결임:
+#  1) 라우팅 전환 - 대상 호스트가 다시 연결될 때까지 리포트 보류 (send_report 게이트)
+#  2) 이전 호스트 Blocked=True (연결 끊김), 대상 호스트 Blocked=False (본딩된 호스트가 자동 재연결)
+#  3) 대상 호스트가 연결되면 라우팅 열림 - BLE 재연결 + 재구독이라 보통 수 초 걸림
+# 구독 상태는 BlueZ 가 CCC 를 직접 처리하고 어댑터 단위로 StartNotify/StopNotify 만 부르므로
+# 호스트별로는 알 수 없음 -> 호스트는 연결 여부로만 판단하고, 구독은 특성의 notifying 이 게이트
+
+class Host:
+    def __init__(self, path, props):
+        self.path = path
+        self.address = str(props.get('Address', '?'))
+        self.name = str(props.get('Alias', props.get('Name', self.address)))
+        self.paired = bool(props.get('Paired', False))
+        self.connected = bool(props.get('Connected', False))
+        self.resolved = bool(props.get('ServicesResolved', False))
+        self.blocked = bool(props.get('Blocked', False))
+
+    def update(self, props):
+        if 'Alias' in props:
+            self.name = str(props['Alias'])
+        if 'Paired' in props:
+            self.paired = bool(props['Paired'])
+        if 'Connected' in props:
+            self.connected = bool(props['Connected'])
+            if not self.connected:
+                self.resolved = False
+        if 'ServicesResolved' in props:
+            self.resolved = bool(props['ServicesResolved'])
+        if 'Blocked' in props:
+            self.blocked = bool(props['Blocked'])
+
+    def is_ready(self):
+        # 리포트를 받을 수 있는 상태: 연결됨 (구독 여부는 어댑터 단위 notifying 이 따로 게이트)
+        return self.connected and not self.blocked
+
+
+class HostManager:
+    def __init__(self, bus, adapter_path, on_route):
+        self.bus = bus
+        self.adapter_path = adapter_path
+        self.on_route = on_route   # on_route(열림 여부) - 활성 호스트가 리포트를 받을 수 있는지
+        self.on_active = None      # on_active(Host 또는 None) - 활성 호스트가 바뀔 때 (호스트별 가속 등)
+        self._notified = None      # on_active 로 마지막에 알린 경로
+        self.hosts = {}            # 경로 -> Host (본딩된 장치만)
+        self.active = None         # 활성 호스트 경로
+        self._switching = False    # 전환 후 대상 호스트의 재연결을 기다리는 중
+        self.loaded = False        # 본딩 목록을 받기 전에는 라우팅 닫힘
+        self._blocked = set()      # 허브가 Blocked 로 막은 호스트 경로 (종료 시 해제)
+
+        bus.add_signal_receiver(self._on_added, signal_name='InterfacesAdded',
+                                dbus_interface=DBUS_OM_IFACE, bus_name=BLUEZ_SERVICE)
+        bus.add_signal_receiver(self._on_removed, signal_name='InterfacesRemoved',
+                                dbus_interface=DBUS_OM_IFACE, bus_name=BLUEZ_SERVICE)
+        bus.add_signal_receiver(self._on_properties, signal_name='PropertiesChanged',
+                                dbus_interface=DBUS_PROP_IFACE, bus_name=BLUEZ_SERVICE,
+                                path_keyword='path')
+
+        self._load()
+
+    def _load(self):
+        # 본딩 목록은 비동기로 조회 - BlueZ 의 전체 객체 트리를 기다리느라 시작(광고/입력)이 늦어지지 않도록
+        om = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE, '/', introspect=False), DBUS_OM_IFACE)
+        om.GetManagedObjects(reply_handler=self._on_objects, error_handler=self._on_objects_error)
+        self.on_route(False)
+
+    def reload(self, adapter_path):
+        # bluetoothd 재시작 / 어댑터 교체 후 - 호스트 목록을 다시 읽음 (연결 상태는 모두 바뀌었으므로)
+        self.adapter_path = adapter_path
+        self.hosts = {}
+        self.active = None
+        self.loaded = False
+        self._switching = False
+        self._load()
+
+    def _on_objects_error(self, e):
+        # 목록 없이 진행 (이후 시그널로 알게 되는 호스트만 관리)
+        print(f"[호스트] 본딩 목록 조회 실패: {e}")
+        self._on_objects({})
+
+    def _on_objects(self, objects):
+        for path, ifaces in objects.items():
+            if DEVICE_IFACE in ifaces:
+                self._add(str(path), ifaces[DEVICE_IFACE])
+        self.loaded = True
+
+        # 시작 시 활성 호스트: 연결된 호스트 우선, 없으면 첫 번째 본딩 호스트
+        hosts = self.ordered()
+        connected = [h for h in hosts if h.connected and not h.blocked]
+        first = connected[0] if connected else (hosts[0] if hosts else None)
+        if first is not None:
+            self.active = first.path
+            if first.blocked:
+                self._set_blocked(first, False)
+        # 이미 연결된 다른 호스트도 리포트를 받으므로 막음, 이전 실행에서 막힌 채 남은 호스트도 종료 시 풀어줌
+        for host in hosts:
+            if host is first:
+                continue
+            if host in connected:
+                self._set_blocked(host, True)
+            elif host.blocked:
+                self._blocked.add(host.path)
+        self._update_route()
+
+    def active_host(self):
+        return self.hosts.get(self.active) if self.active else None
+
+    def ordered(self):
+        return sorted(self.hosts.values(), key=lambda h: h.address)
+
+    def _add(self, path, props):
+        if not path.startswith(self.adapter_path + '/'):
+            return
+        if not props.get('Paired', False) and path not in self.hosts:
+            return   # 본딩되지 않은 장치(스캔 결과 등)는 무시
+        host = self.hosts.get(path)
+        if host is None:
+            self.hosts[path] = Host(path, props)
+            print(f"[호스트] 추가됨: {self.hosts[path].name} ({self.hosts[path].address})")
+        else:
+            host.update(props)
+
+    def _on_added(self, path, interfaces):
+        if DEVICE_IFACE in interfaces:
+            self._add(str(path), interfaces[DEVICE_IFACE])
+            self._update_route()
+
+    def _on_removed(self, path, interfaces):
+        if DEVICE_IFACE in interfaces and self.hosts.pop(str(path), None) is not None:
+            if self.active == str(path):
+                self.active = None
+            self._update_route()
+
+    def _on_properties(self, interface, changed, invalidated, path=None):
+        if interface != DEVICE_IFACE:
+            return
+        path = str(path)
+        host = self.hosts.get(path)
+        if host is None:
+            if changed.get('Paired', False):
+                # 새로 본딩된 호스트 - 시그널 처리 중 메인 루프를 막지 않도록 속성은 비동기로 조회
+                props = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE, path, introspect=False), DBUS_PROP_IFACE)
+                props.GetAll(DEVICE_IFACE,
+                             reply_handler=lambda all_props: (self._add(path, all_props), self._update_route()),
+                             error_handler=lambda e: print(f"[호스트] 속성 조회 실패 ({path}): {e}"))
+            return
+        host.update(changed)
+        self._update_route()
+
+    def _update_route(self):
+        if not self.loaded:
+            return
+        if self.active not in self.hosts:
+            # 활성 호스트가 없으면 연결된 (차단되지 않은) 호스트를 활성으로
+            self.active = next((h.path for h in self.ordered() if h.connected and not h.blocked), None)
+        host = self.hosts.get(self.active) if self.active else None
+        if self.active != self._notified:
+            self._notified = self.active
+            if self.on_active is not None:
+                self.on_active(host)
+        ready = host is not None and host.is_ready()
+        self.on_route(ready if host is not None else not self.hosts)
+        if ready and self._switching:
+            self._switching = False
+            print(f"[호스트] 전환 완료: {host.name} 다시 연결됨")
+
+    def _set_blocked(self, host, blocked):
+        if blocked:
+            self._blocked.add(host.path)
+        else:
+            self._blocked.discard(host.path)
+        props = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE, host.path), DBUS_PROP_IFACE)
+        props.Set(DEVICE_IFACE, 'Blocked', dbus.Boolean(blocked),
+                  reply_handler=lambda: None,
+                  error_handler=lambda e: print(f"[호스트] Blocked 설정 실패 ({host.name}): {e}"))
+
+    def release(self):
+        # 종료 시 - 허브가 막은 호스트를 모두 풀어줌 (메인 루프가 끝난 뒤라 동기 호출)
+        for path in self._blocked:
+            try:
+                props = dbus.Interface(self.bus.get_object(BLUEZ_SERVICE, path, introspect=False), DBUS_PROP_IFACE)
+                props.Set(DEVICE_IFACE, 'Blocked', dbus.Boolean(False), timeout=2)
+            except dbus.exceptions.DBusException as e:
+                print(f"[호스트] Blocked 해제 실패 ({path}): {e}")
+        self._blocked.clear()
+
+    def resolve(self, key):
+        # 번호(1부터), 주소 또는 이름으로 호스트 찾기
+        hosts = self.ordered()
+        if key.isdigit() and 1 <= int(key) <= len(hosts):
+            return hosts[int(key) - 1]
+        for host in hosts:
+            if key.upper() == host.address.upper() or key == host.name:
+                return host
+        raise ValueError(f"호스트를 찾을 수 없음: {key}")
+
+    def switch(self, host):
+        if host.path == self.active and host.is_ready():
+            return f"이미 활성 호스트: {host.name}"
+        self.active = host.path
+        self._switching = True
+        for other in self.hosts.values():
+            if other is not host and not other.blocked:
+                self._set_blocked(other, True)
+        if host.blocked:
+            self._set_blocked(host, False)
+        self._update_route()   # 대상이 다시 연결될 때까지 리포트 보류
+        if not self._switching:
+            return f"{host.name} 으로 전환 완료"
+        return f"{host.name} 으로 전환 (다시 연결될 때까지 리포트 보류 - 보통 수 초)"
+
+    def switch_next(self):
+        hosts = self.ordered()
+        if not hosts:
+            raise ValueError("본딩된 호스트 없음")
+        paths = [h.path for h in hosts]
+        index = (paths.index(self.active) + 1) % len(hosts) if self.active in paths else 0
+        return self.switch(hosts[index])
+
+    # ---------- 제어 명령 ----------
+    def cmd_hosts(self, args):
+        lines = []
+        for i, host in enumerate(self.ordered(), 1):
+            mark = '*' if host.path == self.active else ' '
+            lines.append(f"{mark}{i}. {host.name} ({host.address}) 연결={'O' if host.connected else 'X'} "
+                         f"차단={'O' if host.blocked else 'X'}")
+        return '\n'.join(lines) if lines else "본딩된 호스트 없음"
+
+    def cmd_switch(self, args):
+        if not args:
+            return self.switch_next()
+        return self.switch(self.resolve(args[0]))
+
+
+class HostGroup:
+    # 여러 어댑터 (--adapters all) - 어댑터마다 HostManager 하나, 어댑터마다 활성 호스트 하나
+    # 어댑터마다 GATT 트리가 따로 있으므로 라우팅도 어댑터별 (routes: 어댑터 경로 -> 그 트리의 on_route)
+    # HostManager 와 같은 인터페이스 (on_active, active_host, release, cmd_hosts, cmd_switch)
+
+    def __init__(self, bus, routes):
+        self.managers = {path: HostManager(bus, path, on_route=on_route) for path, on_route in routes.items()}
+
+    @property
+    def on_active(self):
+        return next(iter(self.managers.values())).on_active
+
+    @on_active.setter
+    def on_active(self, callback):
+        for manager in self.managers.values():
+            manager.on_active = callback
+
+    def active_host(self):
+        return next((m.active_host() for m in self.managers.values() if m.active_host() is not None), None)
+
+    def _manager(self, args):
+        # switch [어댑터] [번호|주소] - 어댑터(hci0 등)를 생략하면 주소/이름은 모든 어댑터에서 찾고 번호는 첫 어댑터
+        names = {path.rsplit('/', 1)[-1]: m for path, m in self.managers.items()}
+        if args and args[0] in names:
+            return names[args[0]], args[1:]
+        if args and not args[0].isdigit():
+            for manager in self.managers.values():
+                try:
+                    manager.resolve(args[0])
+                    return manager, args
+                except ValueError:
+                    pass
+        return next(iter(self.managers.values())), args
+
+    # ---------- 제어 명령 ----------
+    def release(self):
+        for manager in self.managers.values():
+            manager.release()
+
+    def cmd_hosts(self, args):
+        return '\n'.join(f"[{path.rsplit('/', 1)[-1]}]\n{manager.cmd_hosts(args)}"
+                         for path, manager in self.managers.items())
+
+    def cmd_switch(self, args):
+        manager, args = self._manager(args)
+        return manager.cmd_switch(args)
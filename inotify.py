@@ -0,0 +1,63 @@
+import os, struct, ctypes
+
+
+# inotify (ctypes) - 장치 핫플러그(/dev/input)와 설정 파일 변경 감시용
+# https://man7.org/linux/man-pages/man7/inotify.7.html
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT = struct.Struct('iIII')
+
+# 프로세스에 이미 올라온 libc 심볼 사용 (ctypes.util.find_library 는 ldconfig 를 실행해 시작이 느려짐)
+_libc = ctypes.CDLL(None, use_errno=True)
+
+
+def _check(ret):
+    if ret < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return ret
+
+
+class Inotify:
+    def __init__(self):
+        self.fd = _check(_libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+        self.watches = {}   # wd -> 감시 중인 디렉터리
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        wd = _check(_libc.inotify_add_watch(self.fd, os.fsencode(path), mask))
+        self.watches[wd] = path
+        return wd
+
+    def read_events(self):
+        # 대기 중인 이벤트를 모두 읽어 (디렉터리, 파일 이름, mask) 목록으로 반환
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0').decode()
+                offset += length
+                events.append((self.watches.get(wd), name, mask))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
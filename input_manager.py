@@ -0,0 +1,277 @@
+import os, time, fcntl, selectors, threading
+
+from evdev_reader import EvdevReader, MouseDecoder, DISCARDED, EV_KEY, EV_REL, REL_X, REL_Y, BTN_LEFT
+from inotify import Inotify, IN_CREATE, IN_ATTRIB, IN_DELETE
+from tracing import TRACE, now_us
+
+
+INPUT_DIR = '/dev/input'
+
+KIND_POINTER = 'pointer'
+KIND_KEYBOARD = 'keyboard'
+
+# 비트맵 크기 (linux/input-event-codes.h 의 *_MAX)
+EV_MAX = 0x1f
+REL_MAX = 0x0f
+KEY_MAX = 0x2ff
+
+# 키보드 판별용 키 (ESC, ENTER, A, Z, SPACE) - 모두 있어야 키보드로 봄
+KEYBOARD_PROBE_KEYS = (1, 28, 30, 44, 57)
+
+
+# ioctl 번호: _IOC(_IOC_READ, 'E', nr, len)
+def _eviocg(nr, length):
+    return (2 << 30) | (length << 16) | (ord('E') << 8) | nr
+
+
+def _bits(fd, ev, max_code):
+    # EVIOCGBIT(ev) -> 지원 코드 비트맵 (정수)
+    buf = bytearray((max_code + 8) // 8)
+    try:
+        fcntl.ioctl(fd, _eviocg(0x20 + ev, len(buf)), buf)
+    except OSError:
+        return 0
+    return int.from_bytes(buf, 'little')
+
+
+def device_name(fd):
+    buf = bytearray(256)
+    try:
+        fcntl.ioctl(fd, _eviocg(0x06, len(buf)), buf)   # EVIOCGNAME
+    except OSError:
+        return '?'
+    return buf.split(b'\0', 1)[0].decode(errors='replace')
+
+
+def device_kinds(fd):
+    # 장치 번호가 아닌 기능(capability)으로 포인터/키보드 판별
+    kinds = set()
+    ev = _bits(fd, 0, EV_MAX)
+    if not ev & (1 << EV_KEY):
+        return kinds
+    keys = _bits(fd, EV_KEY, KEY_MAX)
+    if ev & (1 << EV_REL):
+        rel = _bits(fd, EV_REL, REL_MAX)
+        if rel & (1 << REL_X) and rel & (1 << REL_Y) and keys & (1 << BTN_LEFT):
+            kinds.add(KIND_POINTER)
+    if all(keys >> k & 1 for k in KEYBOARD_PROBE_KEYS):
+        kinds.add(KIND_KEYBOARD)
+    return kinds
+
+
+class InputDevice:
+    def __init__(self, reader, kinds, name):
+        self.reader = reader
+        self.kinds = kinds
+        self.name = name
+        self.decoder = MouseDecoder(reader.fd) if KIND_POINTER in kinds else None
+        self.buttons = 0     # 이 장치의 마지막 버튼 상태
+
+
+class _LoopSelector:
+    # asyncio 런타임용: selectors 와 같은 register/unregister 를 loop.add_reader 로 연결
+    # (별도 스레드 없이 이벤트 루프 스레드에서 바로 읽음)
+
+    def __init__(self, loop, dispatch):
+        self.loop = loop
+        self.dispatch = dispatch
+        self.fileobjs = []
+
+    def register(self, fileobj, events, data):
+        self.loop.add_reader(fileobj, self.dispatch, data)
+        self.fileobjs.append(fileobj)
+
+    def unregister(self, fileobj):
+        self.loop.remove_reader(fileobj)
+        self.fileobjs.remove(fileobj)
+
+    def close(self):
+        for fileobj in self.fileobjs:
+            self.loop.remove_reader(fileobj)
+        self.fileobjs.clear()
+
+
+class InputManager:
+    # /dev/input 아래 포인터/키보드 장치를 모두 찾아 하나의 selectors(epoll) 루프에서 읽음
+    # 장치가 늘어나도 스레드는 run() 을 도는 하나뿐이며, inotify 로 핫플러그 시 연결/분리
+    # loop 를 주면 스레드 대신 asyncio 이벤트 루프의 add_reader 로 읽음 (start() / stop())
+    # capture(CaptureWriter) 를 주면 연결된 장치에서 읽은 이벤트를 모두 녹화
+    # gate(power.PowerManager) 를 주면 모든 장치가 절전 상태를 따름 (off 면 읽은 배치를 디코딩 없이 버림)
+    #  on_mouse(dx, dy, wheel, buttons, ts) : 모든 마우스의 움직임 (버튼은 장치별 상태를 OR)
+    #  on_keyboard(events)                  : 키보드 input_event 배치 - None 이면 키보드는 열지 않음
+    #  on_keyboard_detach()                 : 키보드 분리 시 (눌린 키가 남지 않도록)
+    #  on_error(reason)                     : asyncio 런타임에서 읽기 중 예외로 멈춤 (스레드 런타임은 run() 이 끝남)
+
+    def __init__(self, on_mouse, on_keyboard=None, input_dir=INPUT_DIR, on_keyboard_detach=None, loop=None,
+                 capture=None, gate=None, on_error=None):
+        self.on_mouse = on_mouse
+        self.on_error = on_error
+        self.on_keyboard = on_keyboard
+        self.on_keyboard_detach = on_keyboard_detach
+        self.input_dir = input_dir
+        self.devices = {}    # 경로 -> InputDevice
+        self._buttons = 0
+        self._running = False
+        self.loop = loop
+        self.capture = capture
+        self.gate = gate
+        self.selector = selectors.DefaultSelector() if loop is None else _LoopSelector(loop, self._loop_dispatch)
+        self._inotify = Inotify()
+        self._inotify.add_watch(input_dir, IN_CREATE | IN_ATTRIB | IN_DELETE)
+        self.selector.register(self._inotify, selectors.EVENT_READ, self._inotify)
+        self._wake_r, self._wake_w = os.pipe()
+        self.selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._closed = False
+        self._close_lock = threading.Lock()   # run() 스레드의 close() 와 stop() 의 깨우기 사이
+
+    def scan(self):
+        for name in sorted(os.listdir(self.input_dir)):
+            if name.startswith('event'):
+                self.attach(os.path.join(self.input_dir, name))
+
+    def attach(self, path):
+        if path in self.devices:
+            return
+        try:
+            reader = EvdevReader(path, nonblock=True, gate=self.gate)
+        except OSError:
+            return   # udev 가 권한을 설정하기 전이면 IN_ATTRIB 때 다시 시도
+        kinds = device_kinds(reader.fd)
+        if self.on_keyboard is None:
+            kinds.discard(KIND_KEYBOARD)
+        if not kinds:
+            reader.close()
+            return
+        dev = InputDevice(reader, kinds, device_name(reader.fd))
+        if self.capture is not None:
+            self.capture.attach(reader, kinds)
+        self.devices[path] = dev
+        self.selector.register(reader, selectors.EVENT_READ, dev)
+        print(f"[입력] 연결됨: {path} ({dev.name}, {', '.join(sorted(kinds))})")
+
+    def detach(self, path):
+        dev = self.devices.pop(path, None)
+        if dev is None:
+            return
+        self.selector.unregister(dev.reader)
+        dev.reader.close()
+        print(f"[입력] 분리됨: {path} ({dev.name})")
+        if KIND_KEYBOARD in dev.kinds and self.on_keyboard_detach is not None:
+            self.on_keyboard_detach()
+        if dev.buttons:
+            # 버튼을 누른 채로 분리되면 눌림 상태가 남지 않도록 해제 전송
+            dev.buttons = 0
+            self._buttons = self._combined_buttons()
+            self.on_mouse(0, 0, 0, self._buttons, 0)
+
+    def _combined_buttons(self):
+        buttons = 0
+        for dev in self.devices.values():
+            buttons |= dev.buttons
+        return buttons
+
+    def run(self):
+        self._running = True
+        self.scan()
+        select = self.selector.select
+        dispatch = self._dispatch
+        gate = self.gate
+        try:
+            while self._running:
+                for key, _mask in select():
+                    dispatch(key.data)
+                if gate is not None and gate.discard:
+                    time.sleep(gate.poll_s)   # 보낼 곳이 없음 - 이벤트가 쌓이게 두고 덜 자주 깨어남
+        finally:
+            self.close()   # 예외로 끝나도 장치를 닫음 (감시자가 새 InputManager 로 다시 시작)
+
+    def start(self):
+        # asyncio 런타임: 장치를 등록만 하고 읽기는 이벤트 루프가 호출
+        self._running = True
+        try:
+            self.scan()
+        except BaseException:
+            self.close()
+            raise
+
+    def stop(self):
+        self._running = False
+        if self.loop is not None:
+            self.close()
+            return
+        with self._close_lock:
+            if not self._closed:   # run() 이 이미 끝나 닫았으면 깨울 필요 없음 (닫힌/재사용된 fd 에 쓰지 않도록)
+                os.write(self._wake_w, b'\0')
+
+    def _dispatch(self, data):
+        if data is None:
+            os.read(self._wake_r, 64)
+        elif data is self._inotify:
+            self._on_hotplug()
+        else:
+            self._read(data)
+
+    def _loop_dispatch(self, data):
+        # 예외가 이벤트 루프로 새지 않게 장치를 모두 닫고 알림 (감시자가 새 InputManager 로 다시 시작)
+        try:
+            self._dispatch(data)
+        except Exception as e:
+            self._running = False
+            self.close()
+            if self.on_error is None:
+                raise
+            self.on_error(f'입력 오류: {e}')
+
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        for path in list(self.devices):
+            self.detach(path)
+        self.selector.close()
+        self._inotify.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _on_hotplug(self):
+        for directory, name, mask in self._inotify.read_events():
+            if not name.startswith('event'):
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_DELETE:
+                self.detach(path)
+            else:
+                self.attach(path)
+
+    def _read(self, dev):
+        try:
+            batch = dev.reader.read_batch()
+        except BlockingIOError:
+            return
+        except OSError:
+            batch = None   # ENODEV: 장치가 빠짐 (inotify 보다 먼저 올 수 있음)
+        if batch is None:
+            self.detach(dev.reader.path)
+            return
+        if batch is DISCARDED:
+            return
+
+        if dev.decoder is None:
+            self.on_keyboard(batch)
+            return
+        if self.on_keyboard is not None and KIND_KEYBOARD in dev.kinds:
+            batch = list(batch)   # 키보드 + 포인터 겸용 장치: 두 번 순회
+            self.on_keyboard(batch)
+
+        on_mouse = self.on_mouse
+        tracing = TRACE.enabled
+        for dx, dy, wheel, buttons, ts in dev.decoder.decode(batch):
+            if buttons != dev.buttons:
+                dev.buttons = buttons
+                self._buttons = self._combined_buttons()
+            if tracing:
+                read_us = dev.reader.read_us
+                TRACE.record('read', read_us - ts)
+                TRACE.record('parse', now_us() - read_us)
+            on_mouse(dx, dy, wheel, self._buttons, ts)
@@ -0,0 +1,150 @@
+from evdev_reader import EV_KEY, EV_SYN, SYN_REPORT, SYN_DROPPED
+
+
+# evdev 키 코드 -> HID Keyboard/Keypad 페이지(0x07) 사용 코드
+# https://github.com/torvalds/linux/blob/master/drivers/hid/hid-input.c (hid_keyboard 표의 역방향)
+KEY_TO_HID = {
+    1: 0x29,                                   # ESC
+    2: 0x1E, 3: 0x1F, 4: 0x20, 5: 0x21, 6: 0x22,
+    7: 0x23, 8: 0x24, 9: 0x25, 10: 0x26, 11: 0x27,   # 1 ~ 0
+    12: 0x2D, 13: 0x2E, 14: 0x2A, 15: 0x2B,    # - = BACKSPACE TAB
+    16: 0x14, 17: 0x1A, 18: 0x08, 19: 0x15, 20: 0x17,
+    21: 0x1C, 22: 0x18, 23: 0x0C, 24: 0x12, 25: 0x13,  # Q ~ P
+    26: 0x2F, 27: 0x30, 28: 0x28,              # [ ] ENTER
+    29: 0xE0,                                  # 왼쪽 CTRL
+    30: 0x04, 31: 0x16, 32: 0x07, 33: 0x09, 34: 0x0A,
+    35: 0x0B, 36: 0x0D, 37: 0x0E, 38: 0x0F,    # A ~ L
+    39: 0x33, 40: 0x34, 41: 0x35,              # ; ' `
+    42: 0xE1,                                  # 왼쪽 SHIFT
+    43: 0x31,                                  # \
+    44: 0x1D, 45: 0x1B, 46: 0x06, 47: 0x19, 48: 0x05,
+    49: 0x11, 50: 0x10,                        # Z ~ M
+    51: 0x36, 52: 0x37, 53: 0x38,              # , . /
+    54: 0xE5,                                  # 오른쪽 SHIFT
+    55: 0x55,                                  # 키패드 *
+    56: 0xE2,                                  # 왼쪽 ALT
+    57: 0x2C, 58: 0x39,                        # SPACE CAPSLOCK
+    59: 0x3A, 60: 0x3B, 61: 0x3C, 62: 0x3D, 63: 0x3E,
+    64: 0x3F, 65: 0x40, 66: 0x41, 67: 0x42, 68: 0x43,  # F1 ~ F10
+    69: 0x53, 70: 0x47,                        # NUMLOCK SCROLLLOCK
+    71: 0x5F, 72: 0x60, 73: 0x61, 74: 0x56,    # 키패드 7 8 9 -
+    75: 0x5C, 76: 0x5D, 77: 0x5E, 78: 0x57,    # 키패드 4 5 6 +
+    79: 0x59, 80: 0x5A, 81: 0x5B,              # 키패드 1 2 3
+    82: 0x62, 83: 0x63,                        # 키패드 0 .
+    85: 0x94, 86: 0x64,                        # ZENKAKUHANKAKU 102ND
+    87: 0x44, 88: 0x45,                        # F11 F12
+    89: 0x87, 92: 0x8A, 93: 0x88, 94: 0x8B,    # RO HENKAN KATAKANAHIRAGANA MUHENKAN
+    96: 0x58,                                  # 키패드 ENTER
+    97: 0xE4,                                  # 오른쪽 CTRL
+    98: 0x54, 99: 0x46,                        # 키패드 / SYSRQ
+    100: 0xE6,                                 # 오른쪽 ALT
+    102: 0x4A, 103: 0x52, 104: 0x4B,           # HOME UP PAGEUP
+    105: 0x50, 106: 0x4F,                      # LEFT RIGHT
+    107: 0x4D, 108: 0x51, 109: 0x4E,           # END DOWN PAGEDOWN
+    110: 0x49, 111: 0x4C,                      # INSERT DELETE
+    116: 0x66, 117: 0x67, 119: 0x48,           # POWER 키패드 = PAUSE
+    121: 0x85,                                 # 키패드 ,
+    122: 0x90, 123: 0x91,                      # 한/영 한자
+    124: 0x89,                                 # YEN
+    125: 0xE3, 126: 0xE7,                      # 왼쪽/오른쪽 META (윈도우, 커맨드)
+    127: 0x65,                                 # COMPOSE (메뉴)
+    183: 0x68, 184: 0x69, 185: 0x6A, 186: 0x6B, 187: 0x6C, 188: 0x6D,
+    189: 0x6E, 190: 0x6F, 191: 0x70, 192: 0x71, 193: 0x72, 194: 0x73,  # F13 ~ F24
+}
+
+# 미디어 키: evdev 키 코드 -> 소비자 제어 페이지(0x0C) 사용 코드
+# (키보드 페이지의 볼륨 키는 Windows/macOS 에서 무시되는 경우가 많아 소비자 제어 리포트로 보냄)
+KEY_TO_CONSUMER = {
+    113: 0xE2,   # MUTE
+    114: 0xEA,   # VOLUMEDOWN
+    115: 0xE9,   # VOLUMEUP
+    163: 0xB5,   # NEXTSONG
+    164: 0xCD,   # PLAYPAUSE
+    165: 0xB6,   # PREVIOUSSONG
+    166: 0xB7,   # STOPCD
+    224: 0x70,   # BRIGHTNESSDOWN
+    225: 0x6F,   # BRIGHTNESSUP
+}
+
+# 수정키(Modifier) 사용 코드 범위 0xE0 ~ 0xE7 -> 리포트 첫 바이트의 비트
+MODIFIER_MIN = 0xE0
+MODIFIER_MAX = 0xE7
+
+# 부트/리포트 모드 공통 8바이트: 수정키, 예약, 키 6개 (패커는 리포트 맵의 keyboard/consumer 정의에서)
+MAX_KEYS = 6
+ERROR_ROLLOVER = 0x01   # 동시에 6개를 넘게 누르면 모든 슬롯을 이 값으로 채움
+
+
+class KeyboardState:
+    # 눌린 키(누른 순서 유지)와 수정키 비트마스크를 추적하고,
+    # SYN_REPORT 시점에 상태가 실제로 바뀐 경우에만 8바이트 리포트를 on_report 로 전달
+    # 자동 반복(value 2)과 이미 눌린 키의 중복 이벤트는 리포트를 만들지 않음
+    # 미디어 키는 마지막으로 누른 소비자 제어 사용 코드 하나를 on_consumer 로 전달
+    # report_map: hid_descriptor.ReportMap - 디스크립터와 같은 정의에서 만든 keyboard/consumer 패커를 씀
+
+    def __init__(self, on_report, report_map, on_consumer=None):
+        self.on_report = on_report
+        self.on_consumer = on_consumer
+        self._keyboard = report_map['keyboard'].packer
+        self._consumer = report_map['consumer'].packer
+        self.modifiers = 0
+        self.keys = []                  # 눌린 키 사용 코드 (누른 순서)
+        self.media = []                 # 눌린 미디어 키 사용 코드 (누른 순서)
+        self._sent = (0, ())            # 마지막으로 보낸 (수정키, 키)
+        self._sent_media = 0            # 마지막으로 보낸 소비자 제어 사용 코드
+
+    def feed(self, events):
+        for _sec, _usec, etype, code, value in events:
+            if etype == EV_KEY:
+                if value == 2:
+                    continue   # 자동 반복 - 호스트가 직접 반복 처리
+                usage = KEY_TO_HID.get(code)
+                if usage is None:
+                    usage = KEY_TO_CONSUMER.get(code)
+                    if usage is not None and self.on_consumer is not None:
+                        if value:
+                            if usage not in self.media:
+                                self.media.append(usage)
+                        elif usage in self.media:
+                            self.media.remove(usage)
+                    continue
+                if MODIFIER_MIN <= usage <= MODIFIER_MAX:
+                    bit = 1 << (usage - MODIFIER_MIN)
+                    self.modifiers = (self.modifiers | bit) if value else (self.modifiers & ~bit)
+                elif value:
+                    if usage not in self.keys:
+                        self.keys.append(usage)
+                elif usage in self.keys:
+                    self.keys.remove(usage)
+            elif etype == EV_SYN and code == SYN_REPORT:
+                self._emit_if_changed()
+            elif etype == EV_SYN and code == SYN_DROPPED:
+                # 놓친 이벤트가 있음 (커널 버퍼 넘침, 절전으로 버린 배치) - 눌린 키가 남지 않도록 모두 뗀 것으로 봄
+                self.modifiers = 0
+                self.keys.clear()
+                self.media.clear()
+
+    def release_all(self):
+        self.modifiers = 0
+        self.keys.clear()
+        self.media.clear()
+        self._emit_if_changed()
+
+    def _emit_if_changed(self):
+        state = (self.modifiers, tuple(self.keys))
+        if state != self._sent:
+            self._sent = state
+            self.on_report(self.build_report())
+        if self.on_consumer is not None:
+            media = self.media[-1] if self.media else 0
+            if media != self._sent_media:
+                self._sent_media = media
+                self.on_consumer(self._consumer.pack(media))
+
+    def build_report(self):
+        keys = self.keys
+        if len(keys) > MAX_KEYS:
+            slots = (ERROR_ROLLOVER,) * MAX_KEYS
+        else:
+            slots = tuple(keys) + (0,) * (MAX_KEYS - len(keys))
+        return self._keyboard.pack(self.modifiers, 0, *slots)
@@ -1,21 +1,27 @@
 import dbus, dbus.exceptions, dbus.mainloop.glib, dbus.service
 from gi.repository import GLib
-import threading, sys, struct
-import subprocess, shlex
-
-
-# D-Bus 상수
-# https://www.bluez.org/
-# https://github.com/bluez/bluez
-BLUEZ_SERVICE = 'org.bluez'
-ADAPTER_IFACE = 'org.bluez.Adapter1'                
-LE_ADVERTISING_MANAGER_IFACE = 'org.bluez.LEAdvertisingManager1' 
-LE_ADVERTISEMENT_IFACE = 'org.bluez.LEAdvertisement1'    
-GATT_MANAGER_IFACE = 'org.bluez.GattManager1'        
-GATT_SERVICE_IFACE = 'org.bluez.GattService1'         
-GATT_CHRC_IFACE = 'org.bluez.GattCharacteristic1'     
-DBUS_OM_IFACE = 'org.freedesktop.DBus.ObjectManager'  
-DBUS_PROP_IFACE = 'org.freedesktop.DBus.Properties'     
+import threading, os, sys, stat, struct, signal
+import argparse
+
+import hid_descriptor
+
+from evdev_reader import EvdevReader, helper_frames
+from coalescer import MotionCoalescer, DEFAULT_INTERVAL_MS, QUEUE_POLICIES, DEFAULT_POLICY, DEFAULT_QUEUE_SIZE
+from input_manager import InputManager, KIND_POINTER
+from accel import PointerAccel, PRESETS, load_config
+from profiles import ProfileStore, CompiledProfile, FIELDS, PROFILE_DIR
+from keyboard import KeyboardState
+from hosts import HostManager, HostGroup
+from control import ControlServer, CONTROL_SOCKET
+from registration import Registration, find_adapters, ADAPTER_CACHE
+from watchdog import Watchdog
+from transport import SocketTransport
+from hidraw import HidrawPassthrough, is_hidraw, read_report_map, device_name
+from power import PowerManager, DEFAULT_IDLE_S, ADV_FAST_MS
+from tracing import TRACE, STARTUP, now_us
+from bluez import (LE_ADVERTISEMENT_IFACE, GATT_SERVICE_IFACE, GATT_CHRC_IFACE,
+                   DBUS_OM_IFACE, DBUS_PROP_IFACE)
+
 
 # HID 서비스 및 UUID 
 # Bluetooth SIG https://www.bluetooth.com/specifications/assigned-numbers/
@@ -25,40 +31,35 @@ REPORT_MAP_UUID = '2a4b'        # HID Report Descriptor를 보낼거라는 것
 PROTOCOL_MODE_UUID = '2a4e'     # 프로토콜 모드 (데이터 전송 방식)
 HID_INFO_UUID = '2a4a'          # HID 정보 버전과 어떤 기능을 지원하는지 알려줌
 HID_CONTROL_POINT_UUID = '2a4c' # 절전모드 같은 기능에 사용
-
-# 마우스: 버튼 3개 + X + Y + 휠
+REPORT_REFERENCE_UUID = '2908'  # 리포트 특성이 어떤 Report ID / 종류인지 알려줌 (리포트가 여러 개일 때 필요)
+
+# Report ID (리포트 맵과 Report Reference 디스크립터가 같은 값을 사용해야 함)
+MOUSE_REPORT_ID = 0x01
+KEYBOARD_REPORT_ID = 0x02
+CONSUMER_REPORT_ID = 0x03
+REPORT_TYPE_INPUT = 0x01
+
+# 리포트 맵 (hid_descriptor.py 빌더로 생성)
+# 마우스(Report ID 1): 버튼 3개 + X + Y + 휠 (high_res 이면 X/Y 16비트)
+# 키보드(Report ID 2): 수정키 8비트 + 예약 1바이트 + 키 6개
+# 소비자 제어(Report ID 3): 미디어 키 사용 코드 16비트
 # HID Descriptor Tool https://www.usb.org/document-library/hid-descriptor-tool 추가 개발 계획 X
 # -> https://github.com/microsoft/hidtools
-HID_REPORT_MAP = bytes([
-    0x05, 0x01,  # 일반적인 입력 장치 (마우스, 키보드, 게임패드)
-    0x09, 0x02,  # 마우스
-
-    0xA1, 0x01,  # HID 데이터의 시작 (Json 같은 느낌으로 묶어야함 - 들여쓰기처럼) Application 이라는 큰 틀
-    0x09, 0x01,  #   마우스 관련이라고 설정
-    0xA1, 0x00,  #   물리적 입력 데이터를 나타냄 (버튼클릭, 휠클릭)
-    0x05, 0x09,  #     버튼에 대한 설정
-    0x19, 0x01,  #     min 버튼 1개
-    0x29, 0x03,  #     max 버튼 3개 (1~3개의 버튼)
-    0x15, 0x00,  #     min 버튼 눌림
-    0x25, 0x01,  #     max 버튼 눌림 상태 (0~1)
-    0x95, 0x03,  #     버튼이 최대 3개 이므로 3개를 보냄
-    0x75, 0x01,  #     버튼 데이터 크기 1비트 (0~1)
-    0x81, 0x02,  #     실제 입력: 버튼 3개 (각 1비트, 총 3비트)
-    0x95, 0x01,  #     채우는 용도 추가 입력 1개 (패딩)  -  (후에 다시 이해 확인)
-    0x75, 0x05,  #     채우는 용도 (5비트)  -  (후에 다시 이해 확인)
-    0x81, 0x03,  #     채우는 용도 (패딩)  -  (후에 다시 이해 확인)
-    0x05, 0x01,  #     마우스 이동 관련 데이터 
-    0x09, 0x30,  #       마우스 이동 X 좌표
-    0x09, 0x31,  #       마우스 이동 Y 좌표
-    0x09, 0x38,  #       마우스 휠
-    0x15, 0x81,  #       min 마우스 이동 값 1000 0001 (-127)
-    0x25, 0x7F,  #       max 마우스 이동 값 0111 1111  (127)
-    0x75, 0x08,  #       데이터 크기 8비트 (1바이트)
-    0x95, 0x03,  #       데이터 개수 3개 (X, Y, 휠)
-    0x81, 0x06,  #     입력값 3개 8비트 (마우스 이동 X, Y, 휠)
-    0xC0,        #   물리적 입력 데이터 설정 끝
-    0xC0         # HID 데이터 끝 Application의 끝
-])
+def build_report_map(high_res=False):
+    return hid_descriptor.ReportMap(
+        hid_descriptor.mouse(MOUSE_REPORT_ID, buttons=3, high_res=high_res),
+        hid_descriptor.keyboard(KEYBOARD_REPORT_ID),
+        hid_descriptor.consumer(CONSUMER_REPORT_ID),
+    )
+
+DEFAULT_REPORT_MAP = build_report_map()
+
+# 광고 기본값 (프로파일의 local_name / appearance)
+DEFAULT_LOCAL_NAME = 'Pi-BLE-Mouse'
+DEFAULT_APPEARANCE = 0x03C0   # 일반 HID (마우스 + 키보드)
+
+# 알림 PropertiesChanged 의 무효화된 속성 목록 (항상 비어 있음 - 알림마다 새로 만들지 않음)
+NO_INVALIDATED = dbus.Array([], signature='s')
 
 # 마우스 이동 데이터 입력 시
 #      _
@@ -67,26 +68,19 @@ HID_REPORT_MAP = bytes([
 #
 #      +
 
-def find_adapter(bus):
-    remote_om = dbus.Interface(bus.get_object(BLUEZ_SERVICE, '/'), DBUS_OM_IFACE)
-    objects = remote_om.GetManagedObjects()
-    for path, ifaces in objects.items():
-        if ADAPTER_IFACE in ifaces:
-            return path
-    return None
-
 # D-Bus 서비스 클래스
 class Advertisement(dbus.service.Object):
     PATH_BASE = '/org/bluez/example/advertisement'
 
-    def __init__(self, bus, index):
+    def __init__(self, bus, index, local_name=DEFAULT_LOCAL_NAME, appearance=DEFAULT_APPEARANCE, intervals=None):
         self.path = self.PATH_BASE + str(index)
         self.bus = bus
         self.ad_type = 'peripheral' # 광고 타입: 주변 장치
         self.service_uuids = [HID_SERVICE_UUID] # 광고할 서비스 UUID 목록
-        self.appearance = 0x03C2  # 장치 : 일반 마우스
-        self.local_name = 'Pi-BLE-Mouse' # 로컬 장치 이름
+        self.appearance = appearance  # 장치 외형 (기본: 일반 HID)
+        self.local_name = local_name  # 로컬 장치 이름
         self.discoverable = True # 검색 가능 여부
+        self.intervals = intervals  # 광고 간격 (최소, 최대 ms) - None 이면 BlueZ 기본값 (절전이 바꿈)
         dbus.service.Object.__init__(self, bus, self.path)
 
     def get_properties(self):
@@ -96,6 +90,9 @@ class Advertisement(dbus.service.Object):
         properties['Appearance'] = dbus.UInt16(self.appearance)
         properties['LocalName'] = dbus.String(self.local_name)
         properties['Discoverable'] = dbus.Boolean(self.discoverable)
+        if self.intervals is not None:
+            properties['MinInterval'] = dbus.UInt32(self.intervals[0])
+            properties['MaxInterval'] = dbus.UInt32(self.intervals[1])
         return {LE_ADVERTISEMENT_IFACE: properties}
 
     def get_path(self):
@@ -112,23 +109,60 @@ class Advertisement(dbus.service.Object):
         print(f'{self.path} 해제됨')
 
 class Application(dbus.service.Object):
-    PATH = '/org/bluez/example/app'
+    # prefix: 객체 경로 접두어 - 여러 어댑터면 어댑터마다 트리 하나 (/org/bluez/example/hci1/...)
+    PATH_PREFIX = '/org/bluez/example'
 
-    def __init__(self, bus):
-        self.path = self.PATH
+    def __init__(self, bus, report_map=DEFAULT_REPORT_MAP, prefix=PATH_PREFIX):
+        self.path = prefix + '/app'
         dbus.service.Object.__init__(self, bus, self.path)
         self.services = []
-        self.add_service(HIDService(bus, 0))
+        self._managed_objects = None # GetManagedObjects 캐시 (값/서비스 변경 시 무효화)
+        self.on_notify_state = None  # on_notify_state() - 알림 구독/라우팅이 바뀜 - PowerManager 가 설정
+        self.on_control_point = None # on_control_point(장치 경로, suspend 여부) - PowerManager 가 설정
+        self.add_service(HIDService(bus, 0, report_map, prefix))
         # 필요한 경우 DeviceInformationService 추가
 
     def get_path(self):
         return dbus.ObjectPath(self.path)
 
     def add_service(self, service):
+        service.application = self
         self.services.append(service)
+        self.invalidate()
+
+    def invalidate(self):
+        self._managed_objects = None
+
+    def reset_notifying(self):
+        # bluetoothd 재시작/어댑터 교체 후 - 이전 구독은 모두 사라졌으므로 호스트가 다시 구독할 때까지 알림 중지
+        # (여러 어댑터면 트리가 어댑터마다 따로라 그 어댑터의 구독만 지워짐)
+        for service in self.services:
+            for chrc in service.get_characteristics():
+                for desc in chrc.get_descriptors():
+                    if isinstance(desc, ClientCharCfgDescriptor):
+                        desc.subscribers.clear()
+                chrc.notifying = False
+        self.notify_state_changed()
+
+    def set_routed(self, routed):
+        # 활성 호스트가 리포트를 받을 수 있을 때만 입력 특성이 알림을 보냄
+        for service in self.services:
+            for chrc in service.get_characteristics():
+                chrc.routed = routed
+        self.notify_state_changed()
+
+    def notify_state_changed(self):
+        if self.on_notify_state is not None:
+            self.on_notify_state()
 
     @dbus.service.method(DBUS_OM_IFACE, out_signature='a{oa{sa{sv}}}')
     def GetManagedObjects(self):
+        # BlueZ 가 등록/재연결 때마다 호출 - 트리는 한 번만 만들고 변경이 있을 때만 다시 만듦
+        if self._managed_objects is None:
+            self._managed_objects = self.build_managed_objects()
+        return self._managed_objects
+
+    def build_managed_objects(self):
         response = {}
         response[self.get_path()] = {} # 애플리케이션 경로 포함
         for service in self.services:
@@ -143,17 +177,23 @@ class Application(dbus.service.Object):
         return response
 
 class Service(dbus.service.Object):
-    PATH_BASE = '/org/bluez/example/service'
 
-    def __init__(self, bus, index, uuid, primary):
-        self.path = self.PATH_BASE + str(index)
+    def __init__(self, bus, index, uuid, primary, prefix=Application.PATH_PREFIX):
+        self.path = prefix + '/service' + str(index)
         self.bus = bus
         self.uuid = uuid
         self.primary = primary # 기본 서비스 여부
         self.characteristics = [] # 서비스에 속한 특성 목록
+        self.application = None # 이 서비스가 속한 애플리케이션 (add_service 시 설정)
+        self._properties = None # get_properties 캐시
         dbus.service.Object.__init__(self, bus, self.path)
 
     def get_properties(self):
+        if self._properties is None:
+            self._properties = self.build_properties()
+        return self._properties
+
+    def build_properties(self):
         return {
             GATT_SERVICE_IFACE: {
                 'UUID': self.uuid,
@@ -169,6 +209,13 @@ class Service(dbus.service.Object):
 
     def add_characteristic(self, characteristic):
         self.characteristics.append(characteristic)
+        self.invalidate()
+
+    def invalidate(self):
+        # 서비스 속성 또는 하위 특성이 바뀌면 애플리케이션 트리 캐시도 무효화
+        self._properties = None
+        if self.application is not None:
+            self.application.invalidate()
 
     def get_characteristic_paths(self):
         return [chrc.get_path() for chrc in self.characteristics]
@@ -192,11 +239,18 @@ class Characteristic(dbus.service.Object):
         self.service = service # 이 특성이 속한 서비스
         self.flags = flags     # 특성 속성 플래그 (e.g., ['read', 'notify'])
         self.notifying = False # 알림 활성화 상태
+        self.routed = True     # 활성 호스트로 라우팅 가능 여부 (HostManager)
         self._value = []       # 특성 값을 저장하는 내부 변수
         self.descriptors = []  # 이 특성에 속한 디스크립터 목록
+        self._properties = None # get_properties 캐시
         dbus.service.Object.__init__(self, bus, self.path)
 
     def get_properties(self):
+        if self._properties is None:
+            self._properties = self.build_properties()
+        return self._properties
+
+    def build_properties(self):
         props = {
             'Service': self.service.get_path(),
             'UUID': self.uuid,
@@ -217,6 +271,16 @@ class Characteristic(dbus.service.Object):
 
     def add_descriptor(self, descriptor):
         self.descriptors.append(descriptor)
+        self.invalidate()
+
+    def set_value(self, value):
+        # ReadValue 결과(= 'Value' 속성)가 바뀌는 경우에만 사용 - 캐시 무효화
+        self._value = value
+        self.invalidate()
+
+    def invalidate(self):
+        self._properties = None
+        self.service.invalidate()
 
     def get_descriptor_paths(self):
         return [desc.get_path() for desc in self.descriptors]
@@ -238,7 +302,7 @@ class Characteristic(dbus.service.Object):
     @dbus.service.method(GATT_CHRC_IFACE, in_signature='aya{sv}')
     def WriteValue(self, value, options):
         print(f'{self.uuid} 에 대한 기본 WriteValue 호출됨: {value}')
-        self._value = bytes(value) # 바이트로 저장
+        self.set_value(bytes(value)) # 바이트로 저장
 
     @dbus.service.method(GATT_CHRC_IFACE)
     def StartNotify(self):
@@ -247,6 +311,8 @@ class Characteristic(dbus.service.Object):
             return
         print(f'{self.uuid} 에 대한 알림 시작 중')
         self.notifying = True
+        if self.service.application is not None:
+            self.service.application.notify_state_changed()
 
     @dbus.service.method(GATT_CHRC_IFACE)
     def StopNotify(self):
@@ -255,6 +321,8 @@ class Characteristic(dbus.service.Object):
             return
         print(f'{self.uuid} 에 대한 알림 중지 중')
         self.notifying = False
+        if self.service.application is not None:
+            self.service.application.notify_state_changed()
 
     # 값 변경 시 알림(Notification)을 위한 시그널
     @dbus.service.signal(DBUS_PROP_IFACE, signature='sa{sv}as')
@@ -271,9 +339,15 @@ class Descriptor(dbus.service.Object):
         self.flags = flags
         self.characteristic = characteristic # 이 디스크립터가 속한 특성
         self._value = [] # 디스크립터 값을 저장하는 내부 변수
+        self._properties = None # get_properties 캐시
         dbus.service.Object.__init__(self, bus, self.path)
 
     def get_properties(self):
+        if self._properties is None:
+            self._properties = self.build_properties()
+        return self._properties
+
+    def build_properties(self):
         props = {
             'Characteristic': self.characteristic.get_path(),
             'UUID': self.uuid,
@@ -287,6 +361,14 @@ class Descriptor(dbus.service.Object):
     def get_path(self):
         return dbus.ObjectPath(self.path)
 
+    def set_value(self, value):
+        self._value = value
+        self.invalidate()
+
+    def invalidate(self):
+        self._properties = None
+        self.characteristic.invalidate()
+
     @dbus.service.method(DBUS_PROP_IFACE, in_signature='s', out_signature='a{sv}')
     def GetAll(self, interface):
         if interface != 'org.bluez.GattDescriptor1':
@@ -301,7 +383,7 @@ class Descriptor(dbus.service.Object):
     @dbus.service.method('org.bluez.GattDescriptor1', in_signature='aya{sv}')
     def WriteValue(self, value, options):
         print(f'디스크립터 {self.uuid} 에 대한 기본 WriteValue 호출됨: {value}')
-        self._value = bytes(value)
+        self.set_value(bytes(value))
 
 # 클라이언트 특성 구성 디스크립터
 class ClientCharCfgDescriptor(Descriptor):
@@ -316,6 +398,9 @@ class ClientCharCfgDescriptor(Descriptor):
                 characteristic)
         # 기본값은 0x0000 (알림 및 표시 비활성화)
         self._value = bytes([0x00, 0x00])
+        # 구독 중인 장치 경로 (BlueZ 가 'device' 옵션을 넘겨주는 경우) - 여러 호스트가 같은 특성을
+        # 구독하므로 마지막 구독이 해제될 때 알림을 멈춤
+        self.subscribers = set()
 
     def ReadValue(self, options):
         print(f"CCCD 값 읽기: {list(self._value)}")
@@ -327,10 +412,18 @@ class ClientCharCfgDescriptor(Descriptor):
              raise dbus.exceptions.DBusException('잘못된 인수') # 또는 InvalidValueLength
 
         # 값 업데이트
-        self._value = bytes(value)
+        self.set_value(bytes(value))
 
         # 알림 비트(bit 0) 확인
-        if self._value[0] & 0x01:
+        enabled = bool(self._value[0] & 0x01)
+        device = options.get('device')
+        if device is not None:
+            if enabled:
+                self.subscribers.add(str(device))
+            else:
+                self.subscribers.discard(str(device))
+                enabled = bool(self.subscribers)
+        if enabled:
             print("클라이언트에 의해 알림 활성화됨")
             if not self.characteristic.notifying:
                 self.characteristic.StartNotify() # 특성의 알림 시작 메소드 호출
@@ -344,23 +437,49 @@ class ClientCharCfgDescriptor(Descriptor):
             print("클라이언트에 의해 표시 활성화됨 (지원되지 않음, 무시)")
 
 
+# 리포트 참조 디스크립터 - 이 리포트 특성의 Report ID 와 종류(입력/출력/기능)
+class ReportReferenceDescriptor(Descriptor):
+    def __init__(self, bus, index, characteristic, report_id, report_type=REPORT_TYPE_INPUT):
+        Descriptor.__init__(self, bus, index, REPORT_REFERENCE_UUID, ['read'], characteristic)
+        self._value = dbus.Array([report_id, report_type], signature='y')
+
+    def ReadValue(self, options):
+        return self._value
+
+
 # --- HID 서비스 및 특성 ---
 
 class HIDService(Service):
-    def __init__(self, bus, index):
-        Service.__init__(self, bus, index, HID_SERVICE_UUID, True)
+    def __init__(self, bus, index, report_map=DEFAULT_REPORT_MAP, prefix=Application.PATH_PREFIX):
+        Service.__init__(self, bus, index, HID_SERVICE_UUID, True, prefix)
         # 필요한 특성들을 올바른 순서로 인스턴스화하고 추가
         self.protocol_mode = ProtocolModeChar(bus, 0, self)
-        self.report_map = ReportMapChar(bus, 1, self)
+        self.report_map = ReportMapChar(bus, 1, self, report_map.data)
         self.hid_info = HIDInfoChar(bus, 2, self)
         self.hid_control = HIDCtrlPoint(bus, 3, self)
-        self.mouse_input = MouseInputChar(bus, 4, self) # 우리가 사용할 마우스 입력 특성
+        if 'mouse' in report_map:
+            self.mouse_input = MouseInputChar(bus, 4, self, report_map['mouse']) # 우리가 사용할 마우스 입력 특성
+            self.keyboard_input = KeyboardInputChar(bus, 5, self, report_map['keyboard']) # 키보드 입력 특성
+            self.consumer_input = ConsumerInputChar(bus, 6, self, report_map['consumer']) # 미디어 키 입력 특성
+            self.inputs = {MOUSE_REPORT_ID: self.mouse_input, KEYBOARD_REPORT_ID: self.keyboard_input,
+                           CONSUMER_REPORT_ID: self.consumer_input}
+        else:
+            # hidraw 패스스루 - 장치 리포트 맵의 입력 리포트마다 리포트 특성 하나 (Report ID 없는 장치는 0)
+            self.mouse_input = self.keyboard_input = self.consumer_input = None
+            self.inputs = {report_id: InputReportChar(bus, 4 + i, self, report_id, size)
+                           for i, (report_id, size) in enumerate(sorted(report_map.inputs.items()))}
 
         self.add_characteristic(self.protocol_mode)
         self.add_characteristic(self.report_map)
         self.add_characteristic(self.hid_info)
         self.add_characteristic(self.hid_control)
-        self.add_characteristic(self.mouse_input)
+        for chrc in self.inputs.values():
+            self.add_characteristic(chrc)
+
+    def set_report_map(self, report_map):
+        # 프로파일 변경 시 - GATT 애플리케이션을 다시 등록하기 전에 호출
+        self.report_map.set_value(dbus.Array(report_map.data, signature='y'))
+        self.mouse_input.set_report_def(report_map['mouse'])
 
 
 class ProtocolModeChar(Characteristic):
@@ -378,31 +497,32 @@ class ProtocolModeChar(Characteristic):
         print(f"프로토콜 모드 쓰기: {value}")
         # 기본 유효성 검사: 1 바이트, 0x00 (부트) 또는 0x01 (리포트) 기대
         if len(value) == 1 and value[0] in (0, 1):
-            self._value = [value[0]]
+            self.set_value([value[0]])
         else:
             print("프로토콜 모드에 대한 잘못된 쓰기 무시")
         # write-without-response 에는 응답 불필요
 
 
 class ReportMapChar(Characteristic):
-    def __init__(self, bus, index, service):
+    def __init__(self, bus, index, service, report_map):
         Characteristic.__init__(self, bus, index, REPORT_MAP_UUID, ['read'], service)
-        self._value = HID_REPORT_MAP # 리포트 맵 바이트 저장
+        # 리포트 맵은 변하지 않으므로 D-Bus 값으로 한 번만 변환해 둠
+        self._value = dbus.Array(report_map, signature='y')
 
     def ReadValue(self, options):
         print("리포트 맵 읽기")
-        return dbus.Array(self._value, signature='y')
+        return self._value
 
 
 class HIDInfoChar(Characteristic):
     def __init__(self, bus, index, service):
         Characteristic.__init__(self, bus, index, HID_INFO_UUID, ['read'], service)
         # bcdHID (예: 1.11), bCountryCode (0 = 지역화 안됨), Flags (일반 연결)
-        self._value = struct.pack('<HBB', 0x0111, 0x00, 0x02) # v1.11, 국가 0, 플래그=일반
+        self._value = dbus.Array(struct.pack('<HBB', 0x0111, 0x00, 0x02), signature='y') # v1.11, 국가 0, 플래그=일반
 
     def ReadValue(self, options):
         print("HID 정보 읽기")
-        return dbus.Array(self._value, signature='y')
+        return self._value
 
 
 class HIDCtrlPoint(Characteristic):
@@ -412,152 +532,784 @@ class HIDCtrlPoint(Characteristic):
         # 이 특성은 쓰기 전용이며, 영구적인 값은 없음
 
     def WriteValue(self, value, options):
-        # 필요한 경우 Suspend (0x00) / Exit Suspend (0x01) 처리
-        print(f"HID 제어 포인트 쓰기: {value}")
-        if value and value[0] == 0x00:
-            print("Suspend 명령 수신 (무시됨)")
-        elif value and value[0] == 0x01:
-            print("Exit Suspend 명령 수신 (무시됨)")
+        # Suspend (0x00) / Exit Suspend (0x01) - 절전(PowerManager)으로 전달 (호스트가 잠들면 입력/광고를 줄임)
+        if not value or value[0] not in (0x00, 0x01):
+            print(f"HID 제어 포인트: 알 수 없는 값 무시: {list(value)}")
+            return
+        suspend = value[0] == 0x00
+        print("호스트 Suspend" if suspend else "호스트 Exit Suspend")
+        app = self.service.application
+        if app is not None and app.on_control_point is not None:
+            app.on_control_point(options.get('device'), suspend)
         # 응답 불필요
 
 
 class MouseInputChar(Characteristic):
-    def __init__(self, bus, index, service):
+    def __init__(self, bus, index, service, report_def):
         Characteristic.__init__(self, bus, index, REPORT_UUID,
                                 ['read', 'notify'], service) # 읽기 및 알림 가능 플래그
+        # 리포트 맵과 같은 정의에서 만든 패커 (8비트: '<Bbbb', 16비트: '<Bhhb')
+        # 형식: 버튼 (1 바이트), dx, dy (1 또는 2 바이트), 휠 (1 바이트)
+        self.packer = report_def.packer
+        self.limit = report_def.limit
         # 초기 리포트 (버튼 없음, 움직임 없음)
-        # 형식: 버튼 (1 바이트), dx (1 바이트), dy (1 바이트), 휠 (1 바이트)
-        self._value = bytes([0x00, 0x00, 0x00, 0x00])
+        self._value = bytes(self.packer.size)
+        # 알림마다 새로 만들지 않고 재사용 (리포트당 할당은 dbus.ByteArray 하나)
+        self._report = bytearray(self.packer.size)
+        self._changed = {'Value': None}
         # 알림을 허용하기 위해 CCCD 추가
         self.add_descriptor(ClientCharCfgDescriptor(bus, 0, self))
+        self.add_descriptor(ReportReferenceDescriptor(bus, 1, self, report_def.report_id))
+
+    def set_report_def(self, report_def):
+        self.packer = report_def.packer
+        self.limit = report_def.limit
+        self._value = bytes(self.packer.size)
+        self._report = bytearray(self.packer.size)
+        self.invalidate()
 
     def ReadValue(self, options):
         # 호스트가 이 값을 읽을 수 있음. 마지막 전송된 리포트 또는 0을 반환.
         print("마우스 입력 리포트 읽기 (0 반환)")
-        return dbus.Array([0x00, 0x00, 0x00, 0x00], signature='y')
+        return dbus.Array(bytes(self.packer.size), signature='y')
 
-    def send_report(self, buttons=0, dx=0, dy=0, wheel=0):
-        if not self.notifying:
-            print("리포트를 보낼 수 없음, 알림 상태 아님.")
+    def pack(self, buttons=0, dx=0, dy=0, wheel=0):
+        # dx, dy 는 리포트 축 범위 [-limit, limit], wheel 은 부호 있는 8비트 범위 [-127, 127]로 제한
+        # (MotionCoalescer 가 이미 나눠서 보내므로 여기서는 안전장치 역할만 함)
+        limit = self.limit
+        dx_c = max(-limit, min(limit, dx))
+        dy_c = max(-limit, min(limit, dy))
+        wheel_c = max(-127, min(127, wheel))
+
+        # 리포트 데이터 패킹 (재사용 버퍼에)
+        # buttons: 하위 3비트 사용
+        self.packer.pack_into(self._report, 0, buttons & 0x07, dx_c, dy_c, wheel_c)
+        # ReadValue 는 항상 0 을 반환하므로 _value 갱신/캐시 무효화 불필요
+        return dbus.ByteArray(self._report)   # 'ay' 로 바로 직렬화 (바이트별 객체 없음), 불변이라 트리끼리 공유 가능
+
+    def emit(self, value):
+        if not self.notifying or not self.routed:
             return
+        # PropertiesChanged 시그널을 통해 알림 전송 (시그널은 호출 중에 직렬화되므로 dict 재사용 가능)
+        changed = self._changed
+        changed['Value'] = value
+        self.PropertiesChanged(GATT_CHRC_IFACE, changed, NO_INVALIDATED)
 
-        # dx, dy, wheel 값을 부호 있는 8비트 범위 [-127, 127]로 제한
-        def clamp_s8(n):
-            return max(-127, min(127, n))
+    def send_report(self, buttons=0, dx=0, dy=0, wheel=0):
+        tracing = TRACE.enabled
+        if tracing:
+            t0 = now_us()
+        if not self.notifying or not self.routed:
+            return   # 알림 구독 전 / 호스트 전환 중 (코얼레서가 대기열에 넣기 전에 이미 버림)
+        value = self.pack(buttons, dx, dy, wheel)
+        if tracing:
+            t1 = now_us()
+            TRACE.record('send', t1 - t0)
+        self.emit(value)
+        if tracing:
+            TRACE.record('emit', now_us() - t1)
+
+
+# 미리 패킹된 리포트를 그대로 알림으로 보내는 입력 리포트 특성 (키보드, 소비자 제어)
+class InputReportChar(Characteristic):
+    def __init__(self, bus, index, service, report_id, size):
+        Characteristic.__init__(self, bus, index, REPORT_UUID,
+                                ['read', 'notify'], service)
+        self._value = bytes(size)
+        self._changed = {'Value': None}
+        self.add_descriptor(ClientCharCfgDescriptor(bus, 0, self))
+        self.add_descriptor(ReportReferenceDescriptor(bus, 1, self, report_id))
 
-        dx_c = clamp_s8(dx)
-        dy_c = clamp_s8(dy)
-        wheel_c = clamp_s8(wheel)
+    def ReadValue(self, options):
+        return dbus.Array(bytes(len(self._value)), signature='y')
 
-        # 리포트 데이터 패킹
-        # buttons: 하위 3비트 사용
-        # dx, dy, wheel: 부호 있는 8비트 값
-        report_bytes = struct.pack('<Bbbb', buttons & 0x07, dx_c, dy_c, wheel_c)
-        self._value = report_bytes # 필요한 경우 내부 값 업데이트
+    def pack(self, report):
+        # report: 상태가 바뀐 경우에만 만들어진 리포트 바이트
+        self._value = report
+        return dbus.ByteArray(report)
 
-        print(f"리포트 전송: 버튼={buttons & 0x07}, dx={dx_c}, dy={dy_c}, 휠={wheel_c}")
+    def emit(self, value):
+        if not self.notifying or not self.routed:
+            return
+        changed = self._changed
+        changed['Value'] = value
+        self.PropertiesChanged(GATT_CHRC_IFACE, changed, NO_INVALIDATED)
+
+    def send_report(self, report):
+        if not self.notifying or not self.routed:
+            return
+        self.emit(self.pack(report))
+
+
+class KeyboardInputChar(InputReportChar):
+    def __init__(self, bus, index, service, report_def):
+        # 형식: 수정키 (1 바이트), 예약 (1 바이트), 키 6개 (각 1 바이트) - 크기는 리포트 맵 정의에서
+        InputReportChar.__init__(self, bus, index, service, report_def.report_id, report_def.packer.size)
+
+
+class ConsumerInputChar(InputReportChar):
+    def __init__(self, bus, index, service, report_def):
+        # 형식: 소비자 제어 사용 코드 (2 바이트, 0 = 없음)
+        InputReportChar.__init__(self, bus, index, service, report_def.report_id, report_def.packer.size)
+
+# ---------- 출력 (BLE GATT) ----------
+def fan_out(chars):
+    # 어댑터마다 GATT 트리가 따로 있으므로 리포트를 모든 트리의 같은 특성으로 보냄 (어댑터가 하나면 그대로)
+    # 패킹과 dbus.ByteArray 는 리포트당 한 번 - 불변 값을 모든 트리가 같이 씀
+    # (시그널은 객체 경로마다 하나라 트리마다 emit - BlueZ 는 자기 어댑터 트리의 시그널만 봄)
+    if len(chars) == 1:
+        return chars[0].send_report
+    first = chars[0]
+
+    def send(*report):
+        tracing = TRACE.enabled
+        if tracing:
+            t0 = now_us()
+        if not any(chrc.notifying and chrc.routed for chrc in chars):
+            return
+        value = first.pack(*report)
+        if tracing:
+            t1 = now_us()
+            TRACE.record('send', t1 - t0)
+        for chrc in chars:
+            chrc.emit(value)
+        if tracing:
+            TRACE.record('emit', now_us() - t1)
+    return send
+
+
+# transport.py 의 출력 인터페이스 - D-Bus 연결, 광고 + GATT 등록 (감시자가 다시 등록), 본딩 호스트 관리
+class GattTransport:
+    def __init__(self, profile, adapter_cache, watchdog, report_map=None, adapters='first', advertising_ms=None,
+                 bus_address=None):
+        # report_map: 프로파일 대신 쓸 리포트 맵 (hidraw 패스스루의 장치 리포트 맵)
+        # advertising_ms: 광고 간격 (최소, 최대 ms) - 절전이 켜져 있으면 빠른 간격으로 시작
+        # adapters  : first (첫 어댑터, 경로 캐시 사용), all (모든 어댑터), 또는 hci0,hci1 처럼 이름 목록
+        # 여러 어댑터: 어댑터마다 GATT 트리(Application)를 따로 만들어 등록 (광고 객체만 공유)
+        #  -> BlueZ 는 어댑터마다 StartNotify/StopNotify 를 따로 부르므로 구독/라우팅 상태도 어댑터별
+        #     (한 어댑터의 호스트가 구독을 끊어도 다른 어댑터는 계속 받음)
+        #     리포트는 한 번만 패킹해 같은 값을 공유, 시그널은 어댑터 트리마다 하나 (fan_out)
+        # bus_address: 시스템 버스 대신 연결할 D-Bus 주소 (벤치마크의 가짜 BlueZ, 샤드 작업 프로세스)
+        dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+        self.bus = bus = dbus.bus.BusConnection(bus_address) if bus_address else dbus.SystemBus()
+
+        report_map = report_map or profile.report_map
+        self.advert = Advertisement(bus, 0, profile['local_name'], profile['appearance'], advertising_ms)
+        if adapters == 'first':
+            registration = Registration(bus, Application(bus, report_map), self.advert, adapter_cache)
+            registration.connect()   # 어댑터가 없으면 OSError
+            self.registrations = {'bluez': registration}
+        else:
+            paths = find_adapters(bus, None if adapters == 'all' else adapters.split(','))
+            if not paths:
+                raise OSError(f"블루투스 어댑터를 찾을 수 없습니다 ({adapters})")
+            self.registrations = {}
+            for path in paths:
+                name = os.path.basename(path)
+                prefix = f'{Application.PATH_PREFIX}/{name}' if len(paths) > 1 else Application.PATH_PREFIX
+                self.registrations[f'bluez:{name}'] = Registration(bus, Application(bus, report_map, prefix),
+                                                                   self.advert, '', path)
+            for registration in self.registrations.values():
+                registration.connect()
+            print(f"어댑터 {len(paths)}개: {', '.join(paths)}")
+        self.apps = [registration.app for registration in self.registrations.values()]
+        self.app = self.apps[0]
+        for registration in self.registrations.values():
+            registration.on_advertising = lambda: (print("광고 등록됨"), STARTUP.mark('광고 시작'))
+            registration.on_application = lambda: (print("GATT 애플리케이션 등록됨"), STARTUP.mark('GATT 등록'))
+
+        # 본딩된 호스트 관리 - 활성 호스트만 리포트를 받도록 라우팅 (여러 어댑터면 어댑터마다 활성 호스트 하나)
+        # 어댑터마다 라우팅은 그 어댑터의 트리에만 적용
+        if len(self.registrations) == 1:
+            self.host_manager = HostManager(bus, registration.adapter_path, on_route=self.app.set_routed)
+            managers = {registration.adapter_path: self.host_manager}
+        else:
+            self.host_manager = HostGroup(bus, {r.adapter_path: r.app.set_routed
+                                                for r in self.registrations.values()})
+            managers = self.host_manager.managers
+
+        # BlueZ 등록 - bluetoothd 재시작/어댑터 교체 시 감시자가 그 어댑터만 다시 등록
+        for name, registration in self.registrations.items():
+            self._supervise(watchdog, name, registration, managers[registration.adapter_path])
+
+        # HID 입력 특성 (어댑터마다 하나씩 - 보내기는 모든 어댑터로)
+        self.hids = hids = [app.services[0] for app in self.apps]
+        self.hid = hids[0]
+        self.mouse = self.hid.mouse_input
+        # 입력 리포트 ID -> 모든 어댑터로 보내는 함수 (hidraw 패스스루)
+        self.inputs = {rid: fan_out([hid.inputs[rid] for hid in hids]) for rid in self.hid.inputs}
+        if self.mouse is not None:
+            self.send_report = fan_out([hid.mouse_input for hid in hids])
+            self.send_keyboard = fan_out([hid.keyboard_input for hid in hids])
+            self.send_consumer = fan_out([hid.consumer_input for hid in hids])
+        else:
+            # 패스스루 - 리포트는 hidraw 에서 inputs 로 바로 감 (ready() 가 거짓이라 코얼레서는 쓰이지 않음)
+            self.send_report = self.send_keyboard = self.send_consumer = lambda *report: None
+
+    def _supervise(self, watchdog, name, registration, host_manager):
+        app = registration.app
+
+        def start_bluez():
+            previous = registration.adapter_path
+            registration.register(lambda: watchdog.recovered(name),
+                                  lambda e: watchdog.failed(name, f"등록 실패: {e}"))
+            if watchdog.components[name].failures:
+                # 다시 등록하는 경우 - 이 어댑터의 트리의 이전 구독/연결 상태는 모두 무효
+                app.reset_notifying()
+                host_manager.reload(registration.adapter_path)
+                if registration.adapter_path != previous:
+                    print(f"[감시] 어댑터 변경: {previous} -> {registration.adapter_path}")
+            return False
+
+        watchdog.add(name, start_bluez)
+        registration.watch(on_lost=lambda reason: watchdog.hold(name, reason),
+                           on_back=lambda: watchdog.kick(name))
+        watchdog.start(name)
+
+    @property
+    def limit(self):
+        return self.mouse.limit if self.mouse is not None else hid_descriptor.S8_LIMIT
+
+    def ready(self):
+        # 어느 어댑터든 마우스 리포트를 받을 호스트가 있는지
+        return self.mouse is not None and any(hid.mouse_input.notifying and hid.mouse_input.routed
+                                              for hid in self.hids)
+
+    def subscribed(self):
+        # 리포트를 받을 호스트가 있는지 (어느 어댑터든 입력 특성 중 하나라도 구독 + 라우팅) - 절전의 off 판정
+        return any(chrc.notifying and chrc.routed for hid in self.hids for chrc in hid.inputs.values())
+
+    def set_report_map(self, report_map, on_change=None):
+        # 리포트 맵은 GATT 애플리케이션을 다시 등록해야 호스트가 다시 읽음
+        if self.mouse is None:
+            print("[패스스루] 장치의 리포트 맵을 그대로 사용합니다 (프로파일의 high_res 무시)")
+            return
+
+        # 모든 어댑터에서 등록 해제 -> 트리 변경 -> 다시 등록 (변경 전 트리를 읽어가는 어댑터가 없도록)
+        registrations = list(self.registrations.values())
+        pending = [len(registrations)]
+
+        def unregistered():
+            pending[0] -= 1
+            if pending[0]:
+                return
+            for hid in self.hids:
+                hid.set_report_map(report_map)
+            if on_change is not None:
+                on_change()
+            for registration in registrations:
+                registration.register_application()
+        for registration in registrations:
+            registration.unregister_application(unregistered)
+
+    def set_advertisement(self, local_name, appearance):
+        self.advert.local_name = local_name
+        self.advert.appearance = appearance
+        for registration in self.registrations.values():
+            registration.reregister_advertisement()
+
+    def set_advertising_interval(self, intervals):
+        # 절전 - 광고만 다시 등록 (연결된 호스트는 그대로)
+        print(f"[절전] 광고 간격 {intervals[0]}-{intervals[1]} ms")
+        self.advert.intervals = intervals
+        for registration in self.registrations.values():
+            registration.reregister_advertisement()
+
+    def close(self):
+        self.host_manager.release()
+        for registration in self.registrations.values():
+            registration.unregister()
+
+# ---------- 입력 중계 ----------
+def is_char_device(path):
+    # evdev 노드인지 (녹화 파일이 아닌지)
+    try:
+        return stat.S_ISCHR(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+# 입력 프레임 (dx, dy, wheel, buttons, ts) -> sink.push (가속 단계 또는 코얼레서)
+# 코얼레서는 알림 슬롯마다 GLib 메인 루프에서 전송
+def relay_thread(frames, sink):
+    push = sink.push
+    for dx, dy, wheel, buttons, ts in frames:
+        push(dx, dy, wheel, buttons, ts)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Raspberry Pi BLE HID 허브')
+    parser.add_argument('--profile', metavar='NAME',
+                        help='프로파일 이름 (<프로파일 디렉터리>/NAME.json, 파일이 바뀌면 실행 중에 다시 적용) '
+                             '- 명령줄에서 직접 지정한 값이 우선')
+    parser.add_argument('--profile-dir', default=PROFILE_DIR, help='프로파일 디렉터리')
+    parser.add_argument('--name', dest='local_name', default=DEFAULT_LOCAL_NAME, help='광고 이름')
+    parser.add_argument('--device', default='auto',
+                        help='auto: /dev/input 의 마우스를 모두 찾아 사용 (핫플러그 지원), '
+                             '또는 입력 장치 경로 / 녹화된 이벤트 파일, '
+                             '/dev/hidrawN 이면 패스스루 (장치 리포트 맵과 리포트를 그대로 전달, python3 hidraw.py 로 목록)')
+    parser.add_argument('--reader', choices=('builtin', 'helper'), default='builtin',
+                        help='builtin: evdev 직접 읽기, helper: get_mouse_sensor 파이프')
+    parser.add_argument('--interval-ms', type=int, default=DEFAULT_INTERVAL_MS,
+                        help='리포트 전송 간격 (BLE 연결 간격에 맞춤)')
+    parser.add_argument('--queue-policy', choices=QUEUE_POLICIES, default=DEFAULT_POLICY,
+                        help='대기열이 넘칠 때: merge(합침), drop-oldest(오래된 것 버림), '
+                             'keep-buttons(버튼 전환은 유지하고 움직임만 버림)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='입력 -> 알림 대기열 슬롯 수 (고정 크기, 버튼/키 전환이 넘칠 때만 늘어남)')
+    parser.add_argument('--accel', choices=sorted(PRESETS), default='off',
+                        help='포인터 가속 프리셋 (--accel-config 가 있으면 그 파일의 default 사용)')
+    parser.add_argument('--accel-config', metavar='FILE',
+                        help='가속 설정 JSON: {"default": 프리셋|설정, "hosts": {"주소|이름": 프리셋|설정}}')
+    parser.add_argument('--high-res', action='store_true',
+                        help='마우스 X/Y 를 16비트로 전송 (빠른 움직임도 리포트 1개에 담김)')
+    parser.add_argument('--output', default='gatt', metavar='gatt|udp:HOST:PORT|unix:PATH',
+                        help='리포트 출력: gatt (BLE 알림), udp/unix (같은 HID 리포트를 데이터그램으로, '
+                             '받는 쪽에서 python3 uinput_receiver.py 실행)')
+    parser.add_argument('--adapters', default='first', metavar='first|all|hci0,hci1',
+                        help='광고 + GATT 를 등록할 어댑터: first (첫 어댑터), all (모든 어댑터 - 어댑터마다 '
+                             '호스트를 따로 연결해 동시에 전송), 또는 이름 목록')
+    parser.add_argument('--shard', action='store_true',
+                        help='어댑터마다 작업 프로세스를 따로 실행 (입력은 공유 메모리 링으로 전달, 가속/코얼레싱/알림은 '
+                             '작업마다 다른 CPU 에서) - 작업 상태는 python3 control.py output')
+    parser.add_argument('--adapter-cache', default=ADAPTER_CACHE, metavar='FILE',
+                        help='어댑터 경로 캐시 (빈 문자열이면 매번 BlueZ 전체 객체 목록에서 검색)')
+    parser.add_argument('--control-socket', default=CONTROL_SOCKET,
+                        help='제어 소켓 경로 (python3 control.py hosts | switch [번호|주소])')
+    parser.add_argument('--capture', metavar='FILE',
+                        help='읽은 input_event 를 바이너리 파일로 녹화 (python3 capture.py 로 재생 측정)')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='입력 장치 대신 --capture 로 녹화한 파일을 재생')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='재생 배속 (1 = 원래 시간 간격, 0 = 최대 속도)')
+    parser.add_argument('--runtime', choices=('thread', 'asyncio'), default='thread',
+                        help='thread: 리더 스레드 + GLib 메인 루프, '
+                             'asyncio: 읽기/코얼레싱/전송을 이벤트 루프 하나에서 (PyGObject 3.50+)')
+    parser.add_argument('--trace', action='store_true',
+                        help='단계별 지연 추적 (kill -USR1 <pid> 로 p50/p99/p99.9/max 출력)')
+    parser.add_argument('--idle-timeout', type=int, default=DEFAULT_IDLE_S, metavar='S',
+                        help='입력이 S초 동안 없으면 입력 소스를 재우고 광고 간격을 늘림 (0 = 끔, 호스트 Suspend 와 '
+                             '구독 없음 상태의 절전은 항상 동작, 상태별 CPU 는 python3 control.py power)')
+    parser.add_argument('--low-jitter', action='store_true',
+                        help='저지연 모드: 입력/알림을 CPU 하나에 고정, SCHED_FIFO(안 되면 nice), '
+                             'mlockall, 시작 후 gc.freeze (지연 꼬리 비교는 --trace 또는 python -m bench --low-jitter compare)')
+    parser.add_argument('--cpu', type=int, metavar='N', help='--low-jitter 에서 고정할 CPU (기본: 마지막 CPU)')
+    parser.add_argument('--rt-priority', type=int, default=10, metavar='1-99',
+                        help='--low-jitter 의 SCHED_FIFO 우선순위 (root 또는 CAP_SYS_NICE 필요)')
+    parser.set_defaults(appearance=DEFAULT_APPEARANCE, accel_hosts={})
+    return parser
+
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+
+def profile_base(args):
+    # 명령줄 값 중 프로파일 설정에 해당하는 것
+    return {key: getattr(args, key) for key in FIELDS}
 
-        # PropertiesChanged 시그널을 통해 알림 전송
-        self.PropertiesChanged(
-            GATT_CHRC_IFACE,
-            {'Value': dbus.Array(report_bytes, signature='y')}, # 변경된 속성 값
-            [] # 무효화된 속성 없음
-        )
 
 # ---------- 메인 ----------
 def main():
-    # D‑Bus 초기화
-    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
-    bus = dbus.SystemBus()
-
-    adapter_path = find_adapter(bus)
-    if not adapter_path:
-        print("블루투스 어댑터를 찾을 수 없습니다.")
-        sys.exit(1)
-    print(f"사용 중인 어댑터: {adapter_path}")
-
-    service_manager = dbus.Interface(
-        bus.get_object(BLUEZ_SERVICE, adapter_path), GATT_MANAGER_IFACE)
-    ad_manager = dbus.Interface(
-        bus.get_object(BLUEZ_SERVICE, adapter_path), LE_ADVERTISING_MANAGER_IFACE)
-
-    app     = Application(bus)
-    advert  = Advertisement(bus, 0)
-    mainloop = GLib.MainLoop()
-
-    # BLE 등록 콜백
-    def reg_app_cb():      print("GATT 애플리케이션 등록됨")
-    def reg_app_err_cb(e): print(f"애플리케이션 등록 실패: {e}"); mainloop.quit()
-    def reg_ad_cb():       print("광고 등록됨")
-    def reg_ad_err_cb(e):  print(f"광고 등록 실패: {e}"); mainloop.quit()
-
-    print("광고 등록 중…")
-    ad_manager.RegisterAdvertisement(
-        advert.get_path(), {}, reply_handler=reg_ad_cb, error_handler=reg_ad_err_cb)
-
-    print("GATT 애플리케이션 등록 중…")
-    service_manager.RegisterApplication(
-        app.get_path(), {}, reply_handler=reg_app_cb, error_handler=reg_app_err_cb)
-
-    # HID 입력 특성
-    mouse_char = app.services[0].mouse_input
-    if not isinstance(mouse_char, MouseInputChar):
-        print("MouseInputChar 인스턴스를 찾을 수 없습니다.")
-        sys.exit(1)
+    STARTUP.mark('임포트 완료')
+    parser = build_parser()
+    args = parser.parse_args()
+    TRACE.enabled = args.trace
 
-    # 마우스 센서 데이터를 get_mouse_sensor.c 로부터 수신하기 위한 프로세스 시작
+    # 프로파일 - 디렉터리의 프로파일을 모두 미리 컴파일 (검증, 리포트 맵, 가속 표)
+    if args.accel_config:
+        try:
+            args.accel, args.accel_hosts = load_config(args.accel_config)
+        except (OSError, ValueError) as e:
+            print(f"가속 설정 오류: {e}")
+            sys.exit(1)
+    defaults = profile_base(parser.parse_args([]))
+    cli = profile_base(args)
+    overrides = {key: value for key, value in cli.items() if value != defaults[key]}
+    store = ProfileStore(args.profile_dir, defaults, build_report_map)
+    compile_ms = store.load_all()
     try:
-        proc = subprocess.Popen(
-            ["./get_mouse_sensor", "/dev/input/event5"],        # 필요하면 경로 수정 (마우스)
-            stdout=subprocess.PIPE, stdin=subprocess.DEVNULL,
-            stderr=subprocess.STDOUT, text=True, bufsize=1
-        )
-        print("[get_mouse_sensor] 시작됨")
-    except FileNotFoundError:
-        print("get_mouse_sensor 실행 파일을 찾을 수 없습니다.")
-        sys.exit(1)
-    except PermissionError as e:
-        print(f"get_mouse_sensor 실행 권한 오류: {e}")
+        if args.profile:
+            if args.profile in store.errors:
+                raise ValueError(store.errors[args.profile])
+            profile = store.compile(args.profile, overrides)
+        else:
+            profile = CompiledProfile('명령줄', cli, build_report_map)
+    except (OSError, ValueError) as e:
+        print(f"프로파일 오류: {args.profile}: {e}")
         sys.exit(1)
+    for key, value in profile.settings.items():
+        setattr(args, key, value)
+    print(f"[프로파일] {profile.name} (프로파일 {len(store.profiles)}개 컴파일 {compile_ms:.1f} ms)")
+
+    # 런타임 선택 - asyncio 루프도 GLib 기본 메인 컨텍스트 위에서 돌기 때문에 D-Bus 처리는 같음
+    # 선택한 모드에서만 쓰는 모듈(asyncio, subprocess, 녹화)은 필요할 때 임포트 (시작 시간 단축)
+    loop = None
+    if args.runtime == 'asyncio':
+        from runtime_asyncio import new_event_loop, scheduler, watch_reader
+        loop = new_event_loop()
+        if loop is None:
+            print("asyncio 런타임에는 PyGObject 3.50 이상(gi.events)이 필요합니다. thread 런타임으로 실행합니다.")
+        elif args.reader == 'helper' or args.replay:
+            print("helper/재생 모드는 thread 런타임에서만 지원합니다.")
+            sys.exit(1)
+
+    # 저지연 모드 - 메인 스레드(GLib 루프, 알림 전송)에 적용하면 이후 만드는 입력 스레드/helper 가 물려받음
+    if args.low_jitter:
+        import realtime
+        _, applied = realtime.apply(args.cpu, args.rt_priority)
+        print(f"[저지연] {', '.join(applied)}")
+
+    # 입력은 D-Bus 연결/등록과 동시에 시작 (장치 검색, helper 실행이 등록을 기다리지 않도록)
+    # 전송 단계(코얼레서, HID 특성)는 등록 후에 연결 - 그 전의 입력은 버림 (아직 구독한 호스트도 없음)
+    def drop(*report):
+        pass
 
-    # C → Python 한줄 파싱 스레드 
-    def relay_thread():
-        for line in proc.stdout:                # “dx dy wheel buttons\n”
+    # 포인터 가속 - 표는 프로파일 컴파일 때 계산됨 (호스트별 표는 활성 호스트가 바뀔 때 적용)
+    accel = PointerAccel(drop, profile.accel_default, profile.accel_hosts)
+    keyboard = KeyboardState(drop, profile.report_map, on_consumer=drop)
+    sink = accel   # 입력 프레임을 받는 단계
+
+    # 구성 요소 감시 - 입력 소스가 죽거나 BlueZ 등록이 사라지면 그것만 다시 시작
+    watchdog = Watchdog()
+
+    # 샤딩 - 이 프로세스는 입력만 읽어 공유 메모리 링에 쓰고, 어댑터마다 작업 프로세스가 가속/코얼레싱/알림
+    # 입력이 D-Bus 등록 전에 시작하므로 링을 먼저 만듦 (작업 프로세스는 출력 단계에서 실행)
+    shards = None
+    if args.shard:
+        if args.output != 'gatt' or is_hidraw(args.device):
+            print("샤딩은 BLE 출력에서만 지원합니다 (패스스루 제외).")
+            sys.exit(1)
+        from shard import ShardSupervisor
+        dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+        names = None if args.adapters in ('first', 'all') else args.adapters.split(',')
+        paths = find_adapters(dbus.SystemBus(), names)
+        if args.adapters == 'first':
+            paths = paths[:1]
+        if not paths:
+            print(f"블루투스 어댑터를 찾을 수 없습니다 ({args.adapters})")
+            sys.exit(1)
+        try:
+            shards = ShardSupervisor([os.path.basename(path) for path in paths], profile.settings, watchdog,
+                                     args.control_socket)
+        except (OSError, ValueError) as e:
+            print(f"샤드 링 생성 실패: {e}")
+            sys.exit(1)
+        sink = shards.ring
+        keyboard = KeyboardState(shards.ring.push_keyboard, profile.report_map, on_consumer=shards.ring.push_consumer)
+        print(f"[샤드] 어댑터 {len(paths)}개, 링 {shards.ring.name} (memfd)")
+
+    # 절전 (BLE 출력만) - 호스트 Suspend, 구독 없음, 입력 없음(--idle-timeout)이면 입력 처리와 광고를 줄임
+    # 입력 소스가 배치마다 확인하므로 입력보다 먼저 만들고 출력이 준비되면 시작 (helper/재생 입력은 제외)
+    power = PowerManager(args.idle_timeout) if args.output == 'gatt' and shards is None else None
+
+    # 입력 소스 선택
+    # auto   : InputManager - 기능으로 장치를 찾아 하나의 epoll 루프에서 모두 읽음 (기본)
+    # builtin: 지정한 evdev 노드(또는 녹화 파일)를 직접 읽어 디코딩
+    # helper : get_mouse_sensor.c 텍스트 파이프 (비교용)
+    # replay : capture.py 녹화 파일을 원래 시간 간격(또는 배속)으로 재생
+    # hidraw : 패스스루 - 장치 리포트를 디코딩 없이 그대로 전달 (가속/코얼레서/키보드 상태를 거치지 않음)
+    passthrough = None
+    if is_hidraw(args.device):
+        if args.reader == 'helper' or args.replay or args.capture or args.output != 'gatt':
+            print("패스스루(hidraw)는 BLE 출력에서만 지원합니다 (helper/녹화/재생 제외).")
+            sys.exit(1)
+        try:
+            raw_map = read_report_map(args.device)   # GATT 리포트 맵으로 그대로 사용
+        except (OSError, ValueError) as e:
+            print(f"리포트 디스크립터 읽기 실패: {args.device}: {e}")
+            sys.exit(1)
+        passthrough = HidrawPassthrough(args.device, raw_map,
+                                        on_error=lambda reason: watchdog.failed('input', reason), gate=power)
+        ids = ', '.join(f'{rid}({size}B)' for rid, size in sorted(raw_map.inputs.items()))
+        print(f"[패스스루] {device_name(args.device)}: 리포트 맵 {len(raw_map.data)}바이트, 입력 리포트 {ids}")
+
+    capture = None
+    if args.capture:
+        if args.reader == 'helper' or args.replay:
+            print("녹화는 builtin 리더에서만 지원합니다.")
+            sys.exit(1)
+        from capture import CaptureWriter
+        capture = CaptureWriter(args.capture)
+    if args.reader == 'helper':
+        if args.device == 'auto':
+            print("helper 모드는 --device 로 장치 경로를 지정해야 합니다.")
+            sys.exit(1)
+        import subprocess
+    replay = None
+    if args.replay:
+        from capture import Replay
+        try:
+            replay = Replay(args.replay, args.replay_speed)
+        except (OSError, ValueError) as e:
+            print(f"녹화 파일 열기 실패: {args.replay}: {e}")
+            sys.exit(1)
+        print(f"[재생] {args.replay} (배속 {args.replay_speed or '최대'})")
+        frames = replay.frames(on_keyboard=keyboard.feed)
+        threading.Thread(target=relay_thread, args=(frames, sink), daemon=True).start()
+
+    # 장치 노드(문자 장치)가 아닌 녹화 파일은 끝까지 읽으면 끝 (다시 시작하지 않음)
+    supervise_input = args.device == 'auto' or is_char_device(args.device)
+    inputs = {'proc': None, 'manager': None}
+
+    def input_thread(target, *thread_args):
+        # 입력 스레드가 끝나거나 예외로 죽으면 감시자가 다시 시작
+        def run():
             try:
-                dx, dy, wheel, buttons = map(int, line.strip().split())
-                GLib.idle_add(mouse_char.send_report,
-                              buttons, dx, dy, wheel)
-            except ValueError:
-                continue   # 잘못된 줄 무시
-
-    threading.Thread(target=relay_thread, daemon=True).start()
+                target(*thread_args)
+                reason = '입력이 끝남'
+            except Exception as e:
+                reason = f'입력 오류: {e}'
+            if supervise_input:
+                watchdog.failed_threadsafe('input', reason)
+            else:
+                print(f"[입력] {reason}")
+        threading.Thread(target=run, daemon=True).start()
+
+    def input_stopped(reason):
+        # asyncio 런타임: 이벤트 루프에서 읽던 입력이 끝남 - input_thread 와 같이 감시자에 알림
+        if supervise_input:
+            watchdog.failed('input', reason)
+        else:
+            print(f"[입력] {reason}")
+
+    def read_device(reader):
+        with reader:
+            relay_thread(reader.frames(), sink)
+
+    def start_input():
+        # 처음 시작과 감시자의 재시작에 같이 사용 - 열기/실행 실패는 OSError
+        if passthrough is not None:
+            passthrough.open()
+            print(f"[hidraw] {args.device} 전달 시작")
+        elif args.device == 'auto':
+            manager = inputs['manager'] = InputManager(
+                sink.push, on_keyboard=keyboard.feed, on_keyboard_detach=keyboard.release_all,
+                loop=loop, capture=capture, gate=power, on_error=input_stopped)
+            if loop is not None:
+                manager.start()
+            else:
+                input_thread(manager.run)
+            print(f"[입력] {manager.input_dir} 감시 시작")
+        elif args.reader == 'helper':
+            old = inputs['proc']
+            if old is not None and old.poll() is None:
+                old.kill()
+                old.wait()
+            proc = inputs['proc'] = subprocess.Popen(
+                ["./get_mouse_sensor", args.device],
+                stdout=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                stderr=subprocess.STDOUT, text=True, bufsize=1
+            )
+            print("[get_mouse_sensor] 시작됨")
+            input_thread(relay_thread, helper_frames(proc.stdout), sink)
+        else:
+            reader = EvdevReader(args.device, nonblock=loop is not None, gate=power)
+            print(f"[evdev] {args.device} 읽기 시작")
+            if capture is not None:
+                capture.attach(reader, {KIND_POINTER})
+            if loop is not None:
+                def on_stop(reason):
+                    reader.close()
+                    input_stopped(reason)
+                watch_reader(loop, reader, sink.push, on_eof=lambda: on_stop('장치 읽기 끝'), on_error=on_stop)
+            else:
+                input_thread(read_device, reader)
+        return True
+
+    if replay is None:
+        try:
+            start_input()
+        except OSError as e:
+            print(f"입력 시작 실패: {args.device}: {e}")
+            sys.exit(1)
+        watchdog.add('input', start_input)
+        watchdog.recovered('input')
+    STARTUP.mark('입력 시작')
+
+    # 출력 - BLE GATT 알림 (기본) 또는 소켓 (유선 LAN / 루프백, 받는 쪽은 uinput_receiver.py)
+    try:
+        if shards is not None:
+            transport = shards
+            shards.start()
+        elif args.output == 'gatt':
+            transport = GattTransport(profile, args.adapter_cache, watchdog,
+                                      report_map=passthrough.report_map if passthrough is not None else None,
+                                      adapters=args.adapters,
+                                      advertising_ms=ADV_FAST_MS if args.idle_timeout else None)
+        else:
+            transport = SocketTransport(args.output, profile.report_map)
+            print(f"[출력] {args.output}")
+    except (OSError, ValueError) as e:
+        print(f"출력 준비 실패: {args.output}: {e}")
+        sys.exit(1)
+    host_manager = transport.host_manager
+    mainloop = GLib.MainLoop() if loop is None else None
+
+    # asyncio 런타임: push 와 전송이 같은 스레드이므로 슬롯이 비어 있으면 타이머 없이 바로 전송
+    coalescer = MotionCoalescer(transport.send_report, interval_ms=args.interval_ms,
+                                limit=transport.limit,
+                                schedule=scheduler(loop) if loop is not None else None,
+                                inline=loop is not None,
+                                policy=args.queue_policy, queue_size=args.queue_size,
+                                ready=transport.ready)
+
+    # 첫 리포트가 호스트로 나가면 시간을 기록하고 원래 전송 함수로 되돌림
+    def first_report(buttons, dx, dy, wheel):
+        transport.send_report(buttons, dx, dy, wheel)
+        if transport.ready():
+            coalescer.send = transport.send_report
+            STARTUP.mark('첫 리포트')
+    coalescer.send = first_report
+
+    # 입력 -> 전송 연결
+    if passthrough is not None:
+        passthrough.connect(transport.inputs)
+    if host_manager is not None:
+        host_manager.on_active = accel.select_host
+    accel.target = coalescer.push
+    if shards is None:
+        keyboard.on_report = lambda report: coalescer.push_report(transport.send_keyboard, report)
+        keyboard.on_consumer = lambda report: coalescer.push_report(transport.send_consumer, report)
+
+    # 절전 시작 - 구독/라우팅, HID Control Point 변화를 받음 (아직 구독한 호스트가 없으면 off 로 시작)
+    if power is not None:
+        power.ready = transport.subscribed
+        if passthrough is not None:
+            power.activity = lambda: passthrough.forwarded
+        else:
+            power.activity = lambda: coalescer.last_sent_us
+        power.on_advertising = transport.set_advertising_interval
+        for app in transport.apps:
+            app.on_notify_state = power.update
+            app.on_control_point = power.on_control_point
+        power.start()
+
+    if args.trace:
+        # 재시작 없이 실행 중 지연 통계 조회
+        def dump_trace():
+            print(TRACE.report())
+            return True
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1, dump_trace)
+
+    # 프로파일 다시 적용 - 바뀐 부분만 (가속/간격은 즉시, 광고 이름은 광고만, 리포트 맵은 GATT 만 재등록)
+    current = [profile]
+
+    def apply_profile(new):
+        parts = new.changed_parts(current[0])
+        if shards is not None:
+            # 가속/코얼레싱/광고/GATT 는 모두 작업 프로세스 안 - 새 프로파일로 다시 시작해 한꺼번에 적용
+            if 'input' in parts:
+                print("[프로파일] 입력 장치 변경은 다시 시작해야 적용됩니다.")
+            if parts - {'input'}:
+                shards.set_settings(new.settings)
+            current[0] = new
+            return f"{new.name} 적용 (샤드 작업 다시 시작): {', '.join(sorted(parts)) if parts else '변경 없음'}"
+        current[0] = new
+        if 'pacing' in parts:
+            coalescer.interval_ms = new['interval_ms']
+            coalescer.policy = new['queue_policy']
+            coalescer.set_queue_size(new['queue_size'])
+        if 'accel' in parts:
+            accel.set_profiles(new.accel_default, new.accel_hosts)
+            if host_manager is not None:
+                accel.select_host(host_manager.active_host())
+        if 'advertisement' in parts:
+            transport.set_advertisement(new['local_name'], new['appearance'])
+        if 'gatt' in parts:
+            transport.set_report_map(new.report_map,
+                                     on_change=lambda: setattr(coalescer, 'limit', transport.limit))
+        if 'input' in parts:
+            print("[프로파일] 입력 장치 변경은 다시 시작해야 적용됩니다.")
+        return f"{new.name} 적용: {', '.join(sorted(parts)) if parts else '변경 없음'}"
+
+    def on_profile_changed(name, new):
+        # inotify 콜백 안 - 예외가 나가면 감시가 사라지므로 실패해도 이전 프로파일을 유지하고 계속 감시
+        if name != current[0].name:
+            return
+        previous = current[0]
+        try:
+            if overrides:
+                new = store.compile(name, overrides)   # 명령줄에서 지정한 값은 계속 우선
+            print(f"[프로파일] {apply_profile(new)}")
+        except (OSError, ValueError, dbus.exceptions.DBusException) as e:
+            current[0] = previous
+            print(f"[프로파일] {name}: 적용 실패: {e} (이전 설정 유지)")
+
+    def cmd_profile(cmd_args):
+        # profile          : 현재 프로파일과 사용 가능한 프로파일
+        # profile <이름>   : 미리 컴파일된 프로파일로 전환
+        if not cmd_args:
+            names = ', '.join(sorted(store.profiles)) or '없음'
+            return f"현재: {current[0].name} (사용 가능: {names})"
+        if cmd_args[0] not in store.profiles:
+            raise ValueError(store.errors.get(cmd_args[0], f"프로파일 없음: {cmd_args[0]}"))
+        return apply_profile(store.profiles[cmd_args[0]])
+
+    if store.watch(on_profile_changed):
+        print(f"[프로파일] {store.directory} 감시 중")
+
+    # 제어 소켓 (호스트 목록/전환, 지연 통계)
+    control = ControlServer(args.control_socket)
+    if host_manager is not None:
+        control.register('hosts', host_manager.cmd_hosts)
+        control.register('switch', host_manager.cmd_switch)
+    else:
+        control.register('output', transport.cmd_output)
+    control.register('trace', lambda args: TRACE.report())
+    control.register('queue', coalescer.cmd_queue)
+    control.register('accel', accel.cmd_accel)
+    control.register('profile', cmd_profile)
+    control.register('startup', lambda args: STARTUP.report())
+    control.register('watchdog', watchdog.cmd_watchdog)
+    if passthrough is not None:
+        control.register('passthrough', passthrough.cmd_passthrough)
+    if power is not None:
+        control.register('power', power.cmd_power)
+    try:
+        control.start()
+        print(f"[제어] {args.control_socket}")
+    except OSError as e:
+        print(f"제어 소켓 생성 실패: {args.control_socket}: {e}")
 
     print("BLE 마우스 준비 완료")
+    if args.low_jitter:
+        # D-Bus 서비스 트리, 프로파일, 가속 표 등 지금까지 만든 객체는 끝까지 살아 있음 - GC 대상에서 제외
+        print(f"[저지연] GC 고정 객체 {realtime.freeze_gc()}개")
+    STARTUP.mark('메인 루프 시작')
 
     # ---------- 메인 루프 및 정리 ----------
     try:
-        mainloop.run()
+        if loop is not None:
+            loop.run_forever()
+        else:
+            mainloop.run()
     except KeyboardInterrupt:
         print("Ctrl+C 종료합니다.")
     finally:
-        try:
-            print("광고 등록 해제 중…")
-            ad_manager.UnregisterAdvertisement(advert.get_path())
-        except Exception as e:
-            print(f"광고 등록 해제 오류: {e}")
-        try:
-            print("애플리케이션 등록 해제 중…")
-            service_manager.UnregisterApplication(app.get_path())
-        except Exception as e:
-            print(f"애플리케이션 등록 해제 오류: {e}")
-
-        if proc.poll() is None:         
+        transport.close()
+
+        control.stop()
+        store.close()
+        if inputs['manager'] is not None:
+            inputs['manager'].stop()
+        if passthrough is not None:
+            passthrough.close()
+        if capture is not None:
+            capture.close()
+        proc = inputs['proc']
+        if proc is not None and proc.poll() is None:
             proc.terminate()
             try:
                 proc.wait(timeout=2)
             except subprocess.TimeoutExpired:
                 proc.kill()
 
+        if power is not None:
+            power.close()
+            print(power.report())
+        if args.trace:
+            print(TRACE.report())
+
         print("종료됨.")
 
 
@@ -0,0 +1,189 @@
+import time
+from gi.repository import GLib
+
+
+# 절전 - 호스트가 잠들었거나(HID Control Point Suspend), 알림을 받을 호스트가 없거나, 입력이 한동안 없을 때
+# 입력 처리와 광고를 줄이고 입력이 오면 바로 깨어남
+#  active   : 평소
+#  idle     : idle_s 동안 입력 없음 - 입력 소스를 재우고(park) 광고 간격을 늘림
+#  suspended: 호스트가 Suspend 를 씀 - idle 과 같음 (Exit Suspend 또는 입력으로 깨어남)
+#  off      : 구독 + 라우팅된 입력 특성이 없음 - 읽은 입력은 디코딩하지 않고 버림 (보낼 곳이 없음)
+# 재운 입력 소스(EvdevReader, HidrawPassthrough)는 배치마다 parked 만 확인하고 재운 동안 읽은 배치마다 input() 을 부름
+#  idle/suspended: 그 배치부터 바로 처리 (호스트를 깨우는 리포트)
+#  off           : 버리고, 광고가 느린 상태면 광고만 다시 빠르게 (호스트가 빨리 다시 연결하도록)
+# 상태별로 머문 시간과 프로세스 CPU 시간(모든 스레드)을 기록 - 제어 명령 power 로 조회
+ACTIVE = 'active'
+IDLE = 'idle'
+SUSPENDED = 'suspended'
+OFF = 'off'
+STATES = (ACTIVE, IDLE, SUSPENDED, OFF)
+
+DEFAULT_IDLE_S = 30
+
+# off 에서 버린 배치 다음에 쉬는 시간 (스레드에서 읽는 경우만)
+# 그동안 이벤트가 커널 버퍼에 쌓여 한 번에 버려지므로 깨어나는 횟수가 줄어듦 (넘치면 커널이 SYN_DROPPED)
+DISCARD_POLL_S = 0.1
+
+# 광고 간격 (ms, LEAdvertisement1 MinInterval/MaxInterval)
+# 깨어 있으면 짧게 (호스트가 빨리 다시 연결), 쉬는 동안은 길게 (무선 사용 줄임)
+ADV_FAST_MS = (30, 60)
+ADV_SLOW_MS = (1000, 1280)
+
+
+class PowerManager:
+    # GLib 메인 루프에서 사용 (input() 만 읽기 스레드에서 호출)
+    # 입력은 D-Bus 등록 전에 시작하므로 먼저 만들어 입력 소스에 넘기고, 출력이 준비되면 아래를 설정한 뒤 start()
+    #  ready()          : 알림을 받을 호스트가 있는지 (구독 + 라우팅) - 바뀌면 update() 호출
+    #  activity()       : 입력을 보낼 때마다 바뀌는 값 (마지막 전송 시각 등) - idle 판정용
+    #  on_advertising(간격): 광고 간격 변경 (ADV_FAST_MS / ADV_SLOW_MS)
+    # idle_s 가 0 이면 idle 판정과 광고 조절을 하지 않음 (suspended/off 는 그대로)
+
+    def __init__(self, idle_s=DEFAULT_IDLE_S, poll_s=DISCARD_POLL_S):
+        self.idle_s = idle_s
+        self.poll_s = poll_s
+        self.ready = None
+        self.activity = None
+        self.on_advertising = None
+        self.state = ACTIVE
+        self.parked = False      # 입력 소스가 배치마다 확인
+        self.discard = False     # 재운 동안 읽은 입력을 버림 (off)
+        self.slow = False        # 광고 간격을 늘린 상태
+        self.suspended = set()   # Suspend 를 쓴 호스트 (장치 경로)
+        self.wakes = 0           # 입력으로 깨어난 횟수
+        self.discarded = 0       # off 에서 버린 배치 수
+        self._wake_pending = False
+        self._timer = None
+        self._last_activity = None
+        self._since = (time.monotonic(), time.process_time())
+        self.totals = {state: [0.0, 0.0] for state in STATES}   # 상태 -> [머문 시간 s, CPU 시간 s]
+
+    def start(self):
+        self.update()
+        self._arm()
+
+    def close(self):
+        self._disarm()
+
+    # ---------- 읽기 스레드 ----------
+    def input(self):
+        # 재운 동안 읽은 배치 - True 이면 처리, False 이면 버림
+        discard = self.discard
+        if discard:
+            self.discarded += 1
+        else:
+            self.parked = False
+        if not self._wake_pending and (not discard or self.slow):
+            self._wake_pending = True
+            GLib.idle_add(self._on_input)
+        return not discard
+
+    # ---------- 메인 루프 ----------
+    def _on_input(self):
+        self._wake_pending = False
+        self.wakes += 1
+        self._resume()
+        return False
+
+    def update(self):
+        # 구독/라우팅이 바뀜
+        if self.ready is None:
+            return
+        if not self.ready():
+            self.suspended.clear()
+            self._set_state(OFF)
+        elif self.state == OFF:
+            self._resume()
+
+    def on_control_point(self, device, suspend):
+        # HID Control Point: Suspend (0x00) / Exit Suspend (0x01)
+        key = str(device) if device is not None else None
+        if not suspend:
+            self.suspended.discard(key)
+            if not self.suspended and self.state == SUSPENDED:
+                self._resume()
+            return
+        self.suspended.add(key)
+        if self.state in (ACTIVE, IDLE):
+            self._set_state(SUSPENDED)
+            self._set_slow(True)
+            self._disarm()
+
+    def _resume(self):
+        if self.state != OFF or self.ready is None or self.ready():
+            self.suspended.clear()
+            self._set_state(ACTIVE)
+        self._set_slow(False)
+        self._arm()
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        now = (time.monotonic(), time.process_time())
+        total = self.totals[self.state]
+        total[0] += now[0] - self._since[0]
+        total[1] += now[1] - self._since[1]
+        self._since = now
+        print(f"[절전] {self.state} -> {state}")
+        self.state = state
+        # 읽기 스레드가 보는 순서: 버릴지 먼저 정하고 재움
+        self.discard = state == OFF
+        self.parked = state != ACTIVE
+
+    def _set_slow(self, slow):
+        if slow == self.slow or not self.idle_s:
+            return
+        self.slow = slow
+        if self.on_advertising is not None:
+            self.on_advertising(ADV_SLOW_MS if slow else ADV_FAST_MS)
+
+    # ---------- idle 판정 ----------
+    # 입력마다 시각을 기록하지 않고 idle_s 마다 activity() 값을 비교 (입력 경로에 비용 없음)
+    # -> idle 진입은 마지막 입력 후 idle_s ~ 2 * idle_s
+    def _activity(self):
+        return (self.activity() if self.activity is not None else None), self.discarded
+
+    def _arm(self):
+        if self.idle_s and self._timer is None and not self.slow:
+            self._last_activity = self._activity()
+            self._timer = GLib.timeout_add_seconds(self.idle_s, self._check_idle)
+
+    def _disarm(self):
+        if self._timer is not None:
+            GLib.source_remove(self._timer)
+            self._timer = None
+
+    def _check_idle(self):
+        value = self._activity()
+        if value != self._last_activity:
+            self._last_activity = value
+            return True
+        self._timer = None
+        if self.state == ACTIVE:
+            self._set_state(IDLE)
+        self._set_slow(True)
+        return False
+
+    # ---------- 통계 ----------
+    def usage(self):
+        # 상태별 [머문 시간 s, CPU 시간 s] - 지금 상태의 진행 중인 구간 포함
+        usage = {state: list(total) for state, total in self.totals.items()}
+        current = usage[self.state]
+        current[0] += time.monotonic() - self._since[0]
+        current[1] += time.process_time() - self._since[1]
+        return usage
+
+    def report(self):
+        lines = [f"절전 상태 {self.state} (광고 {'느림' if self.slow else '빠름'}), "
+                 f"입력으로 깨어남 {self.wakes}, 버린 입력 배치 {self.discarded}"]
+        for state, (wall, cpu) in self.usage().items():
+            if wall:
+                lines.append(f"{state:>10}: {wall:9.1f} s  CPU {cpu * 1000:9.1f} ms ({cpu / wall * 100:5.2f}%)")
+        return '\n'.join(lines)
+
+    # ---------- 제어 명령 ----------
+    def cmd_power(self, args):
+        if args and args[0] == 'reset':
+            self.totals = {state: [0.0, 0.0] for state in STATES}
+            self._since = (time.monotonic(), time.process_time())
+            self.wakes = self.discarded = 0
+        return self.report()
@@ -0,0 +1,173 @@
+import os, sys, json, time
+from gi.repository import GLib
+
+import accel
+from coalescer import QUEUE_POLICIES
+from inotify import Inotify, IN_CLOSE_WRITE, IN_MOVED_TO
+
+
+# 사용자 프로파일 (JSON) - 장치, 광고 이름/외형, 리포트 맵, 전송 간격, 가속 설정
+#   /etc/ble-hub/profiles/<이름>.json
+#   {"local_name": "Pi-Hub", "high_res": true, "accel": "mild", "accel_hosts": {"AA:BB:..": "strong"}}
+# 시작 시 디렉터리의 프로파일을 모두 미리 컴파일 (검증, 리포트 맵 생성, 가속 표 계산)해 두고,
+# 실행 중에는 파일이 바뀌면 inotify 로 알아채 해당 프로파일만 다시 컴파일
+# 적용할 때는 바뀐 부분만 다시 설정 (광고 이름만 바뀌면 광고만 재등록, GATT 는 그대로)
+PROFILE_DIR = '/etc/ble-hub/profiles'
+SUFFIX = '.json'
+
+# 설정 -> (허용 타입, 바뀌었을 때 다시 적용할 부분)
+#  input         : 입력 장치 (재시작 필요)
+#  advertisement : 광고만 재등록
+#  gatt          : 리포트 맵 - GATT 애플리케이션 재등록 (호스트가 서비스를 다시 읽어야 함)
+#  pacing        : 코얼레서 설정만 변경
+#  accel         : 가속 표만 교체
+FIELDS = {
+    'device': (str, 'input'),
+    'local_name': (str, 'advertisement'),
+    'appearance': (int, 'advertisement'),
+    'high_res': (bool, 'gatt'),
+    'interval_ms': (int, 'pacing'),
+    'queue_policy': (str, 'pacing'),
+    'queue_size': (int, 'pacing'),
+    'accel': ((str, dict), 'accel'),
+    'accel_hosts': (dict, 'accel'),
+}
+
+
+def validate(settings):
+    unknown = set(settings) - set(FIELDS)
+    if unknown:
+        raise ValueError(f'알 수 없는 설정: {", ".join(sorted(unknown))}')
+    for key, value in settings.items():
+        kind = FIELDS[key][0]
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise ValueError(f'{key}: 잘못된 값 {value!r}')
+    if settings.get('queue_policy', QUEUE_POLICIES[0]) not in QUEUE_POLICIES:
+        raise ValueError(f'queue_policy: {settings["queue_policy"]} (가능: {", ".join(QUEUE_POLICIES)})')
+    if not 0 <= settings.get('appearance', 0) <= 0xFFFF:
+        raise ValueError('appearance: 0 ~ 0xFFFF')
+    if settings.get('interval_ms', 0) < 0:
+        raise ValueError('interval_ms: 0 이상')
+    if settings.get('queue_size', 1) < 1:
+        raise ValueError('queue_size: 1 이상')
+    if len(settings.get('local_name', '').encode()) > 29:
+        raise ValueError('local_name: 광고에 들어가도록 29바이트 이하')
+
+
+class CompiledProfile:
+    # 바로 적용할 수 있는 형태 - 검증된 설정 + 리포트 맵 + 가속 표
+
+    def __init__(self, name, settings, build_report_map):
+        validate(settings)
+        self.name = name
+        self.settings = settings
+        self.report_map = build_report_map(high_res=settings.get('high_res', False))
+        self.accel_default = accel.compile_profile('default', settings.get('accel', 'off'))
+        self.accel_hosts = accel.compile_hosts(settings.get('accel_hosts', {}))
+
+    def __getitem__(self, key):
+        return self.settings[key]
+
+    def changed_parts(self, other):
+        # other(이전 프로파일)와 비교해 다시 적용해야 할 부분
+        parts = set()
+        for key, (_kind, part) in FIELDS.items():
+            if self.settings.get(key) != other.settings.get(key):
+                parts.add(part)
+        return parts
+
+
+class ProfileStore:
+    #  base: 프로파일에 없는 설정의 기본값 (명령줄 기본값)
+    #  build_report_map(high_res) -> hid_descriptor.ReportMap
+
+    def __init__(self, directory, base, build_report_map):
+        self.directory = directory
+        self.base = base
+        self.build_report_map = build_report_map
+        self.profiles = {}    # 이름 -> CompiledProfile
+        self.errors = {}      # 이름 -> 컴파일 오류 메시지
+        self._inotify = None
+
+    def path(self, name):
+        return os.path.join(self.directory, name + SUFFIX)
+
+    def read(self, name):
+        # 파일에 적힌 설정만 (기본값 제외)
+        with open(self.path(name)) as f:
+            settings = json.load(f)
+        if not isinstance(settings, dict):
+            raise ValueError('프로파일은 JSON 객체여야 함')
+        validate(settings)
+        return settings
+
+    def compile(self, name, overrides=None):
+        # 기본값 + 파일 + overrides(명령줄에서 직접 지정한 값) -> CompiledProfile
+        settings = dict(self.base)
+        settings.update(self.read(name))
+        if overrides:
+            settings.update(overrides)
+        return CompiledProfile(name, settings, self.build_report_map)
+
+    def load_all(self):
+        # 디렉터리의 프로파일을 모두 컴파일 - 걸린 시간(ms) 반환
+        t0 = time.perf_counter()
+        try:
+            names = sorted(f[:-len(SUFFIX)] for f in os.listdir(self.directory) if f.endswith(SUFFIX))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            self._load(name)
+        return (time.perf_counter() - t0) * 1000
+
+    def _load(self, name):
+        try:
+            self.profiles[name] = self.compile(name)
+            self.errors.pop(name, None)
+            return self.profiles[name]
+        except (OSError, ValueError) as e:
+            self.errors[name] = str(e)
+            return None
+
+    def watch(self, on_change):
+        # on_change(이름, CompiledProfile) - 파일이 저장될 때마다 (편집기의 이름 바꾸기 저장 포함)
+        if not os.path.isdir(self.directory):
+            return False
+        self._inotify = Inotify()
+        self._inotify.add_watch(self.directory, IN_CLOSE_WRITE | IN_MOVED_TO)
+
+        def on_event(fd, condition):
+            changed = set()
+            for _directory, filename, _mask in self._inotify.read_events():
+                if filename.endswith(SUFFIX):
+                    changed.add(filename[:-len(SUFFIX)])
+            for name in sorted(changed):
+                profile = self._load(name)
+                if profile is None:
+                    print(f"[프로파일] {name}: {self.errors[name]} (이전 설정 유지)")
+                else:
+                    on_change(name, profile)
+            return True
+
+        GLib.io_add_watch(self._inotify.fileno(), GLib.IO_IN, on_event)
+        return True
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+# ---------- 프로파일 검사 ----------
+# python3 profiles.py [디렉터리] - 모든 프로파일을 컴파일해 오류와 컴파일 시간 출력
+if __name__ == '__main__':
+    from main import parse_args, build_report_map, profile_base
+    store = ProfileStore(sys.argv[1] if len(sys.argv) > 1 else PROFILE_DIR,
+                         profile_base(parse_args([])), build_report_map)
+    elapsed = store.load_all()
+    for name, profile in sorted(store.profiles.items()):
+        print(f"{name}: OK ({', '.join(f'{k}={v}' for k, v in sorted(profile.settings.items()))})")
+    for name, error in sorted(store.errors.items()):
+        print(f"{name}: 오류 - {error}")
+    print(f"프로파일 {len(store.profiles) + len(store.errors)}개 컴파일: {elapsed:.2f} ms")
+    sys.exit(1 if store.errors else 0)
@@ -0,0 +1,87 @@
+import os, gc, ctypes
+
+
+# 저지연 모드 (--low-jitter) - 입력 -> 알림 경로의 지터(가끔 길어지는 지연) 줄이기
+#  1) CPU 고정  : 입력 스레드와 GLib 메인 루프(알림 전송)를 같은 CPU 하나에 (다른 작업과의 이동/캐시 경쟁 줄임)
+#  2) 스케줄링  : SCHED_FIFO (root 또는 CAP_SYS_NICE 필요), 안 되면 nice 값, 그것도 안 되면 그대로
+#  3) 메모리 잠금: mlockall - 스왑/페이지 폴트로 인한 지연 방지 (권한이 없으면 생략)
+#  4) GC        : 시작 때 만든 오래 사는 객체(D-Bus 서비스 트리, 프로파일, 가속 표)를 gc.freeze 로
+#                 수집 대상에서 빼서 세대 GC 가 훑는 객체 수를 줄임
+# 리눅스 스레드는 만든 스레드의 CPU 고정/스케줄링 정책을 물려받으므로, 입력 스레드를 시작하기 전에 apply() 호출
+# 자식 프로세스도 물려받으므로 샤드 작업(shard.py)은 시작할 때 reset() 으로 되돌림
+DEFAULT_RT_PRIORITY = 10   # 낮은 실시간 우선순위 (커널 스레드/IRQ 스레드(50)보다 아래)
+DEFAULT_NICE = -10
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+
+def default_cpu():
+    # 마지막 CPU (CPU 0 은 보통 인터럽트 처리가 많음)
+    return max(os.sched_getaffinity(0))
+
+
+def apply(cpu=None, priority=DEFAULT_RT_PRIORITY, nice=DEFAULT_NICE):
+    # 호출한 스레드(와 이후에 만드는 스레드)에 적용 - 되돌릴 때 쓸 이전 상태와 적용 결과 목록 반환
+    previous = (os.sched_getaffinity(0), os.sched_getscheduler(0), os.sched_getparam(0),
+                os.getpriority(os.PRIO_PROCESS, 0))
+    applied = []
+    if cpu is None:
+        cpu = default_cpu()
+    try:
+        os.sched_setaffinity(0, {cpu})
+        applied.append(f"CPU {cpu} 고정")
+    except OSError as e:
+        applied.append(f"CPU 고정 실패 ({e})")
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        applied.append(f"SCHED_FIFO {priority}")
+    except OSError:
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, nice)
+            applied.append(f"nice {nice}")
+        except OSError:
+            applied.append("우선순위 변경 권한 없음")
+    if _libc.mlockall(MCL_CURRENT | MCL_FUTURE) == 0:
+        applied.append("mlockall")
+    return previous, applied
+
+
+def restore(previous):
+    # apply() 이전 상태로 (벤치마크에서 모드 비교용)
+    affinity, policy, param, nice = previous
+    os.sched_setaffinity(0, affinity)
+    try:
+        os.sched_setscheduler(0, policy, param)
+        os.setpriority(os.PRIO_PROCESS, 0, nice)
+    except OSError:
+        pass
+    _libc.munlockall()
+    gc.unfreeze()
+
+
+def reset():
+    # 자식 프로세스(샤드 작업)가 시작할 때 - fork 로 물려받은 CPU 고정/SCHED_FIFO/nice 를 기본값으로
+    # (작업마다 다른 코어에서 돌도록, 입력 프로세스와 같은 코어에서 실시간 우선순위로 경쟁하지 않도록)
+    try:
+        os.sched_setaffinity(0, range(os.cpu_count()))
+    except OSError:
+        pass
+    try:
+        os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+    except OSError:
+        pass
+    try:
+        if os.getpriority(os.PRIO_PROCESS, 0) < 0:
+            os.setpriority(os.PRIO_PROCESS, 0, 0)
+    except OSError:
+        pass
+
+
+def freeze_gc():
+    # 시작 준비가 끝난 뒤 한 번 - 쓰레기를 먼저 치우고 남은 객체를 영구 세대로
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
@@ -0,0 +1,182 @@
+import os
+import dbus, dbus.exceptions
+
+from bluez import (BLUEZ_SERVICE, ADAPTER_IFACE, LE_ADVERTISING_MANAGER_IFACE, GATT_MANAGER_IFACE,
+                   DBUS_OM_IFACE, DBUS_PROP_IFACE)
+
+
+# 광고 + GATT 애플리케이션 등록 (어댑터 검색 포함)
+# bluetoothd 가 재시작되거나 어댑터가 바뀌면 등록이 사라지므로 감시자(watchdog)가 register() 를 다시 호출
+DBUS_SERVICE = 'org.freedesktop.DBus'
+ALREADY_EXISTS = 'org.bluez.Error.AlreadyExists'
+
+def find_adapter(bus):
+    remote_om = dbus.Interface(bus.get_object(BLUEZ_SERVICE, '/', introspect=False), DBUS_OM_IFACE)
+    objects = remote_om.GetManagedObjects()
+    for path, ifaces in objects.items():
+        if ADAPTER_IFACE in ifaces:
+            return path
+    return None
+
+def find_adapters(bus, names=None):
+    # 모든 어댑터 경로 (이름순) - names 가 있으면 그 이름(hci0 등)만
+    remote_om = dbus.Interface(bus.get_object(BLUEZ_SERVICE, '/', introspect=False), DBUS_OM_IFACE)
+    paths = sorted(str(path) for path, ifaces in remote_om.GetManagedObjects().items() if ADAPTER_IFACE in ifaces)
+    if names is not None:
+        paths = [path for path in paths if os.path.basename(path) in names]
+    return paths
+
+# 어댑터 경로 캐시 ("경로 주소" 한 줄) - 재부팅 후에도 유지되도록 /var/cache 에 저장
+# GetManagedObjects 는 BlueZ 가 아는 모든 장치(스캔 결과 포함)를 돌려주므로,
+# 캐시가 있으면 Address 속성 하나만 읽어 같은 어댑터인지 확인하고 다르면 다시 검색
+ADAPTER_CACHE = '/var/cache/ble-hub/adapter'
+
+def find_adapter_cached(bus, cache_path=ADAPTER_CACHE):
+    if cache_path:
+        try:
+            with open(cache_path) as f:
+                path, address = f.read().split()
+            props = dbus.Interface(bus.get_object(BLUEZ_SERVICE, path, introspect=False), DBUS_PROP_IFACE)
+            if str(props.Get(ADAPTER_IFACE, 'Address')) == address:
+                return path
+        except (OSError, ValueError, dbus.exceptions.DBusException):
+            pass
+    path = find_adapter(bus)
+    if path and cache_path:
+        try:
+            props = dbus.Interface(bus.get_object(BLUEZ_SERVICE, path, introspect=False), DBUS_PROP_IFACE)
+            address = str(props.Get(ADAPTER_IFACE, 'Address'))
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, 'w') as f:
+                f.write(f"{path} {address}\n")
+        except (OSError, dbus.exceptions.DBusException) as e:
+            print(f"어댑터 캐시 저장 실패: {cache_path}: {e}")
+    return path
+
+
+class Registration:
+    #  on_advertising() / on_application() : 각 등록 응답 시 (시작 시간 기록 등)
+    #  adapter_path : 정해진 어댑터에만 등록 (여러 어댑터 모드) - 없으면 첫 어댑터를 찾음 (캐시 사용)
+
+    def __init__(self, bus, app, advert, adapter_cache=ADAPTER_CACHE, adapter_path=None):
+        self.bus = bus
+        self.app = app
+        self.advert = advert
+        self.adapter_cache = adapter_cache
+        self.fixed_adapter = adapter_path
+        self.adapter_path = None
+        self.service_manager = None
+        self.ad_manager = None
+        self.on_advertising = None
+        self.on_application = None
+
+    def connect(self):
+        # 어댑터 검색 (캐시 확인) 후 관리자 프록시 생성 - 어댑터가 없으면 OSError
+        path = self.fixed_adapter or find_adapter_cached(self.bus, self.adapter_cache)
+        if not path:
+            raise OSError("블루투스 어댑터를 찾을 수 없습니다.")
+        if path != self.adapter_path:
+            print(f"사용 중인 어댑터: {path}")
+        self.adapter_path = str(path)
+        # 인트로스펙션 없이 바로 호출 (프록시마다 Introspect 왕복을 기다리지 않음)
+        adapter = self.bus.get_object(BLUEZ_SERVICE, path, introspect=False)
+        self.service_manager = dbus.Interface(adapter, GATT_MANAGER_IFACE)
+        self.ad_manager = dbus.Interface(adapter, LE_ADVERTISING_MANAGER_IFACE)
+
+    def register(self, on_done, on_error):
+        # 광고와 GATT 등록은 응답을 기다리지 않고 함께 요청 (BlueZ 는 메인 루프가 돌면 콜백으로 속성을 읽어감)
+        # 둘 다 성공하면 on_done(), 하나라도 실패하면 on_error(예외) - 이미 등록된 것은 성공으로 봄
+        self.connect()
+        pending = {'ad', 'app'}
+
+        def done(which, callback):
+            def reply():
+                if callback is not None:
+                    callback()
+                pending.discard(which)
+                if not pending:
+                    on_done()
+            return reply
+
+        def error(which, callback):
+            def reply(e):
+                if e.get_dbus_name() == ALREADY_EXISTS:
+                    done(which, callback)()
+                else:
+                    on_error(e)
+            return reply
+
+        print("광고 등록 중…")
+        self.ad_manager.RegisterAdvertisement(
+            self.advert.get_path(), {}, reply_handler=done('ad', self.on_advertising),
+            error_handler=error('ad', self.on_advertising))
+        print("GATT 애플리케이션 등록 중…")
+        self.service_manager.RegisterApplication(
+            self.app.get_path(), {}, reply_handler=done('app', self.on_application),
+            error_handler=error('app', self.on_application))
+
+    def reregister_advertisement(self):
+        # 광고 속성이 바뀐 경우 (프로파일) - 광고만 다시 등록
+        self.ad_manager.UnregisterAdvertisement(
+            self.advert.get_path(),
+            reply_handler=lambda: self.ad_manager.RegisterAdvertisement(
+                self.advert.get_path(), {}, reply_handler=lambda: print("광고 다시 등록됨"),
+                error_handler=lambda e: print(f"광고 재등록 실패: {e}")),
+            error_handler=lambda e: print(f"광고 등록 해제 실패: {e}"))
+
+    def unregister_application(self, on_done):
+        # 해제 실패(이미 등록이 사라짐 등)여도 on_done - 다시 등록은 진행
+        def error(e):
+            print(f"애플리케이션 등록 해제 실패: {e}")
+            on_done()
+        self.service_manager.UnregisterApplication(self.app.get_path(), reply_handler=on_done,
+                                                   error_handler=error)
+
+    def register_application(self):
+        self.service_manager.RegisterApplication(
+            self.app.get_path(), {}, reply_handler=lambda: print("GATT 애플리케이션 다시 등록됨"),
+            error_handler=lambda e: print(f"애플리케이션 재등록 실패: {e}"))
+
+    def unregister(self):
+        # 종료 시 (동기)
+        if self.ad_manager is None:
+            return
+        try:
+            print("광고 등록 해제 중…")
+            self.ad_manager.UnregisterAdvertisement(self.advert.get_path())
+        except Exception as e:
+            print(f"광고 등록 해제 오류: {e}")
+        try:
+            print("애플리케이션 등록 해제 중…")
+            self.service_manager.UnregisterApplication(self.app.get_path())
+        except Exception as e:
+            print(f"애플리케이션 등록 해제 오류: {e}")
+
+    def watch(self, on_lost, on_back):
+        # bluetoothd 종료/재시작 (NameOwnerChanged), 어댑터 제거/추가 (InterfacesRemoved/Added)
+        #  on_lost(이유) : 등록이 사라짐 - 다시 나타날 때까지 대기
+        #  on_back()     : bluetoothd 또는 어댑터가 다시 나타남 - 바로 다시 등록
+        def owner_changed(name, old_owner, new_owner):
+            if not new_owner:
+                on_lost("bluetoothd 종료")
+            elif old_owner:
+                on_lost("bluetoothd 교체")
+                on_back()
+            else:
+                on_back()
+
+        def added(path, interfaces):
+            if ADAPTER_IFACE in interfaces and self.fixed_adapter in (None, str(path)):
+                on_back()
+
+        def removed(path, interfaces):
+            if ADAPTER_IFACE in interfaces and str(path) == self.adapter_path:
+                on_lost(f"어댑터 사라짐: {path}")
+
+        self.bus.add_signal_receiver(owner_changed, signal_name='NameOwnerChanged',
+                                     dbus_interface=DBUS_SERVICE, bus_name=DBUS_SERVICE,
+                                     arg0=BLUEZ_SERVICE)
+        self.bus.add_signal_receiver(added, signal_name='InterfacesAdded',
+                                     dbus_interface=DBUS_OM_IFACE, bus_name=BLUEZ_SERVICE)
+        self.bus.add_signal_receiver(removed, signal_name='InterfacesRemoved',
+                                     dbus_interface=DBUS_OM_IFACE, bus_name=BLUEZ_SERVICE)
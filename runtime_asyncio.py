@@ -0,0 +1,66 @@
+import asyncio
+
+from evdev_reader import MouseDecoder
+from tracing import TRACE, now_us
+
+
+# asyncio 런타임: 입력 읽기, 코얼레싱, D-Bus 시그널 전송을 이벤트 루프 하나(스레드 1개)에서 처리
+# 스레드 런타임의 relay 스레드 -> 잠금 -> GLib 타이머로 메인 루프에 넘기는 단계가 없어짐
+# dbus-python 은 GLib 기본 메인 컨텍스트에서 동작하므로
+# PyGObject 3.50+ 의 gi.events (GLib 메인 컨텍스트 위에서 도는 asyncio 루프)가 필요함
+
+
+def new_event_loop():
+    # gi.events 가 없으면 None (호출한 쪽에서 스레드 런타임으로 대체)
+    try:
+        from gi.events import GLibEventLoopPolicy
+    except ImportError:
+        return None
+    policy = GLibEventLoopPolicy()
+    asyncio.set_event_loop_policy(policy)
+    return policy.get_event_loop()   # 메인 스레드 = GLib 기본 메인 컨텍스트의 루프
+
+
+def scheduler(loop):
+    # MotionCoalescer 의 schedule(ms, fn) - GLib.timeout_add 대신 loop.call_later
+    def schedule(ms, fn):
+        loop.call_later(ms / 1000, fn)
+    return schedule
+
+
+def watch_reader(loop, reader, on_mouse, on_eof=None, on_error=None):
+    # 지정한 장치(또는 녹화 파일) 하나를 add_reader 로 읽어 디코딩 - relay_thread 대체
+    # reader 는 nonblock=True 로 열어야 함
+    # 읽기/디코딩 중 예외가 나면 읽기를 멈추고 on_error(reason) (스레드 런타임에서 입력 스레드가 죽는 경우)
+    decoder = MouseDecoder(reader.fd)
+
+    def on_readable():
+        try:
+            read()
+        except Exception as e:
+            loop.remove_reader(reader.fd)
+            if on_error is None:
+                raise
+            on_error(f'입력 오류: {e}')
+
+    def read():
+        try:
+            batch = reader.read_batch()
+        except BlockingIOError:
+            return
+        except OSError:
+            batch = None   # ENODEV: 장치가 빠짐
+        if batch is None:
+            loop.remove_reader(reader.fd)
+            if on_eof is not None:
+                on_eof()
+            return
+        tracing = TRACE.enabled
+        for dx, dy, wheel, buttons, ts in decoder.decode(batch):
+            if tracing:
+                read_us = reader.read_us
+                TRACE.record('read', read_us - ts)
+                TRACE.record('parse', now_us() - read_us)
+            on_mouse(dx, dy, wheel, buttons, ts)
+
+    loop.add_reader(reader.fd, on_readable)
@@ -0,0 +1,413 @@
+import os, sys, json, mmap, struct, signal, argparse, subprocess
+from gi.repository import GLib
+
+from hid_descriptor import S8_LIMIT
+
+
+# 멀티 프로세스 샤딩 (main.py --shard)
+# 입력 프로세스(main.py) 하나가 입력을 읽어 디코딩한 프레임/키보드 리포트를 공유 메모리 링에 쓰고,
+# 어댑터마다 작업 프로세스(python3 shard.py ...) 하나가 링을 읽어 자기 D-Bus 연결로 광고 + GATT 를 등록하고 알림을 보냄
+#  - 가속(호스트별), 코얼레싱, D-Bus 직렬화, GATT 요청 처리가 어댑터마다 다른 프로세스에서 돎 (GIL 하나에 묶이지 않음)
+#  - 링: 쓰는 쪽 하나, 읽는 쪽 여럿 (읽는 쪽마다 자기 위치) - 느린 작업이 덮어쓰인 기록을 만나면 건너뛰고 lost 로 셈
+#  - 깨우기: 쓰는 쪽이 기록마다 작업마다의 eventfd 에 씀 - 작업은 한 번 깨어나 쌓인 기록을 모두 처리 (카운터는 읽으면 0)
+#    eventfd 쓰기/읽기가 시스템 콜이라 기록 번호 저장 -> 깨우기 -> 기록 번호 읽기 순서가 보장됨 (ARM 에서도 깨우기를 놓치지 않음)
+#  - 링은 memfd 를 mmap 하고 fd 를 작업에 넘김 - 파일 시스템에 이름이 없어 다른 사용자가 심어둔 심볼릭 링크를
+#    root 가 따라가 덮어쓰거나 두 번째 인스턴스가 실행 중인 링을 지우는 일이 없음
+#    (multiprocessing.shared_memory 는 3.13 전까지 붙기만 한 프로세스도 종료 시 지워버림)
+# 작업 프로세스는 호스트 전환/가속/대기열 제어 소켓을 따로 가짐: <제어 소켓>.hciN
+RING_NAME = 'ble-hub-ring'
+DEFAULT_CAPACITY = 4096   # 기록 수 (1000Hz 마우스 4초분)
+MAX_READERS = 8
+
+# 헤더: 식별자, 기록 수, 읽는 쪽 수, 마지막으로 쓴 기록 번호 (1부터, 0 = 아직 없음)
+MAGIC = b'BHR1'
+HEADER = struct.Struct('<4sII4xQ')
+SEQ_OFFSET = 16
+# 읽는 쪽 칸: 준비됨(알림 구독, 1바이트), 읽은 위치, 보낸 리포트 수, 놓친 기록 수
+SLOT = struct.Struct('<B7xQQQ')
+SLOTS_OFFSET = HEADER.size
+# 기록: 기록 번호(쓰는 중이면 0), 종류, 내용 길이 + 내용 24바이트
+RECORD_HEAD = struct.Struct('<QBB6x')
+RECORD_SIZE = RECORD_HEAD.size + 24
+RECORDS_OFFSET = SLOTS_OFFSET + MAX_READERS * SLOT.size
+MOUSE = struct.Struct('<iiiIq')   # dx, dy, wheel, buttons, 커널 타임스탬프 µs
+U64 = struct.Struct('<Q')
+
+KIND_MOUSE = 1
+KIND_KEYBOARD = 2
+KIND_CONSUMER = 3
+
+
+class RingWriter:
+    # 입력 프로세스 - 입력 스레드 하나에서만 push (InputManager/리더 스레드, 키보드 상태도 같은 스레드)
+    # push 는 코얼레서/가속과 같은 형식이라 입력 소스의 sink 로 바로 씀
+
+    def __init__(self, name=RING_NAME, readers=1, capacity=DEFAULT_CAPACITY):
+        if not 1 <= readers <= MAX_READERS:
+            raise ValueError(f'작업 프로세스는 1 ~ {MAX_READERS}개')
+        self.name = name
+        self.capacity = capacity
+        self.readers = readers
+        size = RECORDS_OFFSET + capacity * RECORD_SIZE
+        # fd 는 닫지 않음 - 다시 시작하는 작업에도 넘김
+        self.fd = os.memfd_create(name, os.MFD_CLOEXEC)
+        try:
+            os.ftruncate(self.fd, size)
+            self.mm = mmap.mmap(self.fd, size)
+        except OSError:
+            os.close(self.fd)
+            raise
+        HEADER.pack_into(self.mm, 0, MAGIC, capacity, readers, 0)
+        # 작업마다 eventfd 하나 (작업을 다시 시작해도 같은 것을 넘김)
+        self.wake_fds = [os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC) for _ in range(readers)]
+        self._slots = [SLOTS_OFFSET + i * SLOT.size for i in range(readers)]
+        self.seq = 0
+
+    def _record(self):
+        # 다음 기록 칸 - 먼저 기록 번호를 0 으로 지워 읽는 쪽이 쓰는 중인 기록을 쓰지 않게 함
+        seq = self.seq + 1
+        off = RECORDS_OFFSET + (seq % self.capacity) * RECORD_SIZE
+        U64.pack_into(self.mm, off, 0)
+        return seq, off
+
+    def push(self, dx, dy, wheel, buttons, ts=0):
+        seq, off = self._record()
+        MOUSE.pack_into(self.mm, off + RECORD_HEAD.size, dx, dy, wheel, buttons, ts)
+        RECORD_HEAD.pack_into(self.mm, off, seq, KIND_MOUSE, MOUSE.size)
+        self._publish(seq)
+
+    def push_keyboard(self, report):
+        self._push_report(KIND_KEYBOARD, report)
+
+    def push_consumer(self, report):
+        self._push_report(KIND_CONSUMER, report)
+
+    def _push_report(self, kind, report):
+        seq, off = self._record()
+        start = off + RECORD_HEAD.size
+        self.mm[start:start + len(report)] = report
+        RECORD_HEAD.pack_into(self.mm, off, seq, kind, len(report))
+        self._publish(seq)
+
+    def _publish(self, seq):
+        self.seq = seq
+        U64.pack_into(self.mm, SEQ_OFFSET, seq)
+        for fd in self.wake_fds:
+            os.eventfd_write(fd, 1)
+
+    def slot(self, index):
+        # (준비됨, 읽은 위치, 보낸 리포트, 놓친 기록)
+        return SLOT.unpack_from(self.mm, self._slots[index])
+
+    def close(self):
+        for fd in self.wake_fds:
+            os.close(fd)
+        os.close(self.fd)
+        self.mm.close()
+
+
+class RingReader:
+    # 작업 프로세스 - GLib 메인 루프에서 eventfd 로 깨어나 쌓인 기록을 모두 처리
+    # 붙은 시점 이후의 기록부터 읽음 (다시 시작한 작업이 오래된 입력을 보내지 않도록)
+
+    def __init__(self, ring_fd, index, wake_fd, on_mouse, on_keyboard, on_consumer):
+        # ring_fd: 입력 프로세스가 넘긴 memfd (매핑 후 닫음)
+        try:
+            self.mm = mmap.mmap(ring_fd, os.fstat(ring_fd).st_size)
+        finally:
+            os.close(ring_fd)
+        magic, self.capacity, readers, seq = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or not 0 <= index < readers:
+            raise ValueError(f'링 형식이 다르거나 칸 번호가 범위 밖: fd {ring_fd} [{index}]')
+        self.slot = SLOTS_OFFSET + index * SLOT.size
+        self.wake_fd = wake_fd
+        self.on_mouse = on_mouse
+        self.on_keyboard = on_keyboard
+        self.on_consumer = on_consumer
+        self.cursor = seq
+        self.sent = 0
+        self.lost = 0
+        SLOT.pack_into(self.mm, self.slot, 0, seq, 0, 0)
+        self._watch = None
+
+    def start(self):
+        self._watch = GLib.io_add_watch(self.wake_fd, GLib.IO_IN, self._on_wake)
+        self.drain()
+
+    def _on_wake(self, fd, condition):
+        # 카운터를 먼저 비우고 읽음 - 그 뒤에 쓴 기록은 다음 깨우기에서 처리
+        try:
+            os.eventfd_read(fd)
+        except BlockingIOError:
+            pass
+        self.drain()
+        return True
+
+    def drain(self):
+        # 지금까지 쓴 기록을 모두 처리 (덮어쓰였거나 읽는 동안 덮어쓰인 기록은 놓침으로 셈)
+        mm, cap = self.mm, self.capacity
+        end = U64.unpack_from(mm, SEQ_OFFSET)[0]
+        seq = self.cursor
+        if end - seq > cap:
+            self.lost += end - seq - cap   # 이미 덮어쓰임
+            seq = end - cap
+        head = RECORD_HEAD.size
+        while seq < end:
+            seq += 1
+            off = RECORDS_OFFSET + (seq % cap) * RECORD_SIZE
+            rseq, kind, n = RECORD_HEAD.unpack_from(mm, off)
+            if rseq != seq:
+                self.lost += 1
+                continue
+            if kind == KIND_MOUSE:
+                frame = MOUSE.unpack_from(mm, off + head)
+            else:
+                report = mm[off + head:off + head + n]
+            if U64.unpack_from(mm, off)[0] != seq:
+                self.lost += 1   # 읽는 동안 덮어쓰임
+                continue
+            if kind == KIND_MOUSE:
+                self.on_mouse(*frame)
+            elif kind == KIND_KEYBOARD:
+                self.on_keyboard(report)
+            else:
+                self.on_consumer(report)
+        self.cursor = seq
+        U64.pack_into(mm, self.slot + 8, seq)
+        U64.pack_into(mm, self.slot + 24, self.lost)
+
+    def count_sent(self):
+        self.sent += 1
+        U64.pack_into(self.mm, self.slot + 16, self.sent)
+
+    def set_ready(self, ready):
+        self.mm[self.slot] = 1 if ready else 0
+
+    def close(self):
+        if self._watch is not None:
+            GLib.source_remove(self._watch)
+            self._watch = None
+        self.mm.close()
+
+
+class ShardSupervisor:
+    # 입력 프로세스 쪽 - 링을 만들고 어댑터마다 작업 프로세스를 실행, 죽으면 감시자(watchdog)가 그것만 다시 시작
+    # transport.py 의 출력 인터페이스 일부를 가짐 (main.py 에서 transport 자리에 씀 - 알림은 작업 프로세스가 보냄)
+    #  adapter_names: hci0 등 (작업 하나가 어댑터 하나)
+    #  settings     : 프로파일 설정 (작업 프로세스가 같은 프로파일을 컴파일)
+    #  bus_address  : 시스템 버스 대신 쓸 D-Bus 주소 (벤치마크의 가짜 BlueZ)
+    #  capacity     : 링 기록 수 - 작업이 이만큼 뒤처지면 오래된 기록부터 놓침
+    host_manager = None
+    limit = S8_LIMIT
+
+    def __init__(self, adapter_names, settings, watchdog, control_socket=None,
+                 bus_address=None, ring_name=RING_NAME, capacity=DEFAULT_CAPACITY, stdout=None):
+        self.adapter_names = list(adapter_names)
+        self.settings = settings
+        self.watchdog = watchdog
+        self.control_socket = control_socket
+        self.bus_address = bus_address
+        self.stdout = stdout
+        self.ring = RingWriter(ring_name, len(self.adapter_names), capacity)
+        self.procs = {}     # 어댑터 이름 -> Popen
+        self._watches = {}  # 어댑터 이름 -> child_watch 소스
+        self._kills = {}    # 어댑터 이름 -> 끝내기를 기다리다 kill 하는 타이머
+        self._respawn = set()   # 이전 작업이 끝나면 다시 시작할 어댑터
+        self.closing = False
+
+    def send_report(self, *report):
+        pass
+
+    send_keyboard = send_consumer = send_report
+
+    def ready(self):
+        return False   # 입력은 링으로 바로 감 (이 프로세스의 코얼레서는 쓰지 않음)
+
+    def start(self):
+        for index, name in enumerate(self.adapter_names):
+            component = f'shard:{name}'
+            self.watchdog.add(component, lambda index=index: self._spawn(index))
+            self.watchdog.start(component)
+
+    def _spawn(self, index):
+        # 이전 작업이 끝난 뒤에 시작 (한 어댑터에 작업 둘이 동시에 보내지 않도록)
+        # 아직 살아 있으면 끝내기만 하고 child_watch 가 회수하면 시작 - 메인 루프에서 기다리지 않음
+        name = self.adapter_names[index]
+        old = self.procs.get(name)
+        if old is not None and old.returncode is None:
+            self._respawn.add(name)
+            self._terminate(name)
+            return False
+        self._launch(index)
+        return True
+
+    def _launch(self, index):
+        name = self.adapter_names[index]
+        cmd = [sys.executable, os.path.abspath(__file__), '--ring-fd', str(self.ring.fd), '--index', str(index),
+               '--wake-fd', str(self.ring.wake_fds[index]), '--adapter', name,
+               '--settings', json.dumps(self.settings)]
+        if self.control_socket:
+            cmd += ['--control-socket', f'{self.control_socket}.{name}']
+        if self.bus_address:
+            cmd += ['--bus', self.bus_address]
+        # stdin 파이프: 입력 프로세스가 죽으면 닫혀서 작업도 끝남
+        proc = self.procs[name] = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=self.stdout,
+                                                   pass_fds=(self.ring.fd, self.ring.wake_fds[index]))
+        self._watches[name] = GLib.child_watch_add(GLib.PRIORITY_DEFAULT, proc.pid, self._on_exit, name)
+        print(f"[샤드] {name}: 작업 프로세스 {proc.pid}")
+
+    def _on_exit(self, pid, status, name):
+        proc = self.procs.get(name)
+        if proc is None or proc.pid != pid:
+            return
+        del self._watches[name]   # 한 번만 호출되는 소스 (이미 제거됨)
+        proc.returncode = os.waitstatus_to_exitcode(status)   # child_watch 가 이미 회수함
+        kill = self._kills.pop(name, None)
+        if kill is not None:
+            GLib.source_remove(kill)
+        if self.closing:
+            return
+        if name in self._respawn:
+            # 끝내라고 한 작업 - 이제 새 작업 시작
+            self._respawn.discard(name)
+            component = f'shard:{name}'
+            try:
+                self._launch(self.adapter_names.index(name))
+            except OSError as e:
+                self.watchdog.failed(component, f'작업 프로세스 시작 실패: {e}')
+                return
+            self.watchdog.recovered(component)
+        else:
+            self.watchdog.failed(f'shard:{name}', f'작업 프로세스 종료 ({proc.returncode})')
+
+    def _terminate(self, name):
+        # SIGTERM 후 2초 안에 끝나지 않으면 kill - 회수는 child_watch (_on_exit)
+        proc = self.procs[name]
+        if name in self._kills:
+            return   # 이미 끝내는 중
+        proc.terminate()
+        self._kills[name] = GLib.timeout_add_seconds(2, self._kill, name, proc)
+
+    def _kill(self, name, proc):
+        self._kills.pop(name, None)
+        if proc.returncode is None:
+            print(f"[샤드] {name}: 작업 프로세스 {proc.pid} 가 끝나지 않아 kill")
+            proc.kill()
+        return False
+
+    def set_settings(self, settings):
+        # 프로파일 변경 - 작업 프로세스를 새 설정으로 다시 시작 (호스트는 다시 연결됨)
+        self.settings = settings
+        for index in range(len(self.adapter_names)):
+            self._spawn(index)
+
+    def close(self):
+        # 종료 시 - 메인 루프가 끝난 뒤라 child_watch 를 떼고 직접 회수
+        self.closing = True
+        for source in list(self._watches.values()) + list(self._kills.values()):
+            GLib.source_remove(source)
+        self._watches.clear()
+        self._kills.clear()
+        for proc in self.procs.values():
+            if proc.returncode is None:
+                proc.terminate()
+        for proc in self.procs.values():
+            try:
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        self.ring.close()
+
+    # ---------- 제어 명령 ----------
+    def cmd_output(self, args):
+        lines = [f"링 {self.ring.name}: 기록 {self.ring.seq} (크기 {self.ring.capacity})"]
+        for index, name in enumerate(self.adapter_names):
+            ready, cursor, sent, lost = self.ring.slot(index)
+            proc = self.procs.get(name)
+            lines.append(f"  {name}: pid {proc.pid if proc else '-'} {'구독됨' if ready else '대기'}  "
+                         f"밀림 {self.ring.seq - cursor}  보냄 {sent}  놓침 {lost}")
+        return '\n'.join(lines)
+
+
+# ---------- 작업 프로세스 ----------
+# python3 shard.py --ring-fd FD --index N --wake-fd FD --adapter hciN --settings JSON (ShardSupervisor 가 실행)
+def worker_main():
+    parser = argparse.ArgumentParser(description='BLE HID 허브 샤드 작업 프로세스')
+    parser.add_argument('--ring-fd', type=int, required=True)
+    parser.add_argument('--index', type=int, required=True)
+    parser.add_argument('--wake-fd', type=int, required=True)
+    parser.add_argument('--adapter', required=True)
+    parser.add_argument('--settings', required=True, help='프로파일 설정 JSON')
+    parser.add_argument('--control-socket')
+    parser.add_argument('--bus', help='시스템 버스 대신 연결할 D-Bus 주소')
+    args = parser.parse_args()
+
+    # 입력 프로세스가 --low-jitter 면 CPU 하나 + SCHED_FIFO 를 물려받으므로 먼저 되돌림
+    import realtime
+    realtime.reset()
+
+    # 작업 프로세스에서만 필요한 모듈 (입력 프로세스는 링만 씀)
+    from main import GattTransport, build_report_map
+    from profiles import CompiledProfile
+    from accel import PointerAccel
+    from coalescer import MotionCoalescer
+    from watchdog import Watchdog
+    from control import ControlServer
+
+    settings = json.loads(args.settings)
+    profile = CompiledProfile(f'샤드 {args.adapter}', settings, build_report_map)
+    watchdog = Watchdog()
+    try:
+        transport = GattTransport(profile, '', watchdog, adapters=args.adapter, bus_address=args.bus)
+    except Exception as e:
+        print(f"[샤드 {args.adapter}] 출력 준비 실패: {e}")
+        sys.exit(1)
+
+    coalescer = MotionCoalescer(None, interval_ms=settings['interval_ms'], limit=transport.limit,
+                                policy=settings['queue_policy'], queue_size=settings['queue_size'],
+                                ready=transport.ready)
+    accel = PointerAccel(coalescer.push, profile.accel_default, profile.accel_hosts)
+    transport.host_manager.on_active = accel.select_host
+    reader = RingReader(args.ring_fd, args.index, args.wake_fd, accel.push,
+                        lambda report: coalescer.push_report(transport.send_keyboard, report),
+                        lambda report: coalescer.push_report(transport.send_consumer, report))
+
+    def send(buttons, dx, dy, wheel):
+        transport.send_report(buttons, dx, dy, wheel)
+        reader.count_sent()
+    coalescer.send = send
+    transport.app.on_notify_state = lambda: reader.set_ready(transport.ready())
+    reader.set_ready(transport.ready())
+
+    control = None
+    if args.control_socket:
+        control = ControlServer(args.control_socket)
+        control.register('hosts', transport.host_manager.cmd_hosts)
+        control.register('switch', transport.host_manager.cmd_switch)
+        control.register('queue', coalescer.cmd_queue)
+        control.register('accel', accel.cmd_accel)
+        control.register('watchdog', watchdog.cmd_watchdog)
+        try:
+            control.start()
+        except OSError as e:
+            print(f"[샤드 {args.adapter}] 제어 소켓 생성 실패: {args.control_socket}: {e}")
+            control = None
+
+    mainloop = GLib.MainLoop()
+    GLib.io_add_watch(sys.stdin.fileno(), GLib.IO_HUP | GLib.IO_ERR, lambda *a: mainloop.quit())
+    GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGTERM, mainloop.quit)
+    reader.start()
+    try:
+        mainloop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+        transport.close()
+        if control is not None:
+            control.stop()
+
+
+if __name__ == '__main__':
+    worker_main()
@@ -0,0 +1,142 @@
+import os, time
+from array import array
+
+
+# 입력 -> 알림 지연 추적 (선택 사항, --trace)
+# 커널 input_event 타임스탬프(CLOCK_MONOTONIC)부터 PropertiesChanged 전송까지 단계별 지연을
+# 고정 크기 히스토그램에 기록. 실행 중 SIGUSR1 로 p50/p99/p99.9/max 조회
+#
+#  read  : 커널 이벤트 시각 -> read() 반환 (helper 모드는 파이프 포함)
+#  parse : read() 반환 -> SYN 프레임 디코딩 완료
+#  queue : 코얼레서 push -> GLib 메인 루프에서 전송 슬롯 시작 (스레드 -> 메인 루프 홉 + 페이싱 대기)
+#  send  : send_report 진입 -> 리포트 패킹 완료
+#  emit  : PropertiesChanged 시그널 전송 (D-Bus 마샬링)
+#  total : 리포트에 포함된 가장 오래된 커널 이벤트 -> 시그널 전송 완료
+
+STAGES = ('read', 'parse', 'queue', 'send', 'emit', 'total')
+
+# 2의 거듭제곱 구간마다 4개의 하위 구간 (상대 오차 25% 이내), 최대 약 67초
+_SUB_BITS = 2
+_SUB = 1 << _SUB_BITS
+_MAX_BITS = 27
+N_BUCKETS = (_MAX_BITS - _SUB_BITS + 1) * _SUB
+
+
+def now_us():
+    return time.monotonic_ns() // 1000
+
+
+def _bucket(us):
+    if us < _SUB:
+        return us
+    b = us.bit_length()
+    if b > _MAX_BITS:
+        return N_BUCKETS - 1
+    return (b - _SUB_BITS) * _SUB + ((us >> (b - _SUB_BITS - 1)) & (_SUB - 1))
+
+
+def _bucket_upper(index):
+    if index < _SUB:
+        return index
+    b = index // _SUB + _SUB_BITS
+    shift = b - _SUB_BITS - 1
+    return ((_SUB + index % _SUB) << shift) + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    # 메모리 고정 (N_BUCKETS 개의 카운터), 단일 기록자 가정
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * N_BUCKETS))
+        self.count = 0
+        self.max = 0
+
+    def record(self, us):
+        if us < 0:
+            return   # 시계가 다른 녹화 파일 등은 무시
+        self.counts[_bucket(us)] += 1
+        self.count += 1
+        if us > self.max:
+            self.max = us
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        target = self.count * p / 100.0
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= target:
+                return min(_bucket_upper(i), self.max)
+        return self.max
+
+    def reset(self):
+        for i in range(N_BUCKETS):
+            self.counts[i] = 0
+        self.count = 0
+        self.max = 0
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.hist = {stage: LatencyHistogram() for stage in STAGES}
+
+    def record(self, stage, us):
+        self.hist[stage].record(us)
+
+    def reset(self):
+        for h in self.hist.values():
+            h.reset()
+
+    def report(self):
+        lines = [f"{'단계':<6} {'개수':>8} {'p50(µs)':>9} {'p99(µs)':>9} {'p99.9(µs)':>10} {'max(µs)':>9}"]
+        for stage in STAGES:
+            h = self.hist[stage]
+            lines.append(f"{stage:<6} {h.count:>8} {h.percentile(50):>9} "
+                         f"{h.percentile(99):>9} {h.percentile(99.9):>10} {h.max:>9}")
+        return '\n'.join(lines)
+
+
+# 프로세스 전역 추적기 (각 단계에서 TRACE.enabled 일 때만 기록)
+TRACE = Tracer()
+
+
+# ---------- 시작 시간 (콜드 스타트) ----------
+# 실행 시각부터 주요 단계까지 걸린 시간 - 부팅 후 허브를 쓸 수 있을 때까지의 회귀 확인용
+# 실행 시각은 /proc/self/stat 의 starttime (부팅 후 클럭 틱, CLOCK_BOOTTIME 기준)이라
+# 인터프리터 시작과 모듈 임포트 시간도 포함됨 (해상도 1틱, 보통 10ms)
+def boottime_us():
+    return time.clock_gettime_ns(time.CLOCK_BOOTTIME) // 1000
+
+
+def _process_start_us():
+    try:
+        with open('/proc/self/stat') as f:
+            stat = f.read()
+        ticks = int(stat.rsplit(')', 1)[1].split()[19])   # 22번째 필드 (comm 뒤부터 셈)
+        return ticks * 1000000 // os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return boottime_us()
+
+
+class StartupTimer:
+    def __init__(self):
+        self.launch_us = _process_start_us()
+        self.marks = {}   # 단계 이름 -> 실행 후 경과 ms (처음 한 번만)
+
+    def mark(self, name):
+        if name in self.marks:
+            return
+        ms = (boottime_us() - self.launch_us) / 1000
+        self.marks[name] = ms
+        print(f"[시작] {name}: 실행 후 {ms:.0f} ms")
+
+    def report(self):
+        lines = [f"{name}: {ms:.0f} ms" for name, ms in self.marks.items()]
+        lines.append(f"실행 시각: 부팅 후 {self.launch_us / 1e6:.2f} s")
+        return '\n'.join(lines)
+
+
+# 프로세스 전역 시작 시간 기록
+STARTUP = StartupTimer()
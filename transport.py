@@ -0,0 +1,116 @@
+import socket
+
+from tracing import TRACE, now_us
+
+
+# 출력 전송 방식 - 코얼레서/키보드가 만든 리포트를 호스트로 보내는 마지막 단계
+# BLE GATT 알림(main.GattTransport, 기본)과 소켓(SocketTransport)이 같은 인터페이스를 가짐
+#  send_report(buttons, dx, dy, wheel)        : 마우스 (리포트 축 범위로 제한 후 패킹)
+#  send_keyboard(report), send_consumer(report): 미리 패킹된 키보드/소비자 제어 리포트
+#  ready()                                   : 받을 곳이 있는지 (없으면 코얼레서가 대기열에 넣지 않음)
+#  limit                                     : 마우스 축 범위
+#  set_report_map(report_map, on_change)     : 리포트 맵 변경 (프로파일) - 적용 직후 on_change()
+#  set_advertisement(local_name, appearance) : 광고 변경 (BLE 만 해당)
+#  host_manager                              : 본딩 호스트 관리 (BLE 만, 없으면 None)
+#  close()
+#
+# 소켓 전송 - 유선 LAN 이나 루프백에서 BLE 알림 간격 제한 없이 보냄 (받는 쪽: uinput_receiver.py)
+#   udp:호스트:포트  또는  unix:경로
+#   데이터그램 하나 = Report ID (1바이트) + BLE 알림과 같은 리포트 바이트
+#   리포트 길이로 종류 구분: 마우스 4 (8비트 축) / 6 (16비트 축), 키보드 8, 소비자 제어 2
+MOUSE_SIZES = (4, 6)
+KEYBOARD_SIZE = 8
+CONSUMER_SIZE = 2
+
+# 수신 버퍼 크기 (가장 긴 데이터그램 + 여유)
+MAX_DATAGRAM = 64
+
+
+def parse_target(spec, loopback=False):
+    # 'udp:호스트:포트' / 'unix:경로' -> (주소 체계, 주소)
+    # 호스트를 생략하면 모든 주소, loopback 이면 루프백 (수신기가 받을 주소)
+    kind, _, rest = spec.partition(':')
+    if kind == 'unix' and rest:
+        return socket.AF_UNIX, rest
+    if kind == 'udp':
+        host, _, port = rest.rpartition(':')
+        host = host.strip('[]')   # [::1]:5555
+        if port.isdigit():
+            family = socket.AF_INET6 if ':' in host else socket.AF_INET
+            if not host:
+                host = ('::1' if loopback else '::') if family == socket.AF_INET6 else \
+                       ('127.0.0.1' if loopback else '0.0.0.0')
+            return family, (host, int(port))
+    raise ValueError(f'출력 형식: udp:호스트:포트 또는 unix:경로 ({spec})')
+
+
+class SocketTransport:
+    host_manager = None
+
+    def __init__(self, target, report_map):
+        family, address = parse_target(target)
+        self.target = target
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)   # 메인 루프를 막지 않음 - 보낼 수 없으면 버림
+        if family == socket.AF_UNIX:
+            # 수신기가 나중에 뜨거나 다시 시작해도 되도록 보낼 때마다 경로로 전송
+            self._send = lambda data: self.sock.sendto(data, address)
+        else:
+            self.sock.connect(address)
+            self._send = self.sock.send
+        self.sent = 0
+        self.dropped = 0   # 수신기 없음 (ECONNREFUSED/ENOENT), 소켓 버퍼 가득 참
+        self.set_report_map(report_map)
+
+    def set_report_map(self, report_map, on_change=None):
+        mouse = report_map['mouse']
+        self.packer = mouse.packer
+        self.limit = mouse.limit
+        # 마우스 데이터그램 버퍼는 재사용 (pack_into)
+        self._mouse = bytearray(1 + self.packer.size)
+        self._mouse[0] = mouse.report_id
+        self._keyboard_id = bytes([report_map['keyboard'].report_id])
+        self._consumer_id = bytes([report_map['consumer'].report_id])
+        if on_change is not None:
+            on_change()
+
+    def set_advertisement(self, local_name, appearance):
+        pass
+
+    def ready(self):
+        return True
+
+    def _emit(self, data):
+        try:
+            self._send(data)
+            self.sent += 1
+        except OSError:
+            self.dropped += 1
+
+    def send_report(self, buttons=0, dx=0, dy=0, wheel=0):
+        tracing = TRACE.enabled
+        if tracing:
+            t0 = now_us()
+        limit = self.limit
+        self.packer.pack_into(self._mouse, 1, buttons & 0x07,
+                              max(-limit, min(limit, dx)), max(-limit, min(limit, dy)),
+                              max(-127, min(127, wheel)))
+        if tracing:
+            t1 = now_us()
+            TRACE.record('send', t1 - t0)
+        self._emit(self._mouse)
+        if tracing:
+            TRACE.record('emit', now_us() - t1)
+
+    def send_keyboard(self, report):
+        self._emit(self._keyboard_id + report)
+
+    def send_consumer(self, report):
+        self._emit(self._consumer_id + report)
+
+    def close(self):
+        self.sock.close()
+
+    # ---------- 제어 명령 ----------
+    def cmd_output(self, args):
+        return f"{self.target}: 보냄 {self.sent}, 버림 {self.dropped}"
@@ -0,0 +1,222 @@
+import os, sys, fcntl, struct, socket, argparse, ipaddress
+
+from evdev_reader import INPUT_EVENT, EV_SYN, EV_KEY, EV_REL, SYN_REPORT, REL_X, REL_Y, REL_WHEEL, BUTTON_BITS
+from keyboard import KEY_TO_HID, KEY_TO_CONSUMER, MODIFIER_MIN, ERROR_ROLLOVER
+from transport import parse_target, MOUSE_SIZES, KEYBOARD_SIZE, CONSUMER_SIZE, MAX_DATAGRAM
+
+
+# 소켓 출력(--output udp:... / unix:...)을 받아 uinput 가상 장치로 주입 (받는 노트북/루프백에서 실행)
+#   python3 uinput_receiver.py udp::5555                                      # 루프백만 (호스트 생략 시 기본)
+#   python3 uinput_receiver.py udp:192.168.0.10:5555 --allow 192.168.0.2      # LAN - 허브 주소에서 온 것만
+#   python3 uinput_receiver.py unix:/tmp/ble-hub.sock --print   # uinput 없이 이벤트만 출력 (시험용)
+# 인증이 없는 프로토콜이라 받은 데이터그램이 그대로 키 입력이 됨 -> 루프백이 아닌 주소로 받을 때는 --allow 필수,
+# 허용 목록에 없는 주소에서 온 데이터그램은 버림 (유닉스 소켓은 소유자만 쓸 수 있게 0600)
+# 리포트는 이전 리포트와 비교해 바뀐 버튼/키만 EV_KEY 로 만들고 SYN_REPORT 로 묶어 write() 한 번에 씀
+# https://www.kernel.org/doc/html/latest/input/uinput.html
+
+# ioctl 번호 (linux/uinput.h)
+# _IOW('U', 100/101/102, int), _IOW('U', 3, struct uinput_setup), _IO('U', 1/2)
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_SET_RELBIT = 0x40045566
+UI_DEV_SETUP = 0x405c5503
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+
+# struct uinput_setup { struct input_id { bustype, vendor, product, version }; char name[80]; __u32 ff_effects_max; }
+UINPUT_SETUP = struct.Struct('<HHHH80sI')
+BUS_VIRTUAL = 0x06
+DEVICE_NAME = b'BLE Hub Receiver'
+
+# 리포트 -> evdev 코드 (keyboard.py 표의 역방향)
+HID_TO_KEY = {usage: code for code, usage in KEY_TO_HID.items()}
+CONSUMER_TO_KEY = {usage: code for code, usage in KEY_TO_CONSUMER.items()}
+BIT_TO_BUTTON = {bit: code for code, bit in BUTTON_BITS.items()}
+
+MOUSE_FORMATS = {4: struct.Struct('<Bbbb'), 6: struct.Struct('<Bhhb')}
+
+
+class UinputDevice:
+    # 마우스 + 키보드 + 미디어 키를 하나의 가상 장치로
+
+    def __init__(self, path='/dev/uinput'):
+        self.fd = os.open(path, os.O_WRONLY | os.O_CLOEXEC)
+        fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_KEY)
+        fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_REL)
+        for code in list(BIT_TO_BUTTON.values()) + list(HID_TO_KEY.values()) + list(CONSUMER_TO_KEY.values()):
+            fcntl.ioctl(self.fd, UI_SET_KEYBIT, code)
+        for code in (REL_X, REL_Y, REL_WHEEL):
+            fcntl.ioctl(self.fd, UI_SET_RELBIT, code)
+        fcntl.ioctl(self.fd, UI_DEV_SETUP, UINPUT_SETUP.pack(BUS_VIRTUAL, 0x1d6b, 0x0104, 1, DEVICE_NAME, 0))
+        fcntl.ioctl(self.fd, UI_DEV_CREATE)
+
+    def write(self, events):
+        # events: [(type, code, value), ...] + SYN_REPORT - 시각은 커널이 채움
+        os.write(self.fd, b''.join(INPUT_EVENT.pack(0, 0, t, c, v) for t, c, v in events))
+
+    def close(self):
+        if self.fd >= 0:
+            fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+            os.close(self.fd)
+            self.fd = -1
+
+
+class ReportInjector:
+    # 데이터그램 (Report ID + 리포트) -> input_event 목록
+    #  emit(events) : SYN_REPORT 까지 포함한 한 묶음
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.buttons = 0
+        self.keys = set()     # 눌린 evdev 키 (수정키 포함)
+        self.media = 0        # 눌린 미디어 키 (evdev 코드, 0 = 없음)
+        self.ignored = 0
+
+    def feed(self, data):
+        report = data[1:]
+        n = len(report)
+        if n in MOUSE_SIZES:
+            events = self._mouse(report)
+        elif n == KEYBOARD_SIZE:
+            events = self._keyboard(report)
+        elif n == CONSUMER_SIZE:
+            events = self._consumer(report)
+        else:
+            self.ignored += 1
+            return
+        if events:
+            events.append((EV_SYN, SYN_REPORT, 0))
+            self.emit(events)
+
+    def _mouse(self, report):
+        buttons, dx, dy, wheel = MOUSE_FORMATS[len(report)].unpack(report)
+        events = []
+        changed = buttons ^ self.buttons
+        for bit, code in BIT_TO_BUTTON.items():
+            if changed & bit:
+                events.append((EV_KEY, code, 1 if buttons & bit else 0))
+        self.buttons = buttons
+        if dx:
+            events.append((EV_REL, REL_X, dx))
+        if dy:
+            events.append((EV_REL, REL_Y, dy))
+        if wheel:
+            events.append((EV_REL, REL_WHEEL, wheel))
+        return events
+
+    def _keyboard(self, report):
+        modifiers = report[0]
+        usages = report[2:]
+        if ERROR_ROLLOVER in usages:
+            return []   # 동시 입력 초과 - 이전 상태 유지
+        keys = {HID_TO_KEY[MODIFIER_MIN + i] for i in range(8) if modifiers >> i & 1}
+        keys.update(HID_TO_KEY[u] for u in usages if u in HID_TO_KEY)
+        events = [(EV_KEY, code, 0) for code in sorted(self.keys - keys)]
+        events += [(EV_KEY, code, 1) for code in sorted(keys - self.keys)]
+        self.keys = keys
+        return events
+
+    def _consumer(self, report):
+        code = CONSUMER_TO_KEY.get(struct.unpack('<H', report)[0], 0)
+        if code == self.media:
+            return []
+        events = []
+        if self.media:
+            events.append((EV_KEY, self.media, 0))
+        if code:
+            events.append((EV_KEY, code, 1))
+        self.media = code
+        return events
+
+
+def open_socket(spec):
+    family, address = parse_target(spec, loopback=True)
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    if family == socket.AF_UNIX:
+        try:
+            os.unlink(address)
+        except FileNotFoundError:
+            pass
+        sock.bind(address)
+        os.chmod(address, 0o600)
+    else:
+        sock.bind(address)
+    return sock
+
+
+def is_loopback(sock):
+    return sock.family == socket.AF_UNIX or ipaddress.ip_address(sock.getsockname()[0]).is_loopback
+
+
+def resolve_allowed(names):
+    # --allow 주소/이름 -> IP 문자열 집합 (IPv4 는 IPv6 소켓에서 받을 때의 ::ffff: 형식도)
+    allowed = set()
+    for name in names:
+        for *_, sockaddr in socket.getaddrinfo(name, None, type=socket.SOCK_DGRAM):
+            ip = ipaddress.ip_address(sockaddr[0])
+            allowed.add(str(ip))
+            if ip.version == 4:
+                allowed.add(f'::ffff:{ip}')
+    return allowed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BLE 허브 소켓 출력 수신기 (uinput 주입)')
+    parser.add_argument('listen', help='udp:주소:포트 또는 unix:경로 (허브의 --output 과 같은 주소)')
+    parser.add_argument('--print', action='store_true', help='uinput 대신 이벤트를 출력')
+    parser.add_argument('--allow', action='append', default=[], metavar='주소',
+                        help='데이터그램을 받을 허브 주소 (여러 번 지정 가능) - 루프백이 아닌 주소로 받을 때 필수')
+    args = parser.parse_args()
+
+    try:
+        sock = open_socket(args.listen)
+        allowed = resolve_allowed(args.allow)
+    except (OSError, ValueError) as e:
+        sys.exit(f"수신 소켓 준비 실패: {args.listen}: {e}")
+    if not allowed and not is_loopback(sock):
+        sock.close()
+        sys.exit("루프백이 아닌 주소로 받으려면 --allow 로 허브 주소를 지정하세요 "
+                 "(인증이 없어 같은 네트워크의 누구나 키 입력을 주입할 수 있음)")
+
+    if args.print:
+        device = None
+        emit = lambda events: print(' '.join(f'{t}:{c}:{v}' for t, c, v in events[:-1]))
+    else:
+        try:
+            device = UinputDevice()
+        except OSError as e:
+            sys.exit(f"uinput 장치 생성 실패: {e} (root 권한 또는 uinput 모듈 필요)")
+        emit = device.write
+    injector = ReportInjector(emit)
+    print(f"[수신] {args.listen}{' (출력만)' if device is None else ''}"
+          f"{' 허용: ' + ', '.join(args.allow) if allowed else ''}")
+
+    buf = bytearray(MAX_DATAGRAM)
+    view = memoryview(buf)
+    count = 0
+    rejected = {}   # 허용되지 않은 주소 -> 버린 수 (주소마다 처음 한 번만 경고)
+    check = allowed and sock.family != socket.AF_UNIX   # 유닉스 소켓은 파일 권한으로 제한
+    try:
+        while True:
+            n, source = sock.recvfrom_into(buf)
+            if check and source[0] not in allowed:
+                if source[0] not in rejected:
+                    print(f"[수신] 경고: 허용되지 않은 주소에서 온 데이터그램 버림: {source[0]}")
+                rejected[source[0]] = rejected.get(source[0], 0) + 1
+                continue
+            injector.feed(view[:n])
+            count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        if sock.family == socket.AF_UNIX:
+            os.unlink(args.listen.partition(':')[2])
+        if device is not None:
+            device.close()
+        print(f"[수신] 리포트 {count}개 (알 수 없는 형식 {injector.ignored}개, "
+              f"허용되지 않은 주소 {sum(rejected.values())}개)")
+
+
+if __name__ == '__main__':
+    main()
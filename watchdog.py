@@ -0,0 +1,142 @@
+from gi.repository import GLib
+
+from tracing import now_us
+
+
+# 구성 요소 감시 - 죽은 것만 다시 시작 (허브 전체를 재시작하지 않음)
+#  input : 입력 소스 (helper 프로세스 종료, 장치 분리, 리더 스레드 예외)
+#  bluez : 광고 + GATT 등록 (bluetoothd 재시작, 어댑터 사라짐)
+# 재시도 간격은 0 (바로) 다음 BACKOFF_MIN_MS 부터 두 배씩 BACKOFF_MAX_MS 까지
+# 복구 시간 = 실패 감지 -> 다시 동작할 때까지 (목표 RECOVERY_TARGET_MS 이하)
+# 외부 요인을 기다리는 동안(bluetoothd 가 아직 없음)은 hold() 로 재시도를 멈추고,
+# 다시 나타나면 kick() 으로 바로 시도 - 이 경우 복구 시간은 나타난 시각부터 따로 기록
+# 다시 시작한 뒤 STABLE_MS 안에 또 죽으면 간격을 계속 늘림 (바로 죽는 helper 를 무한 반복하지 않도록)
+BACKOFF_MIN_MS = 50
+BACKOFF_MAX_MS = 5000
+STABLE_MS = 2000
+RECOVERY_TARGET_MS = 1000
+
+
+def _next_backoff(ms):
+    return min(max(ms * 2, BACKOFF_MIN_MS), BACKOFF_MAX_MS)
+
+
+class Component:
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start          # start() -> True: 바로 복구, False: 비동기 (나중에 recovered 호출), 예외: 재시도
+        self.up = False
+        self.failures = 0
+        self.backoff_ms = 0
+        self.up_us = 0              # 마지막으로 동작을 시작한 시각
+        self.down_us = 0            # 실패 감지 시각
+        self.kick_us = 0            # 외부 요인이 돌아온 시각 (hold 후 kick)
+        self.held = False
+        self.last_recovery_ms = None
+        self.max_recovery_ms = None
+        self.reason = ''
+        self._timer = None
+
+
+class Watchdog:
+    # GLib 메인 루프 스레드에서만 호출 (다른 스레드에서는 failed_threadsafe)
+
+    def __init__(self):
+        self.components = {}   # 이름 -> Component
+
+    def add(self, name, start):
+        self.components[name] = Component(name, start)
+
+    def start(self, name):
+        # 처음 시작 - 실패하면 재시도
+        comp = self.components[name]
+        comp.down_us = now_us()
+        self._attempt(comp)
+
+    def failed(self, name, reason, hold=False):
+        comp = self.components[name]
+        if comp.up:
+            t = now_us()
+            comp.up = False
+            comp.failures += 1
+            comp.down_us = t
+            comp.kick_us = 0
+            comp.backoff_ms = 0 if t - comp.up_us >= STABLE_MS * 1000 else _next_backoff(comp.backoff_ms)
+            comp.reason = reason
+            print(f"[감시] {name} 실패: {reason}")
+        else:
+            # 복구 시도가 실패함 - 간격을 늘려 다시
+            comp.backoff_ms = _next_backoff(comp.backoff_ms)
+        comp.held = hold
+        if hold:
+            self._cancel(comp)
+        elif comp._timer is None:
+            comp._timer = GLib.timeout_add(comp.backoff_ms, self._on_timer, comp)
+        return False
+
+    def failed_threadsafe(self, name, reason):
+        GLib.idle_add(self.failed, name, reason)
+
+    def hold(self, name, reason):
+        # 외부 요인을 기다림 (kick 전까지 재시도 안 함)
+        self.failed(name, reason, hold=True)
+
+    def kick(self, name):
+        comp = self.components[name]
+        if comp.up:
+            return
+        comp.held = False
+        comp.kick_us = now_us()
+        comp.backoff_ms = 0
+        self._cancel(comp)
+        self._attempt(comp)
+
+    def recovered(self, name):
+        comp = self.components[name]
+        if comp.up:
+            return
+        t = now_us()
+        comp.up = True
+        comp.up_us = t
+        self._cancel(comp)
+        if not comp.failures:
+            return   # 처음 시작
+        ms = (t - comp.down_us) / 1000
+        comp.last_recovery_ms = ms
+        comp.max_recovery_ms = max(comp.max_recovery_ms or 0, ms)
+        detail = f", 다시 나타난 후 {(t - comp.kick_us) / 1000:.0f} ms" if comp.kick_us else ''
+        over = ' (목표 초과)' if ms > RECOVERY_TARGET_MS and not comp.kick_us else ''
+        print(f"[감시] {name} 복구: {ms:.0f} ms{detail}{over}")
+
+    def _cancel(self, comp):
+        if comp._timer is not None:
+            GLib.source_remove(comp._timer)
+            comp._timer = None
+
+    def _on_timer(self, comp):
+        comp._timer = None
+        self._attempt(comp)
+        return False
+
+    def _attempt(self, comp):
+        try:
+            done = comp.start()
+        except Exception as e:
+            print(f"[감시] {comp.name} 시작 실패: {e} ({_next_backoff(comp.backoff_ms)} ms 후 재시도)")
+            self.failed(comp.name, str(e))
+            return
+        if done:
+            self.recovered(comp.name)
+
+    # ---------- 제어 명령 ----------
+    def cmd_watchdog(self, args):
+        lines = []
+        for comp in self.components.values():
+            state = '정상' if comp.up else ('대기' if comp.held else '복구 중')
+            line = f"{comp.name}: {state}, 실패 {comp.failures}회"
+            if comp.last_recovery_ms is not None:
+                line += f", 마지막 복구 {comp.last_recovery_ms:.0f} ms (최대 {comp.max_recovery_ms:.0f} ms)"
+            if comp.reason:
+                line += f", 마지막 원인: {comp.reason}"
+            lines.append(line)
+        return '\n'.join(lines)